@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import datetime
+from collections import defaultdict
+from typing import Any, Final
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, date_diff, getdate, now_datetime
+
+from do_health.api import employee_calendar, slot_config
+from do_health.api.methods import build_availability_time_slots
+from do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day import get_days
+from do_health.api.slot_engine import build_open_slot_details
+
+MAX_MATRIX_DAYS: Final[int] = 62
+
+MAX_SEARCH_DAYS: Final[int] = 120
+
+# Days loaded per bulk context while searching forward, so an early hit stops the scan.
+SEARCH_WINDOW_DAYS: Final[int] = 7
+
+APPOINTMENT_FIELDS: Final[list[str]] = ["name", "appointment_time", "duration", "status", "appointment_date"]
+
+# Practitioner Availability Day fields exposed as booked "appointments" (see get_practitioner_unavailability)
+UNAVAILABILITY_FIELDS: Final[dict[str, str]] = {
+	"name": "availability",
+	"appointment_date": "date",
+	"appointment_time": "start_time",
+	"duration": "duration",
+	"type": "type",
+	"reason": "reason",
+	"note": "note",
+}
+
+
+def _as_list(value: Any) -> list:
+	value = frappe.parse_json(value) if isinstance(value, str) and value.startswith("[") else value
+	if not value:
+		return []
+	return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _date_range(from_date: Any, to_date: Any = None) -> list[datetime.date]:
+	start = getdate(from_date)
+	end = getdate(to_date) if to_date else start
+	if end < start:
+		frappe.throw(_("To Date cannot be before From Date"))
+	if date_diff(end, start) >= MAX_MATRIX_DAYS:
+		frappe.throw(_("Availability can be requested for at most {0} days at a time").format(MAX_MATRIX_DAYS))
+	return [add_days(start, offset) for offset in range(date_diff(end, start) + 1)]
+
+
+@frappe.whitelist()
+def get_availability_matrix(practitioners, from_date, to_date=None, duration=30, open_only=0):
+	"""
+	Slot details for every practitioner on every date in [from_date, to_date], loaded with
+	one query per source doctype instead of one get_availability_data call per cell.
+	With 'open_only', each slot detail carries the bookable 'open_slots' instead of the raw
+	slot templates and appointments (see slot_engine.compute_open_slots).
+	:return: {practitioner: {date: {"slot_details": [...], "unavailable_reason": str | None}}}
+	"""
+	practitioners = _as_list(practitioners)
+	if not practitioners:
+		frappe.throw(_("At least one Healthcare Practitioner is required"))
+
+	dates = _date_range(from_date, to_date)
+	context = load_availability_context(practitioners, dates[0], dates[-1])
+	duration = cint(duration) or 30
+	now = now_datetime() if cint(open_only) else None
+
+	return {
+		practitioner: {
+			date.isoformat(): build_day(context, practitioner, date, duration, now=now) for date in dates
+		}
+		for practitioner in practitioners
+	}
+
+
+@frappe.whitelist()
+def get_open_slots(practitioner, date, duration=30):
+	"""Bookable slots of one practitioner on one date, computed server-side."""
+	return get_availability_matrix([practitioner], date, duration=duration, open_only=1)[practitioner][
+		getdate(date).isoformat()
+	]
+
+
+@frappe.whitelist()
+def find_next_available_slots(
+	practitioners=None, department=None, appointment_type=None, from_date=None, days=14, limit=5, duration=None
+):
+	"""
+	Earliest open slots across a set of practitioners, searching forward day by day from
+	'from_date' for at most 'days' days and stopping once 'limit' slots are found.
+	Practitioners default to the active ones of 'department'; 'appointment_type' supplies
+	the slot length for Practitioner Availability windows.
+	:return: [{"practitioner", "date", "from_time", "to_time", "service_unit", ...}] ordered by start
+	"""
+	practitioners = _as_list(practitioners) or _department_practitioners(department)
+	if not practitioners:
+		frappe.throw(_("No Healthcare Practitioner found to search"))
+
+	days = min(cint(days) or 14, MAX_SEARCH_DAYS)
+	limit = cint(limit) or 5
+	duration = cint(duration) or _appointment_type_duration(appointment_type) or 30
+	start = getdate(from_date) if from_date else getdate()
+	now = now_datetime()
+
+	found = []
+	for offset in range(0, days, SEARCH_WINDOW_DAYS):
+		window_start = add_days(start, offset)
+		window_end = add_days(start, min(offset + SEARCH_WINDOW_DAYS, days) - 1)
+		context = load_availability_context(practitioners, window_start, window_end)
+
+		# a window without schedules or availability says nothing about later windows
+		candidates = [name for name in practitioners if _can_have_slots(context, name)]
+		if not candidates:
+			continue
+
+		date = window_start
+		while date <= window_end:
+			day_slots = []
+			for practitioner in candidates:
+				day = build_day(context, practitioner, date, duration, now=now)
+				day_slots.extend(_flatten_open_slots(practitioner, date, day["slot_details"]))
+
+			day_slots.sort(key=lambda slot: (slot["from_time"], slot["practitioner"]))
+			found.extend(day_slots[: limit - len(found)])
+			if len(found) >= limit:
+				return found
+			date = add_days(date, 1)
+
+	return found
+
+
+def _department_practitioners(department: str | None) -> list[str]:
+	filters = {"status": "Active"}
+	if department:
+		filters["department"] = department
+	return frappe.get_all("Healthcare Practitioner", filters=filters, pluck="name", order_by="first_name asc")
+
+
+def _appointment_type_duration(appointment_type: str | None) -> int:
+	if not appointment_type:
+		return 0
+	return cint(frappe.db.get_value("Appointment Type", appointment_type, "default_duration"))
+
+
+def _can_have_slots(context, practitioner: str) -> bool:
+	return bool(context.schedule_entries.get(practitioner)) or any(
+		row.scope == practitioner for row in context.available
+	)
+
+
+def _flatten_open_slots(practitioner: str, date: datetime.date, slot_details: list[dict]) -> list[dict]:
+	return [
+		dict(
+			slot,
+			practitioner=practitioner,
+			date=date.isoformat(),
+			slot_name=detail.get("slot_name"),
+			service_unit=detail.get("service_unit"),
+			tele_conf=detail.get("tele_conf"),
+		)
+		for detail in slot_details
+		for slot in detail.get("open_slots", [])
+	]
+
+
+def load_availability_context(practitioners: list[str], from_date, to_date) -> frappe._dict:
+	"""Bulk-load everything slot building needs for the given practitioners and date range."""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+
+	practitioner_rows = {
+		row.name: row
+		for row in frappe.get_all(
+			"Healthcare Practitioner",
+			filters={"name": ["in", practitioners]},
+			fields=["name", "department", "employee", "user_id"],
+		)
+	}
+
+	schedule_entries = defaultdict(list)
+	for row in frappe.get_all(
+		"Practitioner Service Unit Schedule",
+		filters={"parenttype": "Healthcare Practitioner", "parent": ["in", practitioners]},
+		fields=["parent", "schedule", "service_unit"],
+		order_by="idx asc",
+	):
+		schedule_entries[row.parent].append(row)
+
+	schedules = slot_config.get_schedules(row.schedule for rows in schedule_entries.values() for row in rows)
+
+	availability = get_days(_availability_scopes(practitioner_rows, schedule_entries), from_date, to_date)
+
+	service_units = {row.service_unit for rows in schedule_entries.values() for row in rows if row.service_unit}
+	service_units.update(row.service_unit for row in availability if row.get("service_unit"))
+
+	return frappe._dict(
+		practitioners=practitioner_rows,
+		schedule_entries=schedule_entries,
+		schedules=schedules,
+		service_units=slot_config.get_service_units(service_units),
+		appointments=_load_appointments(practitioners, service_units, from_date, to_date),
+		available=[row for row in availability if row.type == "Available" and row.status == "Active"],
+		unavailable=[row for row in availability if row.type == "Unavailable"],
+		days_off=load_days_off(practitioner_rows.values(), from_date, to_date),
+	)
+
+
+def _availability_scopes(practitioner_rows, schedule_entries) -> list[str]:
+	scopes = set(practitioner_rows)
+	scopes.update(row.department for row in practitioner_rows.values() if row.department)
+	scopes.update(row.service_unit for rows in schedule_entries.values() for row in rows if row.service_unit)
+	return list(scopes)
+
+
+def _load_appointments(practitioners, service_units, from_date, to_date) -> dict[datetime.date, list]:
+	or_filters = {"practitioner": ["in", practitioners]}
+	if service_units:
+		or_filters["service_unit"] = ["in", list(service_units)]
+
+	appointments_by_date = defaultdict(list)
+	for row in frappe.get_all(
+		"Patient Appointment",
+		filters={
+			"appointment_date": ["between", [from_date, to_date]],
+			"status": ["not in", ["Cancelled"]],
+		},
+		or_filters=or_filters,
+		fields=APPOINTMENT_FIELDS + ["practitioner", "service_unit"],
+	):
+		appointments_by_date[getdate(row.appointment_date)].append(row)
+	return appointments_by_date
+
+
+def load_days_off(practitioner_rows, from_date, to_date) -> dict[tuple[str, datetime.date], str]:
+	"""Holiday and leave reasons keyed by (practitioner, date), matching check_employee_wise_availability."""
+	practitioner_rows = list(practitioner_rows)
+	user_employees = employee_calendar.get_user_employees(
+		row.user_id for row in practitioner_rows if not row.employee
+	)
+
+	days_off = {}
+	for row in practitioner_rows:
+		employee = row.employee or user_employees.get(row.user_id)
+		if not employee:
+			continue
+		for day, status in employee_calendar.get_days_off(employee, from_date, to_date).items():
+			if status == employee_calendar.HOLIDAY:
+				reason = _("{0} is a holiday").format(day)
+			elif status == employee_calendar.HALF_DAY_LEAVE:
+				reason = _("{0} is on a Half day Leave on {1}").format(row.name, day)
+			else:
+				reason = _("{0} is on Leave on {1}").format(row.name, day)
+			days_off[(row.name, day)] = reason
+
+	return days_off
+
+
+def _unavailability_on(context, date, scopes) -> list[dict]:
+	return [
+		{alias: row.get(field) for alias, field in UNAVAILABILITY_FIELDS.items()}
+		for row in context.unavailable
+		if row.scope in scopes and getdate(row.date) == date
+	]
+
+
+def _project_appointments(rows) -> list[dict]:
+	return [{field: row.get(field) for field in APPOINTMENT_FIELDS} for row in rows]
+
+
+def build_day(
+	context, practitioner: str, date: datetime.date, duration: int, now: datetime.datetime | None = None
+) -> dict[str, Any]:
+	"""
+	Slot details for one practitioner on one date, in the shape returned by get_availability_data.
+	When 'now' is given the slot details are reduced to their open slots as of that moment.
+	"""
+	practitioner_row = context.practitioners.get(practitioner)
+	if not practitioner_row:
+		return {"slot_details": [], "unavailable_reason": _("Healthcare Practitioner {0} not found").format(practitioner)}
+
+	reason = context.days_off.get((practitioner, date))
+	if reason:
+		return {"slot_details": [], "unavailable_reason": reason}
+
+	day_appointments = context.appointments.get(date, [])
+	slot_details = _schedule_slot_details(context, practitioner_row, date, day_appointments)
+	slot_details += _availability_slot_details(context, practitioner_row, date, day_appointments, duration)
+
+	if not slot_details and not context.schedule_entries.get(practitioner):
+		reason = _("{0} does not have a Healthcare Practitioner Schedule / Availability").format(practitioner)
+
+	if now is not None:
+		slot_details = build_open_slot_details(slot_details, date, now)
+
+	return {"slot_details": slot_details, "unavailable_reason": reason}
+
+
+def _schedule_slot_details(context, practitioner_row, date, day_appointments) -> list[dict]:
+	slot_details = []
+	weekday = date.strftime("%A")
+	practitioner = practitioner_row.name
+
+	for entry in context.schedule_entries.get(practitioner, []):
+		schedule = context.schedules.get(entry.schedule)
+		if not schedule or schedule.disabled:
+			continue
+
+		available_slots = [slot for slot in schedule.time_slots if slot.day == weekday]
+		if not available_slots:
+			continue
+
+		allow_overlap = service_unit_capacity = 0
+		if entry.service_unit:
+			unit = context.service_units.get(entry.service_unit) or frappe._dict()
+			allow_overlap = unit.overlap_appointments or 0
+			service_unit_capacity = unit.service_unit_capacity or 0
+			appointments = [
+				row
+				for row in day_appointments
+				if row.service_unit == entry.service_unit and (not allow_overlap or row.practitioner == practitioner)
+			]
+		else:
+			appointments = [row for row in day_appointments if row.practitioner == practitioner]
+
+		appointments = _project_appointments(appointments)
+		appointments.extend(
+			_unavailability_on(context, date, (practitioner, practitioner_row.department, entry.service_unit))
+		)
+
+		slot_details.append(
+			{
+				"slot_name": entry.schedule,
+				"service_unit": entry.service_unit,
+				"avail_slot": available_slots,
+				"appointments": appointments,
+				"allow_overlap": allow_overlap,
+				"service_unit_capacity": service_unit_capacity,
+				"tele_conf": schedule.allow_video_conferencing,
+			}
+		)
+	return slot_details
+
+
+def _availability_slot_details(context, practitioner_row, date, day_appointments, duration) -> list[dict]:
+	slot_details = []
+	practitioner = practitioner_row.name
+
+	for availability in context.available:
+		if availability.scope != practitioner or getdate(availability.date) != date:
+			continue
+
+		available_slots = build_availability_time_slots(availability, date, duration)
+		if not available_slots:
+			continue
+
+		unit = context.service_units.get(availability.service_unit) or frappe._dict()
+		appointments = _project_appointments(row for row in day_appointments if row.practitioner == practitioner)
+		appointments.extend(_unavailability_on(context, date, (practitioner, practitioner_row.department, None)))
+
+		slot_details.append(
+			{
+				"slot_name": "Practitioner Availability",
+				"display": availability.display,
+				"service_unit": availability.service_unit or None,
+				"avail_slot": available_slots,
+				"appointments": appointments,
+				"allow_overlap": unit.allow_appointments or 0,
+				"service_unit_capacity": unit.service_unit_capacity or 0,
+				"tele_conf": 0,
+			}
+		)
+	return slot_details
@@ -0,0 +1,167 @@
+import datetime
+import hashlib
+import json
+
+import frappe
+from frappe.utils import add_days, get_datetime, getdate, now_datetime
+
+CACHE_PREFIX = "do_health:calendar_events"
+
+# Status, billing and arrival updates made with db.set_value skip on_appointment_change; the
+# callers that know call invalidate_appointment, and a day is re-read at least every two minutes.
+CACHE_TTL = 120
+
+# Appointments that left a day (rescheduled or deleted) are logged on that day so calendar deltas
+# can tell clients holding it to drop them; a cursor older than this gets no removals for them.
+MOVED_TTL = 24 * 60 * 60
+
+
+def _day_key(day):
+	return f"{CACHE_PREFIX}:day:{day.isoformat()}"
+
+
+def _practitioner_key(practitioner):
+	return f"{CACHE_PREFIX}:practitioner:{practitioner}"
+
+
+def _moved_key(day):
+	return frappe.cache().make_key(f"{CACHE_PREFIX}:moved:{day.isoformat()}")
+
+
+def _variant_key(showcancelled, filters):
+	if isinstance(filters, str):
+		filters = json.loads(filters or "{}")
+	digest = hashlib.md5(json.dumps(filters or {}, sort_keys=True, default=str).encode()).hexdigest()
+	return f"{int(bool(showcancelled))}:{digest}"
+
+
+def _iter_days(start, end):
+	first = getdate(start)
+	end_dt = get_datetime(end)
+	last = end_dt.date() if end_dt.time() == datetime.time() else add_days(end_dt.date(), 1)
+
+	days = []
+	day = first
+	while day < last:
+		days.append(day)
+		day = add_days(day, 1)
+	return days
+
+
+def get_cached_events(start, end, showcancelled, filters, loader):
+	"""
+	Serve calendar rows for [start, end) from per-day cache entries.
+	Days that are not cached are loaded with one `loader(start, end)` call covering them.
+	"""
+	cache = frappe.cache()
+	variant = _variant_key(showcancelled, filters)
+	days = _iter_days(start, end)
+
+	rows_by_day = {}
+	missing = []
+	for day in days:
+		rows = cache.hget(_day_key(day), variant)
+		if rows is None:
+			missing.append(day)
+		else:
+			rows_by_day[day] = rows
+
+	if missing:
+		loaded = {day: [] for day in missing}
+		for row in loader(str(missing[0]), str(add_days(missing[-1], 1))):
+			day = get_datetime(row.get("starts_at")).date()
+			if day in loaded:
+				loaded[day].append(row)
+
+		for day, rows in loaded.items():
+			_store_day(day, variant, rows)
+			rows_by_day[day] = rows
+
+	return [row for day in days for row in rows_by_day.get(day, [])]
+
+
+def _store_day(day, variant, rows):
+	cache = frappe.cache()
+	key = _day_key(day)
+	cache.hset(key, variant, rows)
+	cache.expire(cache.make_key(key), CACHE_TTL)
+
+	day_str = day.isoformat()
+	for practitioner in {row.get("resource") for row in rows if row.get("resource")}:
+		cache.sadd(_practitioner_key(practitioner), day_str)
+
+
+def _drop_keys(keys):
+	frappe.cache().delete_value(keys)
+
+
+def invalidate_days(*days):
+	"""Drop the days now and again on commit, so a read racing the transaction cannot re-cache old rows."""
+	keys = list({_day_key(getdate(day)) for day in days if day})
+	if keys:
+		_drop_keys(keys)
+		frappe.db.after_commit.add(lambda: _drop_keys(keys))
+
+
+def invalidate_practitioner(practitioner):
+	cache = frappe.cache()
+	key = _practitioner_key(practitioner)
+	days = [frappe.safe_decode(day) for day in cache.smembers(key) or []]
+	invalidate_days(*days)
+	cache.delete_value(key)
+
+
+def invalidate_appointment(appointment):
+	"""Drop the cached day of an appointment updated outside its document hooks."""
+	invalidate_days(frappe.db.get_value("Patient Appointment", appointment, "appointment_date"))
+
+
+def record_moved(day, appointment, timestamp):
+	"""Log on commit that 'appointment' left 'day' at 'timestamp'."""
+	key = _moved_key(getdate(day))
+
+	def record():
+		pipe = frappe.cache().pipeline()
+		pipe.zadd(key, {appointment: get_datetime(timestamp).timestamp()})
+		pipe.expire(key, MOVED_TTL)
+		pipe.execute()
+
+	frappe.db.after_commit.add(record)
+
+
+def get_moved(start, end, since):
+	"""Appointments that left a day of [start, end) after 'since', with the time they left."""
+	pipe = frappe.cache().pipeline(transaction=False)
+	for day in _iter_days(start, end):
+		pipe.zrangebyscore(_moved_key(day), get_datetime(since).timestamp(), "+inf", withscores=True)
+
+	moved = {}
+	for rows in pipe.execute():
+		for name, score in rows:
+			name = frappe.safe_decode(name)
+			moved[name] = max(moved.get(name, 0), score)
+	return {name: datetime.datetime.fromtimestamp(score) for name, score in moved.items()}
+
+
+def on_appointment_change(doc, method=None):
+	previous = doc.get_doc_before_save()
+	invalidate_days(doc.appointment_date, previous.appointment_date if previous else None)
+
+	if method == "on_trash":
+		record_moved(doc.appointment_date, doc.name, now_datetime())
+	elif previous and previous.appointment_date and getdate(previous.appointment_date) != getdate(doc.appointment_date):
+		record_moved(previous.appointment_date, doc.name, doc.modified)
+
+
+def on_patient_change(doc, method=None):
+	dates = frappe.get_all(
+		"Patient Appointment",
+		filters={"patient": doc.name, "appointment_date": (">=", add_days(getdate(), -31))},
+		pluck="appointment_date",
+		distinct=True,
+	)
+	invalidate_days(*dates)
+
+
+def on_practitioner_change(doc, method=None):
+	invalidate_practitioner(doc.name)
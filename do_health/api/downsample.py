@@ -0,0 +1,74 @@
+"""
+Server-side downsampling of (x, y) series for charts.
+
+`lttb` keeps the visual shape of a line (Largest-Triangle-Three-Buckets: the first and last
+points plus, per bucket, the point forming the largest triangle with its neighbours).
+`min_max` keeps the extremes of each bucket, which matters when spikes must never be hidden.
+Both are O(n) over points already sorted by x.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+Point = tuple[float, float]
+
+
+def lttb(points: Sequence[Point], threshold: int) -> list[Point]:
+	"""At most 'threshold' points of 'points' (sorted by x) that preserve the line's shape."""
+	if threshold >= len(points) or threshold <= 0:
+		return list(points)
+	if threshold < 3:
+		return [points[0], points[-1]][:threshold]
+
+	sampled = [points[0]]
+	# the first and last points are kept, the rest are split into threshold - 2 buckets
+	bucket_size = (len(points) - 2) / (threshold - 2)
+	previous = 0
+	for bucket in range(threshold - 2):
+		start = int(bucket * bucket_size) + 1
+		end = int((bucket + 1) * bucket_size) + 1
+
+		# the next bucket's average stands in for the point that will be picked there
+		next_start = end
+		next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+		next_points = points[next_start:next_end] or [points[-1]]
+		average_x = sum(x for x, _y in next_points) / len(next_points)
+		average_y = sum(y for _x, y in next_points) / len(next_points)
+
+		previous_x, previous_y = points[previous]
+		best_area = -1.0
+		best = start
+		for index in range(start, end):
+			x, y = points[index]
+			area = abs((previous_x - average_x) * (y - previous_y) - (previous_x - x) * (average_y - previous_y))
+			if area > best_area:
+				best_area = area
+				best = index
+		sampled.append(points[best])
+		previous = best
+
+	sampled.append(points[-1])
+	return sampled
+
+
+def min_max(points: Sequence[Point], threshold: int) -> list[Point]:
+	"""At most 'threshold' points of 'points' (sorted by x): the minimum and maximum of each bucket."""
+	if threshold >= len(points) or threshold <= 0:
+		return list(points)
+	buckets = max(threshold // 2, 1)
+	bucket_size = len(points) / buckets
+
+	sampled = []
+	for bucket in range(buckets):
+		chunk = points[int(bucket * bucket_size) : int((bucket + 1) * bucket_size)]
+		if not chunk:
+			continue
+		low = min(chunk, key=lambda point: point[1])
+		high = max(chunk, key=lambda point: point[1])
+		# keep x order inside the bucket so the series stays sorted
+		sampled.extend(sorted({low, high}))
+	return sampled
+
+
+METHODS = {"lttb": lttb, "min_max": min_max}
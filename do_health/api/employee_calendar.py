@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import datetime
+from collections.abc import Iterable
+from typing import Any, Final
+
+import frappe
+from frappe.utils import add_days, date_diff, getdate
+from erpnext.setup.doctype.employee.employee import get_holiday_list_for_employee
+
+CACHE_PREFIX: Final[str] = "do_health:employee_calendar"
+
+# Holiday lists and leaves are also edited by other apps and patches, so cached years expire daily.
+CACHE_TTL: Final[int] = 24 * 60 * 60
+
+# Day codes of a cached employee year, one byte per day starting on 1 January
+WORKING: Final[int] = 0
+HOLIDAY: Final[int] = 1
+LEAVE: Final[int] = 2
+HALF_DAY_LEAVE: Final[int] = 3
+
+
+def _years_key() -> str:
+	return f"{CACHE_PREFIX}:years"
+
+
+def _users_key() -> str:
+	return f"{CACHE_PREFIX}:users"
+
+
+def _year_field(employee: str, year: int) -> str:
+	return f"{employee}:{year}"
+
+
+def get_practitioner_employee(practitioner: Any) -> str | None:
+	"""Employee linked to a Healthcare Practitioner directly or through its user."""
+	if practitioner.get("employee"):
+		return practitioner.employee
+	if practitioner.get("user_id"):
+		return get_user_employees([practitioner.user_id]).get(practitioner.user_id)
+	return None
+
+
+def get_user_employees(users: Iterable[str]) -> dict[str, str]:
+	cache = frappe.cache()
+	users = [user for user in dict.fromkeys(users) if user]
+
+	employees = {}
+	missing = []
+	for user in users:
+		employee = cache.hget(_users_key(), user)
+		if employee is None:
+			missing.append(user)
+		elif employee:
+			employees[user] = employee
+
+	if missing:
+		found = {
+			row.user_id: row.name
+			for row in frappe.get_all(
+				"Employee", filters={"user_id": ["in", missing]}, fields=["name", "user_id"], order_by="creation asc"
+			)
+		}
+		for user in missing:
+			# "" remembers users without an employee so they are not looked up again
+			cache.hset(_users_key(), user, found.get(user, ""))
+		cache.expire(cache.make_key(_users_key()), CACHE_TTL)
+		employees.update(found)
+
+	return employees
+
+
+def _build_year(employee: str, year: int) -> bytes:
+	first = datetime.date(year, 1, 1)
+	last = datetime.date(year, 12, 31)
+	days = bytearray(date_diff(last, first) + 1)
+
+	holiday_list = get_holiday_list_for_employee(employee, raise_exception=False)
+	if holiday_list:
+		for holiday_date in frappe.get_all(
+			"Holiday",
+			filters={"parent": holiday_list, "holiday_date": ["between", [first, last]]},
+			pluck="holiday_date",
+		):
+			days[date_diff(holiday_date, first)] = HOLIDAY
+
+	if "hrms" in frappe.get_installed_apps():
+		for leave in frappe.get_all(
+			"Leave Application",
+			filters={"employee": employee, "docstatus": 1, "from_date": ["<=", last], "to_date": [">=", first]},
+			fields=["from_date", "to_date", "half_day"],
+			order_by="creation asc",
+		):
+			day = max(getdate(leave.from_date), first)
+			while day <= min(getdate(leave.to_date), last):
+				index = date_diff(day, first)
+				# holidays win over leave, and the first leave found on a day wins over later ones
+				if days[index] == WORKING:
+					days[index] = HALF_DAY_LEAVE if leave.half_day else LEAVE
+				day = add_days(day, 1)
+
+	return bytes(days)
+
+
+def get_year(employee: str, year: int) -> bytes:
+	cache = frappe.cache()
+	field = _year_field(employee, year)
+	days = cache.hget(_years_key(), field)
+	if days is None:
+		days = _build_year(employee, year)
+		cache.hset(_years_key(), field, days)
+		cache.expire(cache.make_key(_years_key()), CACHE_TTL)
+	return days
+
+
+def get_day_status(employee: str, date: Any) -> int:
+	"""WORKING, HOLIDAY, LEAVE or HALF_DAY_LEAVE for 'employee' on 'date'."""
+	date = getdate(date)
+	return get_year(employee, date.year)[date_diff(date, datetime.date(date.year, 1, 1))]
+
+
+def get_days_off(employee: str, from_date: Any, to_date: Any) -> dict[datetime.date, int]:
+	"""Non-working days of 'employee' in [from_date, to_date] with their day code."""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	days_off = {}
+	for year in range(from_date.year, to_date.year + 1):
+		first = datetime.date(year, 1, 1)
+		days = get_year(employee, year)
+		start = max(from_date, first)
+		end = min(to_date, datetime.date(year, 12, 31))
+		for index in range(date_diff(start, first), date_diff(end, first) + 1):
+			if days[index] != WORKING:
+				days_off[add_days(first, index)] = days[index]
+	return days_off
+
+
+def invalidate_employee(employee: str) -> None:
+	cache = frappe.cache()
+	prefix = f"{employee}:"
+	fields = [frappe.safe_decode(field) for field in cache.hkeys(_years_key()) or []]
+	for field in fields:
+		if field.startswith(prefix):
+			cache.hdel(_years_key(), field)
+
+
+def _drop_years() -> None:
+	frappe.cache().delete_value(_years_key())
+
+
+def _drop_employee(employee: str) -> None:
+	invalidate_employee(employee)
+	frappe.cache().delete_value(_users_key())
+
+
+def _after_commit(invalidate, *args) -> None:
+	"""Drop now and again on commit, so a read racing the transaction cannot cache the old days."""
+	invalidate(*args)
+	frappe.db.after_commit.add(lambda: invalidate(*args))
+
+
+def invalidate_all(doc=None, method=None):
+	"""Holiday lists can be shared by any number of employees, so drop every cached year."""
+	_after_commit(_drop_years)
+
+
+def on_leave_change(doc, method=None):
+	_after_commit(invalidate_employee, doc.employee)
+
+
+def on_employee_change(doc, method=None):
+	_after_commit(_drop_employee, doc.name)
@@ -1,6 +1,9 @@
 import frappe
 import datetime
 from frappe.model.naming import make_autoname
+from do_health.api.calendar_cache import invalidate_appointment
+from do_health.api.waiting_queue import sync_after_commit
+from do_health.api.realtime import publish_doc_update, related_rooms
 
 def patient_inserting(doc, method=None):
     if not doc.custom_file_number:
@@ -8,10 +11,10 @@ def patient_inserting(doc, method=None):
         doc.custom_file_number = frappe.model.naming.make_autoname(series)
 
 def patient_update(doc, method=None):
-    frappe.publish_realtime("patient_updated", doc)
+    publish_doc_update("patient_updated", doc)
 
 def medication_request_update(doc, method=None):
-    frappe.publish_realtime("medication_request_updated", doc)
+    publish_doc_update("medication_request_updated", doc, related_rooms(doc, "patient"))
 
 def patient_appointment_inserting(doc, method=None):
     if doc.status == 'Walked In':
@@ -22,23 +25,6 @@ def patient_appointment_inserting(doc, method=None):
         })
         # frappe.db.set_value("Patient Appointment", doc.appointment, "custom_visit_status", "Arrived")
 
-def patient_appointment_update(doc, method=None):
-    if not doc.has_value_changed("custom_visit_status"):
-        return
-
-    old_value = doc.get_doc_before_save().custom_visit_status if doc.get_doc_before_save() else None
-
-    frappe.publish_realtime(
-        event="do_health_waiting_list_update",
-        message={
-            "name": doc.name,
-            "patient": doc.patient,
-            "new_status": doc.custom_visit_status,
-            "old_status": old_value,
-        },
-        after_commit=True
-    )
-
 def patient_encounter_inserted(doc, method=None):
     if doc.appointment:
         # appointment = frappe.get_doc('Patient Appointment', doc.appointment)
@@ -49,9 +35,11 @@ def patient_encounter_inserted(doc, method=None):
         # })
         # appointment.save()
         frappe.db.set_value("Patient Appointment", doc.appointment, "custom_visit_status", "In Room")
+        invalidate_appointment(doc.appointment)
+        sync_after_commit(doc.appointment)
 
 def patient_encounter_update(doc, method=None):
-    frappe.publish_realtime("patient_encounter_updated", doc)
+    publish_doc_update("patient_encounter_updated", doc, related_rooms(doc, "patient", "appointment"))
 
 def patient_encounter_submit(doc, method=None):
     if doc.appointment:
@@ -63,8 +51,12 @@ def patient_encounter_submit(doc, method=None):
         # })
         # appointment.save()
         frappe.db.set_value("Patient Appointment", doc.appointment, "custom_visit_status", "Completed")
-    frappe.publish_realtime("patient_encounter_updated", doc)
+        invalidate_appointment(doc.appointment)
+        sync_after_commit(doc.appointment)
+    publish_doc_update("patient_encounter_updated", doc, related_rooms(doc, "patient", "appointment"))
 
 def clinical_procedure_submit(doc, method=None):
     if doc.appointment:
-        frappe.db.set_value("Patient Appointment", doc.appointment, "custom_visit_status", "Completed")
\ No newline at end of file
+        frappe.db.set_value("Patient Appointment", doc.appointment, "custom_visit_status", "Completed")
+        invalidate_appointment(doc.appointment)
+        sync_after_commit(doc.appointment)
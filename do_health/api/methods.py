@@ -3,6 +3,9 @@ from frappe import _
 import datetime
 import frappe.query_builder
 import frappe.query_builder.functions
+from frappe.query_builder import CustomFunction
+from frappe.query_builder.functions import Coalesce, IfNull, Max
+from pypika.terms import PseudoColumn
 from frappe.utils import (
 	nowdate,
 	add_to_date,
@@ -12,12 +15,12 @@ from frappe.utils import (
 	format_date,
 	format_datetime,
 	format_time,
-	fmt_money,
 	get_link_to_form,
 	get_time,
 	getdate,
 	cint,
 	cstr,
+	now_datetime,
 )
 from frappe.utils.file_manager import save_file
 from frappe.desk.form.save import cancel
@@ -26,9 +29,31 @@ from frappe.utils.pdf import get_pdf
 import os
 import base64
 import re
+import time
 from collections import defaultdict
 import json
-from do_health.do_health.doctype.patient_relationship.patient_relationship import _get_inverse_label
+from do_health.do_health.doctype.patient_relationship.patient_relationship import (
+	_get_inverse_label,
+	bulk_create as bulk_create_relationships,
+)
+from do_health.api.calendar_cache import get_cached_events, get_moved, invalidate_appointment, invalidate_days
+from do_health.api import employee_calendar, slot_config, waiting_queue
+from do_health.api.patient_overview import (
+	get_cached_overview,
+	invalidate_after_commit as invalidate_patient_overviews,
+)
+from do_health.api.slot_engine import build_open_slot_details
+from do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup import get_daily_counts, rebuild_days
+from do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day import get_days
+from do_health.do_health.doctype.appointment_activity.appointment_activity import (
+	get_log as get_appointment_activity_log,
+	record_status as record_appointment_status,
+)
+from do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot import (
+	get_summary as get_encounter_summary_snapshot,
+	get_summaries as get_encounter_summary_snapshots,
+	invalidate_for_appointments as invalidate_encounter_summary_snapshots,
+)
 from healthcare.healthcare.doctype.patient_insurance_policy.patient_insurance_policy import (
 	get_insurance_price_lists,
 	is_insurance_policy_valid,
@@ -106,18 +131,202 @@ THERAPY_FIELDS = [
 
 CODIFICATION_FIELDS = ["code_system", "code_value", "display", "definition"]
 
+# Patient Encounter child tables rendered by the encounter summary
+ENCOUNTER_SUMMARY_TABLES = [
+	"symptoms",
+	"diagnosis",
+	"custom_differential_diagnosis",
+	"codification_table",
+	"drug_prescription",
+	"lab_test_prescription",
+	"procedure_prescription",
+	"therapies",
+	"custom_annotations",
+	"custom_attachments",
+]
+
+APPOINTMENT_SUMMARY_FIELDS = [
+	"name",
+	"status",
+	"custom_visit_status",
+	"appointment_type",
+	"appointment_date",
+	"appointment_time",
+	"duration",
+	"practitioner",
+	"practitioner_name",
+	"department",
+	"service_unit",
+	"custom_visit_reason",
+	"notes",
+	"custom_appointment_category",
+]
+
+VISIT_SUMMARY_APPOINTMENT_FIELDS = [
+	"name",
+	"patient",
+	"patient_name",
+	"appointment_date",
+	"appointment_time",
+	"duration",
+	"practitioner",
+	"practitioner_name",
+	"department",
+	"service_unit",
+	"status",
+	"custom_visit_status",
+	"custom_visit_reason",
+	"notes",
+	"custom_appointment_category",
+	"appointment_type",
+]
+
+VITAL_SIGNS_FIELDS = [
+	"name",
+	"signs_date",
+	"signs_time",
+	"vital_signs_note",
+	"nutrition_note",
+] + VITAL_READING_FIELDS
+
+SERVICE_REQUEST_FIELDS = [
+	"name",
+	"order_date",
+	"order_time",
+	"expected_date",
+	"status",
+	"intent",
+	"priority",
+	"order_description",
+	"patient_care_type",
+	"order_group",
+	"order_reference_doctype",
+	"order_reference_name",
+	"staff_role",
+]
+
+MEDICATION_REQUEST_FIELDS = [
+	"name",
+	"medication",
+	"medication_item",
+	"order_date",
+	"order_time",
+	"expected_date",
+	"status",
+	"intent",
+	"priority",
+	"dosage",
+	"dosage_form",
+	"period",
+	"quantity",
+	"comment",
+	"order_description",
+]
+
+CLINICAL_PROCEDURE_FIELDS = [
+	"name",
+	"procedure_template",
+	"status",
+	"practitioner",
+	"practitioner_name",
+	"medical_department",
+	"start_date",
+	"start_time",
+	"service_request",
+	"notes",
+	"custom_pre_operative_diagnosis",
+	"custom_post_operative_diagnosis",
+]
+
+# Calendar event colour overrides by visit status (done appointments are shown in green)
+CALENDAR_STATUS_COLORS = {
+	"Done": "#008000",
+	"Completed": "#008000",
+}
+
+# Patient Appointment columns the calendar feed can be filtered on
+CALENDAR_FILTER_FIELDS = ["practitioner", "department", "service_unit"]
+
+# A row can commit a little after its 'modified' timestamp, so delta reads start this long before
+# the cursor; the client replaces rows it reads twice by name.
+CALENDAR_CURSOR_OVERLAP = datetime.timedelta(seconds=60)
+
+# Columnar calendar payload: lookup table -> (row id column, deduplicated columns)
+CALENDAR_LOOKUPS = {
+	"patients": ("patient", ["image", "file_number", "full_name", "mobile", "birthdate", "cpr", "gender"]),
+	"practitioners": ("resource", ["practitioner_name", "background_color", "text_color"]),
+	"rooms": ("room_id", ["room", "room_name"]),
+}
+
 
 @frappe.whitelist()
 def get_encounter_summary(encounter: str):
 	if not encounter:
 		frappe.throw(_("Encounter is required"))
 
-	encounter_doc = frappe.get_doc("Patient Encounter", encounter)
+	return get_encounter_summary_snapshot(encounter)
+
+
+def build_encounter_summary(encounter_doc):
+	return _assemble_encounter_summary(
+		encounter_doc,
+		appointment=_build_appointment_summary(encounter_doc.appointment),
+		vitals=_build_vital_records(encounter_doc),
+		service_requests=_get_service_requests(encounter_doc.name),
+		medication_requests=_get_medication_requests(encounter_doc.name),
+		clinical_procedures=_get_clinical_procedures(encounter_doc.name),
+	)
+
+
+def build_encounter_summaries(encounter_names):
+	"""Summaries of many encounters with one query per doctype / child table; keyed by encounter."""
+	encounter_names = list(dict.fromkeys(name for name in encounter_names if name))
+	if not encounter_names:
+		return {}
+
+	encounters = {
+		row.name: row
+		for row in frappe.get_all(
+			"Patient Encounter", filters={"name": ["in", encounter_names]}, fields=["*"]
+		)
+	}
+	_attach_child_tables("Patient Encounter", encounters, ENCOUNTER_SUMMARY_TABLES)
+
+	appointment_names = [row.appointment for row in encounters.values() if row.appointment]
+	appointments = _get_appointment_summaries(appointment_names)
+	vitals_by_encounter = _group_vitals(
+		_fetch_vitals_bulk(["encounter", "in", list(encounters)]), "encounter"
+	)
+	vitals_by_appointment = _group_vitals(
+		_fetch_vitals_bulk(["appointment", "in", appointment_names]), "appointment"
+	)
+	service_requests = _get_service_requests_bulk(list(encounters))
+	medication_requests = _get_medication_requests_bulk(list(encounters))
+	clinical_procedures = _group_by(
+		_fetch_clinical_procedures(["custom_patient_encounter", "in", list(encounters)]),
+		"custom_patient_encounter",
+	)
+
+	return {
+		name: _assemble_encounter_summary(
+			encounter_doc,
+			appointment=appointments.get(encounter_doc.appointment),
+			vitals=vitals_by_encounter.get(name) or vitals_by_appointment.get(encounter_doc.appointment) or [],
+			service_requests=service_requests.get(name, []),
+			medication_requests=medication_requests.get(name, []),
+			clinical_procedures=clinical_procedures.get(name, []),
+		)
+		for name, encounter_doc in encounters.items()
+	}
+
 
+def _assemble_encounter_summary(
+	encounter_doc, appointment, vitals, service_requests, medication_requests, clinical_procedures
+):
 	return {
 		"encounter": _build_encounter_header(encounter_doc),
-		"appointment": _build_appointment_summary(encounter_doc.appointment),
-		"vitals": _build_vital_records(encounter_doc),
+		"appointment": appointment,
+		"vitals": vitals,
 		"symptoms": _build_child_rows(encounter_doc.symptoms, ["complaint"]),
 		"diagnoses": _build_child_rows(encounter_doc.diagnosis, ["diagnosis"]),
 		"differential_diagnosis": _build_child_rows(
@@ -128,9 +337,9 @@ def get_encounter_summary(encounter: str):
 		"lab_prescriptions": _build_child_rows(encounter_doc.lab_test_prescription, LAB_PRESCRIPTION_FIELDS),
 		"procedure_prescriptions": _build_child_rows(encounter_doc.procedure_prescription, PROCEDURE_PRESCRIPTION_FIELDS),
 		"therapies": _build_child_rows(encounter_doc.therapies, THERAPY_FIELDS),
-		"service_requests": _get_service_requests(encounter_doc.name),
-		"medication_requests": _get_medication_requests(encounter_doc.name),
-		"clinical_procedures": _get_clinical_procedures(encounter_doc.name),
+		"service_requests": service_requests,
+		"medication_requests": medication_requests,
+		"clinical_procedures": clinical_procedures,
 		"annotations": _build_child_rows(encounter_doc.get("custom_annotations") or [], ["annotation", "type"]),
 		"attachments": _build_child_rows(encounter_doc.get("custom_attachments") or [], ["attachment_name", "attachment"]),
 		"notes": {
@@ -145,29 +354,39 @@ def get_encounter_summary(encounter: str):
 	}
 
 
+def _attach_child_tables(doctype, parents, fieldnames):
+	"""Load the child rows of 'parents' (name -> dict) for 'fieldnames' with one query per table."""
+	meta = frappe.get_meta(doctype)
+	for fieldname in fieldnames:
+		for parent in parents.values():
+			parent[fieldname] = []
+		df = meta.get_field(fieldname)
+		if not df or not parents:
+			continue
+		for row in frappe.get_all(
+			df.options,
+			filters={"parenttype": doctype, "parentfield": fieldname, "parent": ["in", list(parents)]},
+			fields=["*"],
+			order_by="idx asc",
+		):
+			parents[row.parent][fieldname].append(row)
+
+
+def _group_by(records, fieldname):
+	"""Group records by 'fieldname', dropping that helper column from each record."""
+	grouped = defaultdict(list)
+	for record in records:
+		grouped[record.pop(fieldname, None)].append(record)
+	return grouped
+
+
 @frappe.whitelist()
 def get_appointment_visit_summary(appointment: str):
 	if not appointment:
 		frappe.throw(_("Patient Appointment is required"))
-	fields = [
-		"name",
-		"patient",
-		"patient_name",
-		"appointment_date",
-		"appointment_time",
-		"duration",
-		"practitioner",
-		"practitioner_name",
-		"department",
-		"service_unit",
-		"status",
-		"custom_visit_status",
-		"custom_visit_reason",
-		"notes",
-		"custom_appointment_category",
-		"appointment_type",
-	]
-	appointment_doc = frappe.db.get_value("Patient Appointment", appointment, fields, as_dict=1)
+	appointment_doc = frappe.db.get_value(
+		"Patient Appointment", appointment, VISIT_SUMMARY_APPOINTMENT_FIELDS, as_dict=1
+	)
 	if not appointment_doc:
 		frappe.throw(_("Appointment {0} not found").format(appointment))
 
@@ -202,6 +421,65 @@ def get_appointment_visit_summary(appointment: str):
 	}
 
 
+@frappe.whitelist()
+def get_appointment_visit_summaries(appointments):
+	"""
+	get_appointment_visit_summary for many appointments at once, keyed by appointment.
+	Encounters, vitals, requests and procedures are loaded with one IN (...) query per doctype.
+	"""
+	appointments = _as_list(frappe.parse_json(appointments) if isinstance(appointments, str) else appointments)
+	if not appointments:
+		return {}
+
+	appointment_rows = {
+		row.name: row
+		for row in frappe.get_all(
+			"Patient Appointment",
+			filters={"name": ["in", appointments]},
+			fields=VISIT_SUMMARY_APPOINTMENT_FIELDS,
+		)
+	}
+
+	encounter_by_appointment = {}
+	for row in frappe.get_all(
+		"Patient Encounter",
+		filters={"appointment": ["in", list(appointment_rows)]},
+		fields=["name", "appointment"],
+		order_by="creation desc",
+	):
+		encounter_by_appointment.setdefault(row.appointment, row.name)
+
+	summaries = get_encounter_summary_snapshots(list(encounter_by_appointment.values()))
+
+	without_encounter = [name for name in appointment_rows if name not in encounter_by_appointment]
+	vitals = _group_vitals(_fetch_vitals_bulk(["appointment", "in", without_encounter]), "appointment")
+	clinical = _group_by(_fetch_clinical_procedures(["appointment", "in", without_encounter]), "appointment")
+
+	result = {}
+	for name, appointment_doc in appointment_rows.items():
+		encounter_name = encounter_by_appointment.get(name)
+		encounter_summary = summaries.get(encounter_name) if encounter_name else None
+		if encounter_summary:
+			result[name] = {
+				"appointment": appointment_doc,
+				"encounter_name": encounter_name,
+				"encounter_summary": encounter_summary,
+				"procedures": encounter_summary.get("procedure_prescriptions") or [],
+				"clinical_procedures": encounter_summary.get("clinical_procedures") or [],
+				"vitals": encounter_summary.get("vitals") or [],
+			}
+		else:
+			result[name] = {
+				"appointment": appointment_doc,
+				"encounter_name": encounter_name,
+				"encounter_summary": None,
+				"procedures": [],
+				"clinical_procedures": clinical.get(name, []),
+				"vitals": vitals.get(name, []),
+			}
+	return result
+
+
 def _build_encounter_header(encounter_doc):
 	return {
 		"name": encounter_doc.name,
@@ -223,28 +501,22 @@ def _build_encounter_header(encounter_doc):
 def _build_appointment_summary(appointment_name):
 	if not appointment_name:
 		return None
-	fields = [
-		"name",
-		"status",
-		"custom_visit_status",
-		"appointment_type",
-		"appointment_date",
-		"appointment_time",
-		"duration",
-		"practitioner",
-		"practitioner_name",
-		"department",
-		"service_unit",
-		"custom_visit_reason",
-		"notes",
-		"custom_appointment_category",
-	]
-	appointment = frappe.db.get_value("Patient Appointment", appointment_name, fields, as_dict=1)
-	if not appointment:
-		return None
-	appointment["appointment_date_label"] = _format_date(appointment.get("appointment_date"))
-	appointment["appointment_time_label"] = _format_time(appointment.get("appointment_time"))
-	return appointment
+	return _get_appointment_summaries([appointment_name]).get(appointment_name)
+
+
+def _get_appointment_summaries(appointment_names):
+	appointment_names = [name for name in appointment_names if name]
+	if not appointment_names:
+		return {}
+	appointments = frappe.get_all(
+		"Patient Appointment",
+		filters={"name": ["in", appointment_names]},
+		fields=APPOINTMENT_SUMMARY_FIELDS,
+	)
+	for appointment in appointments:
+		appointment["appointment_date_label"] = _format_date(appointment.get("appointment_date"))
+		appointment["appointment_time_label"] = _format_time(appointment.get("appointment_time"))
+	return {appointment.name: appointment for appointment in appointments}
 
 
 def _build_vital_records(encounter_doc):
@@ -263,142 +535,119 @@ def _build_vitals_for_appointment(appointment_name):
 def _fetch_vitals(filter_conditions, limit=3):
 	if not filter_conditions:
 		return []
-	vital_fields = [
-		"name",
-		"signs_date",
-		"signs_time",
-		"vital_signs_note",
-		"nutrition_note",
-	] + VITAL_READING_FIELDS
 	vitals = frappe.get_all(
 		"Vital Signs",
 		filters=filter_conditions,
-		fields=vital_fields,
+		fields=VITAL_SIGNS_FIELDS,
 		order_by="signs_date desc, signs_time desc, creation desc",
 		limit_page_length=limit or 3,
 	)
+	return [_label_vital(vital) for vital in vitals]
+
+
+def _fetch_vitals_bulk(condition):
+	"""Vital Signs matching one ["field", "in", values] condition, newest first, unlabelled."""
+	if not condition[2]:
+		return []
+	fields = VITAL_SIGNS_FIELDS + ["encounter", "appointment"]
+	return frappe.get_all(
+		"Vital Signs",
+		filters=[["docstatus", "<", 2], condition],
+		fields=fields,
+		order_by="signs_date desc, signs_time desc, creation desc",
+	)
+
+
+def _group_vitals(vitals, fieldname, limit=3):
+	"""The latest 'limit' readings per 'fieldname', matching _fetch_vitals for a single key."""
+	grouped = defaultdict(list)
 	for vital in vitals:
-		vital["signs_date_label"] = _format_date(vital.get("signs_date"))
-		vital["signs_time_label"] = _format_time(vital.get("signs_time"))
-		vital["readings"] = {
-			field: vital.get(field)
-			for field in VITAL_READING_FIELDS
-			if vital.get(field) not in (None, "")
-		}
-	return vitals
+		rows = grouped[vital.get(fieldname)]
+		if len(rows) < limit:
+			vital = frappe._dict(vital)
+			vital.pop("encounter", None)
+			vital.pop("appointment", None)
+			rows.append(_label_vital(vital))
+	return grouped
+
+
+def _label_vital(vital):
+	vital["signs_date_label"] = _format_date(vital.get("signs_date"))
+	vital["signs_time_label"] = _format_time(vital.get("signs_time"))
+	vital["readings"] = {
+		field: vital.get(field)
+		for field in VITAL_READING_FIELDS
+		if vital.get(field) not in (None, "")
+	}
+	return vital
 
 
 def _get_service_requests(encounter_name):
-	filters = [["docstatus", "<", 2]]
-	or_filters = [["order_group", "=", encounter_name], ["order_reference_name", "=", encounter_name]]
-	fields = [
-		"name",
-		"order_date",
-		"order_time",
-		"expected_date",
-		"status",
-		"intent",
-		"priority",
-		"order_description",
-		"patient_care_type",
-		"order_group",
-		"order_reference_doctype",
-		"order_reference_name",
-		"staff_role",
-	]
+	return _get_service_requests_bulk([encounter_name]).get(encounter_name, [])
+
+
+def _get_service_requests_bulk(encounter_names):
+	"""Service requests ordered by or referencing each encounter, keyed by encounter."""
+	if not encounter_names:
+		return {}
+	or_filters = [["order_group", "in", encounter_names], ["order_reference_name", "in", encounter_names]]
 	records = frappe.get_all(
 		"Service Request",
-		filters=filters,
+		filters=[["docstatus", "<", 2]],
 		or_filters=or_filters,
-		fields=fields,
+		fields=SERVICE_REQUEST_FIELDS,
 		order_by="order_date desc, creation desc",
 	)
+	wanted = set(encounter_names)
+	grouped = defaultdict(list)
 	for record in records:
-		record["order_date_label"] = _format_date(record.get("order_date"))
-		record["order_time_label"] = _format_time(record.get("order_time"))
-		record["expected_date_label"] = _format_date(record.get("expected_date"))
-	return records
+		_label_order(record)
+		for encounter in {record.get("order_group"), record.get("order_reference_name")} & wanted:
+			grouped[encounter].append(record)
+	return grouped
 
 
 def _get_medication_requests(encounter_name):
-	filters = [["docstatus", "<", 2], ["order_group", "=", encounter_name]]
-	fields = [
-		"name",
-		"medication",
-		"medication_item",
-		"order_date",
-		"order_time",
-		"expected_date",
-		"status",
-		"intent",
-		"priority",
-		"dosage",
-		"dosage_form",
-		"period",
-		"quantity",
-		"comment",
-		"order_description",
-	]
+	return _get_medication_requests_bulk([encounter_name]).get(encounter_name, [])
+
+
+def _get_medication_requests_bulk(encounter_names):
+	"""Medication requests of each encounter, keyed by encounter."""
+	if not encounter_names:
+		return {}
 	records = frappe.get_all(
 		"Medication Request",
-		filters=filters,
-		fields=fields,
+		filters=[["docstatus", "<", 2], ["order_group", "in", encounter_names]],
+		fields=MEDICATION_REQUEST_FIELDS + ["order_group"],
 		order_by="order_date desc, creation desc",
 	)
-	for record in records:
-		record["order_date_label"] = _format_date(record.get("order_date"))
-		record["order_time_label"] = _format_time(record.get("order_time"))
-		record["expected_date_label"] = _format_date(record.get("expected_date"))
-	return records
+	return _group_by([_label_order(record) for record in records], "order_group")
+
+
+def _label_order(record):
+	record["order_date_label"] = _format_date(record.get("order_date"))
+	record["order_time_label"] = _format_time(record.get("order_time"))
+	record["expected_date_label"] = _format_date(record.get("expected_date"))
+	return record
 
 
 def _get_clinical_procedures(encounter_name):
-	filters = [["docstatus", "<", 2], ["custom_patient_encounter", "=", encounter_name]]
-	fields = [
-		"name",
-		"procedure_template",
-		"status",
-		"practitioner",
-		"practitioner_name",
-		"medical_department",
-		"start_date",
-		"start_time",
-		"service_request",
-		"notes",
-		"custom_pre_operative_diagnosis",
-		"custom_post_operative_diagnosis",
-	]
-	records = frappe.get_all(
-		"Clinical Procedure",
-		filters=filters,
-		fields=fields,
-		order_by="start_date desc, creation desc",
-	)
-	for record in records:
-		record["start_date_label"] = _format_date(record.get("start_date"))
-		record["start_time_label"] = _format_time(record.get("start_time"))
-	return records
+	return _fetch_clinical_procedures(["custom_patient_encounter", "=", encounter_name])
 
 
 def _get_clinical_procedures_for_appointment(appointment_name):
-	filters = [["docstatus", "<", 2], ["appointment", "=", appointment_name]]
-	fields = [
-		"name",
-		"procedure_template",
-		"status",
-		"practitioner",
-		"practitioner_name",
-		"medical_department",
-		"start_date",
-		"start_time",
-		"service_request",
-		"notes",
-		"custom_pre_operative_diagnosis",
-		"custom_post_operative_diagnosis",
-	]
+	return _fetch_clinical_procedures(["appointment", "=", appointment_name])
+
+
+def _fetch_clinical_procedures(condition):
+	if condition[1] == "in" and not condition[2]:
+		return []
+	fields = list(CLINICAL_PROCEDURE_FIELDS)
+	if condition[1] == "in":
+		fields.append(condition[0])
 	records = frappe.get_all(
 		"Clinical Procedure",
-		filters=filters,
+		filters=[["docstatus", "<", 2], condition],
 		fields=fields,
 		order_by="start_date desc, creation desc",
 	)
@@ -457,14 +706,23 @@ def _format_time(value):
 def get_patient_overview(patient: str, appointment: str | None = None):
 	if not patient:
 		frappe.throw(_("Patient is required"))
+	frappe.has_permission("Patient", doc=patient, throw=True)
+
+	overview = get_cached_overview(patient, _build_patient_overview)
+	if appointment:
+		# the appointment being viewed replaces the cached "next" appointment
+		overview = dict(overview, upcoming_appointment=_get_upcoming_appointment(patient, appointment))
+	return overview
+
 
+def _build_patient_overview(patient):
 	patient_doc = frappe.get_doc("Patient", patient)
 
 	return {
 		"patient": _build_patient_overview_header(patient_doc),
 		"contact": _build_patient_contact(patient_doc),
 		"emergency_contact": _build_emergency_contact(patient_doc),
-		"upcoming_appointment": _get_upcoming_appointment(patient_doc.name, appointment),
+		"upcoming_appointment": _get_upcoming_appointment(patient_doc.name),
 		"last_encounter": _get_last_encounter(patient_doc.name),
 		"vitals": _fetch_vitals([["docstatus", "<", 2], ["patient", "=", patient_doc.name]], limit=1),
 		"counts": {
@@ -689,6 +947,103 @@ def create_patient_relationship(patient: str, related_patient: str, relation: st
 	return {"name": doc.name}
 
 
+@frappe.whitelist()
+def create_patient_relationships(relationships):
+	"""Create many {patient, related_patient, relation, notes} edges (and their inverses) in one pass."""
+	relationships = frappe.parse_json(relationships) if isinstance(relationships, str) else relationships
+	for relationship in relationships or []:
+		# checked per edge so user permissions on either patient apply
+		doc = frappe.get_doc(
+			{
+				"doctype": "Patient Relationship",
+				"patient": relationship.get("patient"),
+				"related_patient": relationship.get("related_patient"),
+			}
+		)
+		frappe.has_permission("Patient Relationship", "create", doc=doc, throw=True)
+	return {"names": bulk_create_relationships(relationships or [])}
+
+
+# Longest walk get_patient_relationship_graph allows, and the node count it stops at
+RELATIONSHIP_GRAPH_MAX_DEPTH = 5
+RELATIONSHIP_GRAPH_MAX_NODES = 500
+
+
+@frappe.whitelist()
+def get_patient_relationship_graph(patient: str, depth: int = 2):
+	"""
+	Patients reachable from 'patient' through Patient Relationship edges, breadth-first up to
+	'depth' hops with one query per level. Edges leading back to an already reached patient
+	are returned with closes_cycle set and are not followed again.
+	"""
+	if not patient:
+		frappe.throw(_("Patient is required"))
+	frappe.has_permission("Patient", doc=patient, throw=True)
+	depth = min(max(cint(depth), 1), RELATIONSHIP_GRAPH_MAX_DEPTH)
+
+	depths = {patient: 0}
+	edges = {}
+	frontier = [patient]
+	truncated = False
+	for level in range(1, depth + 1):
+		if not frontier:
+			break
+		rows = frappe.get_all(
+			"Patient Relationship",
+			or_filters={"patient": ["in", frontier], "related_patient": ["in", frontier]},
+			fields=["patient", "related_patient", "relation", "inverse_relation"],
+		)
+		next_frontier = []
+		for row in rows:
+			# each edge is stored in both directions; keep one per pair, oriented away from the walk
+			if row.patient in depths and depths[row.patient] == level - 1:
+				source, target = row.patient, row.related_patient
+				relation = row.relation
+			else:
+				source, target = row.related_patient, row.patient
+				relation = row.inverse_relation or _get_inverse_label(row.relation)
+			pair = frozenset((source, target))
+			if pair in edges:
+				continue
+
+			closes_cycle = target in depths
+			if not closes_cycle:
+				if len(depths) >= RELATIONSHIP_GRAPH_MAX_NODES:
+					truncated = True
+					continue
+				depths[target] = level
+				next_frontier.append(target)
+			edges[pair] = {"source": source, "target": target, "relation": relation, "closes_cycle": closes_cycle}
+		frontier = next_frontier
+
+	details = {
+		row.name: row
+		for row in frappe.get_all(
+			"Patient",
+			fields=["name", "patient_name", "sex", "dob", "image", "custom_file_number", "custom_cpr"],
+			filters={"name": ["in", list(depths)]},
+		)
+	}
+	nodes = []
+	for name, level in depths.items():
+		detail = details.get(name, {})
+		nodes.append(
+			{
+				"patient": name,
+				"depth": level,
+				"patient_name": detail.get("patient_name") or name,
+				"gender": detail.get("sex"),
+				"dob": detail.get("dob"),
+				"age": _calculate_age_years(detail.get("dob")),
+				"patient_image": detail.get("image"),
+				"file_number": detail.get("custom_file_number"),
+				"cpr": detail.get("custom_cpr"),
+			}
+		)
+
+	return {"root": patient, "nodes": nodes, "edges": list(edges.values()), "truncated": truncated}
+
+
 def _get_upcoming_appointment(patient_name, appointment_name=None):
 	fields = [
 		"name",
@@ -776,351 +1131,333 @@ def get_visit_log(appointment_id):
 	if not appointment_id:
 		frappe.throw(_('Patient Appointment is required'))
 
-	appointment = frappe.get_doc('Patient Appointment', appointment_id)
-	entries = []
-	financial_totals = {}
+	return get_appointment_activity_log(appointment_id)
 
-	def get_user_display(user):
-		if not user:
-			return None
-		full_name = frappe.db.get_value('User', user, 'full_name')
-		return full_name or user
-
-	def add_entry(entry_type, timestamp, title, description=None, *, badge=None, doc=None, reference=None, user=None, extra=None, tag=None):
-		if not timestamp:
-			timestamp = appointment.creation
-
-		datetime_value = get_datetime(timestamp)
-		entry = frappe._dict({
-			"type": entry_type,
-			"_sort_ts": datetime_value,
-			"timestamp": get_datetime_str(datetime_value),
-			"date": format_date(datetime_value),
-			"time": format_datetime(datetime_value, "HH:mm"),
-			"title": title,
-		})
+@frappe.whitelist()
+def change_status(docname, status):
+	doc = frappe.get_doc('Patient Appointment', docname)
+	doc.custom_visit_status = status
+	# doc.append("custom_appointment_time_logs", {
+	# 	"status": status,
+	# 	"time": datetime.datetime.now()
+	# })
+	doc.save()
+
+
+NO_SHOW_GRACE_MINUTES = 15
+NO_SHOW_BATCH_SIZE = 500
+NO_SHOW_RUNS_KEY = "do_health:no_show_runs"
+NO_SHOW_RUNS_KEPT = 200
+TIME_LOG_FIELDS = [
+	"name", "creation", "modified", "owner", "modified_by",
+	"parent", "parenttype", "parentfield", "idx", "status", "time",
+]
 
-		if description:
-			entry["description"] = description
-		if badge:
-			entry["badge"] = badge
-		if doc:
-			entry["doc"] = doc
-		if reference:
-			entry["reference"] = reference
-		if extra:
-			entry["extra"] = extra
-		if tag:
-			entry["tag"] = tag
-		if user:
-			entry["user"] = get_user_display(user)
-
-		entries.append(entry)
-
-	# Status timeline
-	status_logs = frappe.get_all(
-		'Appointment Time Logs',
-		filters={'parent': appointment_id},
-		fields=['status', 'time', 'owner', 'modified_by', 'modified', 'creation'],
-		order_by='time asc, creation asc'
+def mark_no_show_appointments():
+	# mark today's appointments as no-show once the appointment time has passed 15 minutes
+	started = time.monotonic()
+	run_at = frappe.utils.now_datetime()
+	cutoff = run_at - datetime.timedelta(minutes=NO_SHOW_GRACE_MINUTES)
+
+	appo = frappe.qb.DocType("Patient Appointment")
+	appointments = (
+		frappe.qb.from_(appo)
+		.select(appo.name, appo.patient, appo.custom_status_timestamps)
+		.where(appo.appointment_datetime >= datetime.datetime.combine(run_at.date(), datetime.time()))
+		.where(appo.appointment_datetime <= cutoff)
+		.where(appo.custom_visit_status == "Scheduled")
+		.for_update()
+		.run(as_dict=True)
 	)
 
-	for log in status_logs:
-		user_id = log.modified_by or log.owner
-		add_entry(
-			'status',
-			log.time or log.modified or log.creation,
-			_('Status updated to {0}').format(log.status),
-			badge=log.status,
-			user=user_id
-		)
+	for start in range(0, len(appointments), NO_SHOW_BATCH_SIZE):
+		_mark_no_show_batch(appointments[start:start + NO_SHOW_BATCH_SIZE], run_at)
 
-	if not status_logs:
-		user_id = appointment.modified_by or appointment.owner
-		current_status = appointment.get('custom_visit_status') or appointment.status or _('Unknown')
-		add_entry(
-			'status',
-			appointment.modified or appointment.creation,
-			_('Current status: {0}').format(current_status),
-			badge=current_status,
-			user=user_id
+	if appointments:
+		invalidate_days(run_at.date())
+		rebuild_days(run_at.date())
+		frappe.publish_realtime(
+			"appointment_update",
+			{"appointments": [row.name for row in appointments], "custom_visit_status": "No Show"},
+			after_commit=True,
 		)
 
-	# Billing & payments timeline
-	invoice_context = {}
-	if appointment.ref_sales_invoice:
-		invoice_context[appointment.ref_sales_invoice] = {
-			'label': _('Patient Invoice'),
-			'kind': 'patient'
-		}
-	if appointment.custom_insurance_sales_invoice:
-		invoice_context.setdefault(appointment.custom_insurance_sales_invoice, {
-			'label': _('Insurance Invoice'),
-			'kind': 'insurance'
-		})
+	_record_no_show_run(run_at, len(appointments), started)
+
+def _mark_no_show_batch(appointments, run_at):
+	"""Status, status timestamps and one time log per appointment, in one statement per table."""
+	names = [row.name for row in appointments]
+	log = frappe.qb.DocType("Appointment Time Logs")
+	last_idx = dict(
+		frappe.qb.from_(log)
+		.select(log.parent, Max(log.idx))
+		.where(log.parenttype == "Patient Appointment")
+		.where(log.parent.isin(names))
+		.groupby(log.parent)
+		.run()
+	)
 
-	invoice_names = list(invoice_context.keys())
-	invoice_map = {}
-
-	if invoice_names:
-		invoice_docs = frappe.get_all(
-			'Sales Invoice',
-			filters={'name': ('in', invoice_names)},
-			fields=[
-				'name', 'posting_date', 'posting_time', 'status', 'grand_total',
-				'outstanding_amount', 'paid_amount', 'currency', 'customer',
-				'docstatus', 'owner', 'creation', 'modified'
-			]
+	user = frappe.session.user
+	updates = {}
+	time_logs = []
+	for row in appointments:
+		stamps = json.loads(row.custom_status_timestamps or "{}")
+		first = (stamps.get("No Show") or {}).get("first") or str(run_at)
+		stamps["No Show"] = {"first": first, "last": str(run_at)}
+		updates[row.name] = {"custom_visit_status": "No Show", "custom_status_timestamps": json.dumps(stamps)}
+		time_logs.append((
+			frappe.generate_hash(length=10), run_at, run_at, user, user,
+			row.name, "Patient Appointment", "custom_appointment_time_logs",
+			(last_idx.get(row.name) or 0) + 1, "No Show", run_at,
+		))
+
+	frappe.db.bulk_update("Patient Appointment", updates, chunk_size=len(updates), modified=run_at)
+	frappe.db.bulk_insert("Appointment Time Logs", TIME_LOG_FIELDS, time_logs)
+	# bulk writes skip the Patient Appointment hooks that keep these in step
+	record_appointment_status(names)
+	invalidate_encounter_summary_snapshots(names)
+	invalidate_patient_overviews(*{row.patient for row in appointments})
+
+def _record_no_show_run(run_at, marked, started):
+	summary = {
+		"run_at": str(run_at),
+		"marked": marked,
+		"duration_ms": round((time.monotonic() - started) * 1000, 1),
+	}
+	cache = frappe.cache()
+	cache.lpush(NO_SHOW_RUNS_KEY, json.dumps(summary))
+	cache.ltrim(NO_SHOW_RUNS_KEY, 0, NO_SHOW_RUNS_KEPT - 1)
+	frappe.logger("do_health").info({"no_show_run": summary})
+
+@frappe.whitelist()
+def get_no_show_runs(limit=50):
+	"""Most recent mark_no_show_appointments runs, newest first."""
+	frappe.only_for("System Manager")
+	runs = frappe.cache().lrange(NO_SHOW_RUNS_KEY, 0, min(cint(limit) or 50, NO_SHOW_RUNS_KEPT) - 1)
+	return [json.loads(frappe.safe_decode(run)) for run in runs or []]
+ 
+@frappe.whitelist()
+def get_events_full_calendar(start, end, filters=None, field_map=None, since=None, delta=0, format=None):
+	"""
+	Return calendar events between 'start' and 'end'.
+	:param since: Cursor returned by a previous delta fetch; only rows modified after it are returned
+	:param delta: When set, return a dict with 'events', 'removed' and the next 'cursor' instead of a list
+	:param format: 'columnar' to return column arrays with deduplicated patient/practitioner/room lookups
+	:param filters: Optional practitioner/department/service_unit values (single or list), plus
+		'resource_start' and 'resource_page_length' to page through practitioners
+	"""
+	field_map = json.loads(field_map)
+	filters = _parse_calendar_filters(filters)
+
+	floor = get_datetime(since) - CALENDAR_CURSOR_OVERLAP if since else None
+	if since:
+		# deltas are already small, serve them straight from the database
+		data = _query_calendar_events(start, end, field_map, since=floor, filters=filters)
+	else:
+		data = get_cached_events(
+			start,
+			end,
+			field_map['showcancelled'],
+			filters,
+			lambda range_start, range_end: _query_calendar_events(range_start, range_end, field_map, filters=filters),
 		)
+	removed = _get_calendar_tombstones(start, end, floor, _get_event_names(data)) if since else {}
+	cursor = _get_calendar_cursor(data, removed, since)
 
-		for invoice in invoice_docs:
-			invoice = frappe._dict(invoice)
-			invoice_map[invoice.name] = invoice
-			context = invoice_context.get(invoice.name, {})
-			label = context.get('label') or _('Invoice')
+	if format == "columnar":
+		data = _encode_columnar_events(data)
+	else:
+		_apply_status_colors(data)
 
-			if invoice.posting_date:
-				posting_time = invoice.posting_time or '00:00:00'
-				timestamp_candidate = f"{invoice.posting_date} {posting_time}"
-			else:
-				timestamp_candidate = invoice.creation
-
-			amount_label = fmt_money(invoice.grand_total or 0, currency=invoice.currency)
-			description_parts = [_('Total {0}').format(amount_label)]
-			if flt(invoice.paid_amount):
-				description_parts.append(_('Paid {0}').format(fmt_money(invoice.paid_amount, currency=invoice.currency)))
-			if flt(invoice.outstanding_amount):
-				description_parts.append(_('Outstanding {0}').format(fmt_money(invoice.outstanding_amount, currency=invoice.currency)))
-
-			extra = []
-			# if invoice.customer:
-			# 	extra.append({'label': _('Customer'), 'value': invoice.customer})
-
-			add_entry(
-				'billing',
-				timestamp_candidate,
-				_('{0} {1}').format(label, invoice.name),
-				description=' | '.join(description_parts),
-				badge=invoice.status,
-				doc={'doctype': 'Sales Invoice', 'name': invoice.name, 'label': invoice.name},
-				user=invoice.owner,
-				extra=extra,
-				tag=label
-			)
+	if not cint(delta):
+		return data
 
-			totals = financial_totals.setdefault(
-				invoice.currency or '',
-				{'currency': invoice.currency, 'total_billed': 0.0, 'total_paid': 0.0, 'total_outstanding': 0.0}
-			)
-			totals['total_billed'] += flt(invoice.grand_total or 0)
-			totals['total_paid'] += flt(invoice.paid_amount or 0)
-			totals['total_outstanding'] += flt(invoice.outstanding_amount or 0)
-
-		payment_refs = frappe.get_all(
-			'Payment Entry Reference',
-			filters={
-				'reference_doctype': 'Sales Invoice',
-				'reference_name': ('in', invoice_names)
-			},
-			fields=['parent', 'reference_name', 'allocated_amount', 'creation']
+	response = {
+		"events": data,
+		"removed": sorted(removed),
+		"cursor": cursor,
+	}
+	if cint(filters.get("resource_page_length")):
+		response["resources"] = _get_resource_page(filters)
+	return response
+
+def _query_calendar_events(start, end, field_map, since=None, filters=None):
+	filters = filters or {}
+	appo = frappe.qb.DocType("Patient Appointment")
+	pat = frappe.qb.DocType("Patient")
+	prov = frappe.qb.DocType("Healthcare Practitioner")
+	su = frappe.qb.DocType("Healthcare Service Unit")
+	timestamp_add = CustomFunction("TIMESTAMPADD", ["unit", "interval", "timestamp"])
+
+	query = (
+		frappe.qb.from_(appo)
+		.left_join(pat).on(pat.name == appo.patient)
+		.left_join(prov).on(prov.name == appo.practitioner)
+		.left_join(su).on(su.name == appo.service_unit)
+		.select(
+			appo.name.as_("name"),
+			appo.practitioner.as_("resource"),
+			appo.practitioner_name.as_("practitioner_name"),
+			appo.creation.as_("creation"),
+			appo.patient_name.as_("patient_name"),
+			appo.patient.as_("patient"),
+			appo.owner.as_("owner"),
+			appo.modified_by.as_("modified_by"),
+			appo.custom_visit_status.as_("status"),
+			appo.status.as_("booking_type"),
+			appo.notes.as_("note"),
+			appo.custom_payment_type.as_("payment_type"),
+			appo.custom_billing_status.as_("billing_status"),
+			appo.ref_sales_invoice.as_("sales_invoice"),
+			appo.custom_insurance_sales_invoice.as_("insurance_invoice"),
+			appo.custom_insurance_status.as_("insurance_status"),
+			appo.invoiced.as_("invoiced"),
+			appo.custom_arrival_time.as_("arrival_time"),
+			appo.modified.as_("modified"),
+			appo.patient_name.as_("customer"),
+			appo.appointment_datetime.as_("starts_at"),
+			appo.appointment_type.as_("appointment_type"),
+			appo.custom_visit_reason.as_("visit_reason"),
+			appo.custom_past_appointment.as_("custom_past_appointment"),
+			appo.custom_confirmed.as_("confirmed"),
+			appo.reminded.as_("reminded"),
+			timestamp_add(PseudoColumn("minute"), appo.duration, appo.appointment_datetime).as_("ends_at"),
+			appo.service_unit.as_("room_id"),
+			Coalesce(su.healthcare_service_unit_name, appo.service_unit).as_("room"),
+			su.healthcare_service_unit_name.as_("room_name"),
+			prov.custom_background_color.as_("background_color"),
+			prov.custom_text_color.as_("text_color"),
+			pat.image.as_("image"),
+			pat.custom_file_number.as_("file_number"),
+			pat.patient_name.as_("full_name"),
+			pat.mobile.as_("mobile"),
+			pat.dob.as_("birthdate"),
+			pat.custom_cpr.as_("cpr"),
+			pat.sex.as_("gender"),
 		)
+		.where(appo.appointment_datetime >= get_datetime_str(start))
+		.where(appo.appointment_datetime < get_datetime_str(end))
+	)
+
+	if field_map['showcancelled']:
+		query = query.where(IfNull(appo.status, "") != "Cancelled")
+	if since:
+		query = query.where(appo.modified > get_datetime_str(since))
+
+	for fieldname in CALENDAR_FILTER_FIELDS:
+		values = _as_list(filters.get(fieldname))
+		if values:
+			query = query.where(appo.field(fieldname).isin(values))
+
+	resource_page = _get_resource_page(filters)
+	if resource_page is not None:
+		if not resource_page:
+			return []
+		query = query.where(appo.practitioner.isin(resource_page))
 
-		payment_entry_names = list({ref.parent for ref in payment_refs})
-		payment_map = {}
+	return query.run(as_dict=True, update={"allDay": 0, "procedure_name": None})
 
-		if payment_entry_names:
-			payment_docs = frappe.get_all(
-				'Payment Entry',
-				filters={'name': ('in', payment_entry_names)},
-				fields=[
-					'name', 'posting_date', 'posting_time', 'mode_of_payment', 'payment_type',
-					'paid_amount', 'received_amount', 'status', 'docstatus', 'party',
-					'party_type', 'owner', 'reference_no', 'reference_date', 'creation', 'modified'
-				]
-			)
-			for payment in payment_docs:
-				payment_map[payment.name] = frappe._dict(payment)
+def _parse_calendar_filters(filters):
+	filters = frappe.parse_json(filters) if filters else {}
+	return filters if isinstance(filters, dict) else {}
 
-		default_currency = None
-		if appointment.company:
-			default_currency = frappe.db.get_value('Company', appointment.company, 'default_currency')
+def _as_list(value):
+	if not value:
+		return []
+	return list(value) if isinstance(value, (list, tuple, set)) else [value]
 
-		for ref in payment_refs:
-			payment_entry = payment_map.get(ref.parent)
-			if not payment_entry:
-				continue
+def _get_resource_page(filters):
+	"""
+	Practitioners on the requested resource page ('resource_start', 'resource_page_length'),
+	in the same order the calendar lists its resources. None when paging is not requested.
+	"""
+	page_length = cint(filters.get("resource_page_length"))
+	if not page_length:
+		return None
 
-			invoice = invoice_map.get(ref.reference_name)
-			currency = invoice.currency if invoice else default_currency or frappe.defaults.get_global_default('currency')
+	resource_filters = {"status": "Active"}
+	if _as_list(filters.get("practitioner")):
+		resource_filters["name"] = ("in", _as_list(filters.get("practitioner")))
+	if _as_list(filters.get("department")):
+		resource_filters["department"] = ("in", _as_list(filters.get("department")))
 
-			if payment_entry.posting_date:
-				post_time = payment_entry.posting_time or '00:00:00'
-				pe_timestamp = f"{payment_entry.posting_date} {post_time}"
-			else:
-				pe_timestamp = payment_entry.creation or ref.creation
-
-			amount_label = fmt_money(ref.allocated_amount or 0, currency=currency)
-			description = _('Applied {0} to {1}').format(amount_label, ref.reference_name)
-
-			extra = []
-			context = invoice_context.get(ref.reference_name)
-			if context and context.get('label'):
-				extra.append({'label': _('Invoice Type'), 'value': context['label']})
-			if payment_entry.mode_of_payment:
-				extra.append({'label': _('Mode'), 'value': payment_entry.mode_of_payment})
-			if payment_entry.reference_no:
-				extra.append({'label': _('Reference No.'), 'value': payment_entry.reference_no})
-
-			add_entry(
-				'payment',
-				pe_timestamp,
-				_('Payment Entry {0}').format(payment_entry.name),
-				description=description,
-				badge=payment_entry.status,
-				doc={'doctype': 'Payment Entry', 'name': payment_entry.name, 'label': payment_entry.name},
-				reference={'doctype': 'Sales Invoice', 'name': ref.reference_name, 'label': ref.reference_name},
-				user=payment_entry.owner,
-				extra=extra
-			)
+	return frappe.get_all(
+		"Healthcare Practitioner",
+		filters=resource_filters,
+		order_by="first_name asc, name asc",
+		start=cint(filters.get("resource_start")),
+		page_length=page_length,
+		pluck="name",
+	)
+
+def _apply_status_colors(data):
+	for d in data:
+		if d['status'] in CALENDAR_STATUS_COLORS:
+			d['background_color'] = CALENDAR_STATUS_COLORS[d['status']]
 
-	entries.sort(key=lambda entry: entry["_sort_ts"])
-	for entry in entries:
-		entry.pop('_sort_ts', None)
+def _encode_columnar_events(data):
+	"""
+	Pack calendar rows as per-column arrays. Patient, practitioner and room
+	details are moved into lookup tables keyed by the row's id column, and the
+	status colour override is left to the client via 'status_colors'.
+	"""
+	lookup_fields = {field for _key, fields in CALENDAR_LOOKUPS.values() for field in fields}
+	fields = [field for field in (data[0].keys() if data else []) if field not in lookup_fields]
+
+	lookups = {}
+	for table, (key, lookup_columns) in CALENDAR_LOOKUPS.items():
+		rows = {}
+		for d in data:
+			if d.get(key) and d[key] not in rows:
+				rows[d[key]] = [d.get(field) for field in lookup_columns]
+		lookups[table] = {"key": key, "fields": lookup_columns, "rows": rows}
 
 	return {
-		'entries': entries,
-		'financial_summary': list(financial_totals.values()),
-		'latest_status': appointment.get('custom_visit_status') or appointment.status,
+		"format": "columnar",
+		"fields": fields,
+		"columns": [[d.get(field) for d in data] for field in fields],
+		"lookups": lookups,
+		"status_colors": CALENDAR_STATUS_COLORS,
 	}
 
-@frappe.whitelist()
-def change_status(docname, status):
-	doc = frappe.get_doc('Patient Appointment', docname)
-	doc.custom_visit_status = status
-	# doc.append("custom_appointment_time_logs", {
-	# 	"status": status,
-	# 	"time": datetime.datetime.now()
-	# })
-	doc.save()
+def _get_event_names(data):
+	if isinstance(data, dict):
+		names = data["columns"][data["fields"].index("name")] if data["fields"] else []
+		return set(names)
+	return {d["name"] for d in data}
 
+def _get_calendar_cursor(data, removed, since):
+	"""
+	Latest 'modified' among the returned and removed rows, never behind 'since', so a delta
+	of removals alone still moves the cursor. It does not guard against rows committed late
+	with an earlier timestamp: delta reads cover those by starting CALENDAR_CURSOR_OVERLAP
+	before the cursor. None makes the next fetch a full one.
+	"""
+	stamps = [get_datetime(d["modified"]) for d in data if d.get("modified")] + list(removed.values())
+	if since:
+		stamps.append(get_datetime(since))
+	latest = max(stamps, default=None)
+	return get_datetime_str(latest) if latest else since
 
-def mark_no_show_appointments():
-    # mark appointmens as no-show if the appointment time has passed 15 minutes
-	appointments = frappe.db.sql("""
-		SELECT name FROM `tabPatient Appointment`
-		WHERE custom_visit_status = 'Scheduled'
-		AND TIMESTAMP(appointment_date, appointment_time) BETWEEN CURDATE() AND (NOW() - INTERVAL 15 MINUTE)
-	""", as_dict=True)
-
-	# Loop through appointments and mark as no-show
-	for appointment in appointments:
-		change_status(appointment.name, 'No Show')
- 
-@frappe.whitelist()
-def get_events_full_calendar(start, end, filters=None,field_map=None):
-	field_map = json.loads(field_map)
-	patient_appointment = frappe.qb.DocType('Patient Appointment')
-	# healthcare_practitioner = frappe.qb.DocType('Healthcare Practitioner')
-	# patient = frappe.qb.DocType('Patient')
-	# from frappe.query_builder.functions import TimestampAdd, Concat
-
-	# appointments = (
-	# 	frappe.qb.from_(patient_appointment)
-	# 	.left_join(healthcare_practitioner).on(patient_appointment.practitioner == healthcare_practitioner.name)
-	# 	.left_join(patient).on(patient_appointment.patient == patient.name)
-	# 	.select(
-	# 		patient_appointment.name,
-	# 		(patient_appointment.practitioner).as_('resource'),
-	# 		patient_appointment.creation,
-	# 		patient_appointment.patient_name,
-	# 		patient_appointment.owner,
-	# 		patient_appointment.modified_by,
-	# 		patient_appointment.status,
-	# 		patient_appointment.notes,
-	# 		patient_appointment.modified,
-	# 		patient_appointment.patient_name.as_('customer'),
-	# 		Concat(patient_appointment.appointment_date, ' ', patient_appointment.appointment_time).as_('starts_at'),
-	# 		Concat(patient_appointment.appointment_date, ' ', TimestampAdd('minute', patient_appointment.duration, patient_appointment.appointment_time)).as_('ends_at'),
-	# 		"null as 'room'",
-	# 		"0 as 'allDay'",
-	# 		"null as 'procedure_name'",
-	# 		healthcare_practitioner.background_color.as_('bgc'),
-	# 		healthcare_practitioner.text_color.as_('font'),
-	# 		patient.image,
-	# 		patient.file_number,
-	# 		patient.patient_name.as_('full_name'),
-	# 		patient.mobile,
-	# 		patient.dob.as_('birthdate'),
-	# 		patient.cpr,
-	# 		"(SELECT atl.`time` FROM `tabAppointment Time Logs` atl WHERE atl.status = 'Arrived' AND atl.parent = `tabPatient Appointment`.name ORDER BY atl.`time` DESC LIMIT 1) as 'arrival_time'",
-	# 	)
-	# 	.where(
-	# 		(patient_appointment.appointment_date >= start)
-	# 		& (patient_appointment.appointment_date <= end)
-	# 	)
-	# )
- 
-	# if field_map['showcancelled']:
-	# 	appointments = appointments.where(patient_appointment.status != 'Cancelled')
- 
-	sqlcommand = """SELECT
-	appo.name 						as name,
-	appo.practitioner 				as resource,
-	appo.practitioner_name 			as practitioner_name,
-	appo.creation 					as creation,
-	appo.patient_name 				as patient_name,
-	appo.patient					as patient,
-	appo.owner 						as owner,
-	appo.modified_by 				as modified_by,
-	appo.custom_visit_status 		as status,
-	appo.status				 		as booking_type,
-	appo.notes 						as note,
-	appo.custom_payment_type		as payment_type,
-	appo.custom_billing_status		as billing_status,
-	appo.ref_sales_invoice			as sales_invoice,
-	appo.custom_insurance_sales_invoice as insurance_invoice,
-	appo.custom_insurance_status	as insurance_status,
-	appo.invoiced					as invoiced,
-	(SELECT atl.`time` FROM `tabAppointment Time Logs` atl WHERE atl.status = 'Arrived' AND atl.parent = appo.name ORDER BY atl.`time` DESC LIMIT 1) as arrival_time,
-	appo.modified 					as modified,
-	appo.patient_name 				as customer,
-	appo.appointment_datetime 		as starts_at,
-	appo.appointment_type 			as appointment_type,
-	appo.custom_visit_reason 		as visit_reason,
-	appo.custom_past_appointment	as custom_past_appointment,
-	appo.custom_confirmed	 		as confirmed,
-	appo.reminded	 				as reminded,
-	TIMESTAMPADD(minute,appo.duration,appo.appointment_datetime) 	as ends_at,
-	appo.service_unit 				as room_id,
-	COALESCE(su.healthcare_service_unit_name, appo.service_unit) as room,
-	su.healthcare_service_unit_name			as room_name,
-	0	 							as allDay,
-	null 							as procedure_name,
-	prov.custom_background_color 	as background_color,
-	prov.custom_text_color 			as text_color,
-	pat.image 						as image,
-	pat.custom_file_number 			as file_number,
-	pat.patient_name 				as full_name,
-	pat.mobile 						as mobile,
-	pat.dob 						as birthdate,
-	pat.custom_cpr 					as cpr,
-	pat.sex 						as gender
-	from `tabPatient Appointment` 	as appo
-	LEFT JOIN `tabPatient` 	as pat ON pat.name = appo.patient
-	LEFT JOIN `tabHealthcare Practitioner` as prov ON prov.name = appo.practitioner
-	LEFT JOIN `tabHealthcare Service Unit` as su ON su.name = appo.service_unit
-	WHERE appo.appointment_datetime >= "{start}" and appo.appointment_datetime < "{end}"  {condition}
+def _get_calendar_tombstones(start, end, since, kept_names):
 	"""
-	condition = ''
-	if field_map['showcancelled']:
-		condition = ' and ifnull(appo.status, "") != "Cancelled" '
-	sqlcommand = sqlcommand.format(start = start , end = end , condition=condition)
-	data = frappe.db.sql(sqlcommand,as_dict=True, update={"allDay": 0})
-	for id,d in enumerate(data):
-		if d['status'] in[ "Done", "Completed"]:
-			data[id]['background_color'] = '#008000'	## this is done color green
-			# data[id]['bgc'] = '#177245'
-	return data
+	Appointments of [start, end) the client should drop since 'since', with when they changed:
+	rows of the range that were modified but no longer match the filters (e.g. cancelled)
+	and rows that left the range, rescheduled or deleted.
+	"""
+	touched = frappe.get_all(
+		"Patient Appointment",
+		filters=[
+			["modified", ">", since],
+			["appointment_datetime", ">=", get_datetime_str(start)],
+			["appointment_datetime", "<", get_datetime_str(end)],
+		],
+		fields=["name", "modified"],
+	)
+	removed = {row.name: row.modified for row in touched}
+	for name, left_at in get_moved(start, end, since).items():
+		removed[name] = max(removed.get(name, left_at), left_at)
+	return {name: changed for name, changed in removed.items() if name not in kept_names}
 
 @frappe.whitelist()
 def get_availability_data(date, practitioner, appointment):
@@ -1138,23 +1475,12 @@ def get_availability_data(date, practitioner, appointment):
 
 	check_employee_wise_availability(date, practitioner_doc)
 
-	available_slotes = []
 	if isinstance(appointment, str):
 		appointment = frappe.get_doc(json.loads(appointment))
 
-	if frappe.db.exists(
-		"Practitioner Availability",
-		{
-			"type": "Available",
-			"scope": practitioner_doc.name,
-			"status": "Active",
-			"start_date": ["<=", date],
-			"end_date": [">=", date],
-			"docstatus": 1,
-		},
-	):
-		available_slotes = get_availability_slots(practitioner_doc, date, appointment.duration)
+	available_slotes = get_availability_slots(practitioner_doc, date, appointment.duration)
 
+	slot_details = []
 	if practitioner_doc.practitioner_schedules:
 		slot_details = get_available_slots(practitioner_doc, date)
 	elif not len(available_slotes):
@@ -1167,6 +1493,10 @@ def get_availability_data(date, practitioner, appointment):
 
 	if available_slotes and len(available_slotes):
 		slot_details += available_slotes
+
+	# the booking dialog enables exactly the slots the engine leaves open
+	for detail, open_detail in zip(slot_details, build_open_slot_details(slot_details, date, now_datetime())):
+		detail["open_slots"] = open_detail["open_slots"]
 	# if not slot_details:
 	# 	# TODO: return available slots in nearby dates
 	# 	frappe.throw(
@@ -1197,45 +1527,38 @@ def get_availability_data(date, practitioner, appointment):
 	return {"slot_details": slot_details, "fee_validity": fee_validity}
 
 def check_employee_wise_availability(date, practitioner_doc):
-	employee = None
-	if practitioner_doc.employee:
-		employee = practitioner_doc.employee
-	elif practitioner_doc.user_id:
-		employee = frappe.db.get_value("Employee", {"user_id": practitioner_doc.user_id}, "name")
+	employee = employee_calendar.get_practitioner_employee(practitioner_doc)
 
 	if employee:
+		day_status = employee_calendar.get_day_status(employee, date)
 		# check holiday
-		if is_holiday(employee, date):
+		if day_status == employee_calendar.HOLIDAY:
 			frappe.throw(_("{0} is a holiday".format(date)), title=_("Not Available"))
 
 		# check leave status
-		if "hrms" in frappe.get_installed_apps():
-			leave_record = frappe.db.sql(
-				"""select half_day from `tabLeave Application`
-				where employee = %s and %s between from_date and to_date
-				and docstatus = 1""",
-				(employee, date),
-				as_dict=True,
+		if day_status == employee_calendar.HALF_DAY_LEAVE:
+			frappe.throw(
+				_("{0} is on a Half day Leave on {1}").format(practitioner_doc.name, date),
+				title=_("Not Available"),
+			)
+		elif day_status == employee_calendar.LEAVE:
+			frappe.throw(
+				_("{0} is on Leave on {1}").format(practitioner_doc.name, date), title=_("Not Available")
 			)
-			if leave_record:
-				if leave_record[0].half_day:
-					frappe.throw(
-						_("{0} is on a Half day Leave on {1}").format(practitioner_doc.name, date),
-						title=_("Not Available"),
-					)
-				else:
-					frappe.throw(
-						_("{0} is on Leave on {1}").format(practitioner_doc.name, date), title=_("Not Available")
-					)
 
 def get_available_slots(practitioner_doc, date):
 	available_slots = slot_details = []
 	weekday = date.strftime("%A")
 	practitioner = practitioner_doc.name
 
+	schedules = slot_config.get_schedules(row.schedule for row in practitioner_doc.practitioner_schedules)
+	service_units = slot_config.get_service_units(
+		row.service_unit for row in practitioner_doc.practitioner_schedules
+	)
+
 	for schedule_entry in practitioner_doc.practitioner_schedules:
 		validate_practitioner_schedules(schedule_entry, practitioner)
-		practitioner_schedule = frappe.get_doc("Practitioner Schedule", schedule_entry.schedule)
+		practitioner_schedule = schedules.get(schedule_entry.schedule)
 
 		if practitioner_schedule and not practitioner_schedule.disabled:
 			available_slots = []
@@ -1257,11 +1580,9 @@ def get_available_slots(practitioner_doc, date):
 
 				if schedule_entry.service_unit:
 					slot_name = f"{schedule_entry.schedule}"
-					allow_overlap, service_unit_capacity = frappe.get_value(
-						"Healthcare Service Unit",
-						schedule_entry.service_unit,
-						["overlap_appointments", "service_unit_capacity"],
-					)
+					service_unit = service_units.get(schedule_entry.service_unit) or frappe._dict()
+					allow_overlap = service_unit.overlap_appointments
+					service_unit_capacity = service_unit.service_unit_capacity
 					if not allow_overlap:
 						# fetch all appointments to service unit
 						filters.pop("practitioner")
@@ -1298,22 +1619,17 @@ def get_available_slots(practitioner_doc, date):
 	return slot_details
 
 def get_availability_slots(practitioner_doc, date, duration):
-	availability_details = frappe.db.get_all(
-		"Practitioner Availability",
-		filters={
-			"type": "Available",
-			"scope": practitioner_doc.name,
-			"status": "Active",
-			"start_date": ["<=", date],
-			"end_date": [">=", date],
-			"docstatus": 1,
-		},
-		pluck="name",
-	)
+	availability_details = [
+		day.availability
+		for day in get_days([practitioner_doc.name], date, type="Available")
+		if day.status == "Active"
+	]
 
 	if not len(availability_details):
 		return []
 
+	slot_config.get_availability(availability_details)
+
 	available_slotes = []
 	for availability in availability_details:
 		data = build_availability_data(availability, duration, date, practitioner_doc)
@@ -1323,44 +1639,21 @@ def get_availability_slots(practitioner_doc, date, duration):
 	return available_slotes
 
 def build_availability_data(availability, duration, date, practitioner_doc):
-	available_slots = []
-	availability_doc = frappe.get_doc("Practitioner Availability", availability)
+	"""
+	Slot details of a Practitioner Availability on 'date'. 'availability' comes from get_days,
+	which only returns the dates its recurrence applies on.
+	"""
+	availability_doc = slot_config.get_availability([availability]).get(availability)
+	if not availability_doc:
+		return {}
 
 	allow_overlap = service_unit_capacity = 0
 	if availability_doc.service_unit:
-		allow_overlap, service_unit_capacity = frappe.db.get_value(
-			"Healthcare Service Unit",
-			availability_doc.service_unit,
-			["allow_appointments", "service_unit_capacity"],
-		)
+		service_unit = slot_config.get_service_unit(availability_doc.service_unit)
+		allow_overlap = service_unit.allow_appointments
+		service_unit_capacity = service_unit.service_unit_capacity
 
-	weekday = date.strftime("%A").lower()
-	if availability_doc.repeat == "Weekly" and not getattr(availability_doc, weekday, 0):
-		return {}
-	elif (
-		availability_doc.repeat == "Monthly" and getdate(date).day != availability_doc.start_date.day
-	):
-		return {}
-	elif availability_doc.repeat == "Never" and not (
-		getdate(date) >= availability_doc.start_date and getdate(date) <= availability_doc.end_date
-	):
-		return {}
-
-	start_time = (
-		datetime.datetime.combine(date, datetime.time()) + availability_doc.start_time
-	).time()
-	end_time = (datetime.datetime.combine(date, datetime.time()) + availability_doc.end_time).time()
-
-	current = datetime.datetime.combine(date, start_time)
-	end = datetime.datetime.combine(date, end_time)
-
-	while current + datetime.timedelta(minutes=duration) <= end:
-		slot_start = current.time().strftime("%H:%M:%S")
-		slot_end = (
-			(current + datetime.timedelta(minutes=duration)).time().strftime("%H:%M:%S")
-		)
-		available_slots.append({"from_time": slot_start, "to_time": slot_end})
-		current += datetime.timedelta(minutes=duration)
+	available_slots = build_availability_time_slots(availability_doc, date, duration)
 
 	filters = {
 		"practitioner": practitioner_doc.name,
@@ -1395,30 +1688,54 @@ def build_availability_data(availability, duration, date, practitioner_doc):
 		else None
 	)
 
+def availability_applies_on(availability, date):
+	"""Whether a Practitioner Availability record's recurrence covers 'date'."""
+	weekday = date.strftime("%A").lower()
+	if availability.repeat == "Weekly" and not availability.get(weekday):
+		return False
+	elif availability.repeat == "Monthly" and getdate(date).day != getdate(availability.start_date).day:
+		return False
+	elif availability.repeat == "Never" and not (
+		getdate(date) >= getdate(availability.start_date) and getdate(date) <= getdate(availability.end_date)
+	):
+		return False
+	return True
+
+def build_availability_time_slots(availability, date, duration):
+	"""Split an availability window on 'date' into back-to-back slots of 'duration' minutes."""
+	available_slots = []
+	start_time = (
+		datetime.datetime.combine(date, datetime.time()) + availability.start_time
+	).time()
+	end_time = (datetime.datetime.combine(date, datetime.time()) + availability.end_time).time()
+
+	current = datetime.datetime.combine(date, start_time)
+	end = datetime.datetime.combine(date, end_time)
+
+	while current + datetime.timedelta(minutes=duration) <= end:
+		slot_start = current.time().strftime("%H:%M:%S")
+		slot_end = (
+			(current + datetime.timedelta(minutes=duration)).time().strftime("%H:%M:%S")
+		)
+		available_slots.append({"from_time": slot_start, "to_time": slot_end})
+		current += datetime.timedelta(minutes=duration)
+	return available_slots
+
 def get_practitioner_unavailability(date, practitioner=None, department=None, service_unit=None):
 	scopes = (practitioner, department, service_unit)
-	date = getdate(date)
 
-	return frappe.get_all(
-		"Practitioner Availability",
-		fields=[
-			"name",
-			"start_date as appointment_date",
-			"start_time as appointment_time",
-			"duration",
-			"type",
-			"reason",
-			"note",
-		],
-		filters={
-			"type": "Unavailable",
-			"docstatus": 1,
-			"start_date": ("<=", date),
-			"end_date": (">=", date),
-			"scope": ["in", scopes],
-		},
-		order_by="start_time",
-	)
+	return [
+		frappe._dict(
+			name=day.availability,
+			appointment_date=day.date,
+			appointment_time=day.start_time,
+			duration=day.duration,
+			type=day.type,
+			reason=day.reason,
+			note=day.note,
+		)
+		for day in get_days(scopes, date, type="Unavailable")
+	]
 
 def validate_practitioner_schedules(schedule_entry, practitioner):
 	if not schedule_entry.schedule:
@@ -1431,41 +1748,7 @@ def validate_practitioner_schedules(schedule_entry, practitioner):
 
 @frappe.whitelist()
 def get_waiting_list():
-	return frappe.db.sql("""
-		SELECT 
-			pa.name,
-			pa.appointment_type,
-			pa.patient_name,
-			pa.patient,
-			p.mobile,
-			p.dob,
-			p.custom_cpr,
-			p.custom_file_number,
-			p.image AS patient_image,
-			p.sex AS gender,
-			pa.practitioner,
-			pa.practitioner_name,
-			pa.custom_visit_status,
-			pa.custom_appointment_category,
-			pa.custom_past_appointment,
-			at.arrival_time,
-			pa.appointment_time,
-			pa.appointment_date
-		FROM `tabPatient Appointment` pa
-		LEFT JOIN (
-			SELECT parent, MAX(time) AS arrival_time
-			FROM `tabAppointment Time Logs`
-			WHERE status = 'Arrived'
-			GROUP BY parent
-		) at ON pa.name = at.parent
-		LEFT JOIN `tabPatient` p 
-			ON pa.patient = p.name
-		WHERE pa.custom_visit_status = 'Arrived' 
-		AND pa.appointment_date = CURDATE()
-		ORDER BY pa.practitioner_name, at.arrival_time ASC
-		LIMIT 5;
-
-	""", as_dict=True)
+	return waiting_queue.get_queue(limit=5)
 
 @frappe.whitelist()
 def add_item_to_appointment(appointment, item_code, qty: int = 1):
@@ -1758,46 +2041,26 @@ def record_sales_invoice_payment(invoice, payments=None, mode_of_payment=None, a
 		"total_paid": sum(p.amount for p in inv.payments),
 	}
 
-def _resolve_price_list(appt, patient_doc):
-	payment_type = (appt.get("custom_payment_type") or "").lower()
+def _is_insurance_payment(appt):
+	return "insur" in (appt.get("custom_payment_type") or "").lower()
+
+def _resolve_price_list(policy, company):
+	"""(price list, is_insurance) for billing under 'policy' (None when the visit is not billed to insurance)."""
 	default_price_list = _get_default_price_list()
-	if "insur" in payment_type:
-		active_on = getattr(appt, "appointment_date", None) or getattr(appt, "posting_date", None) or nowdate()
-		company = getattr(appt, "company", None) or frappe.get_single("Global Defaults").default_company
-		policy = _get_active_insurance_policy(patient_doc.name, company=company, on_date=active_on)
-		if policy:
-			price_lists = get_insurance_price_lists(policy.name, company)
-			preferred_price_list = (
-				price_lists.get("plan_price_list")
-				or price_lists.get("default_price_list")
-				or default_price_list
-			)
-			if preferred_price_list and frappe.db.exists("Price List", preferred_price_list):
-				return preferred_price_list, True
-			return default_price_list, True
+	if policy:
+		price_lists = get_insurance_price_lists(policy.name, company)
+		preferred_price_list = (
+			price_lists.get("plan_price_list")
+			or price_lists.get("default_price_list")
+			or default_price_list
+		)
+		if preferred_price_list and frappe.db.exists("Price List", preferred_price_list):
+			return preferred_price_list, True
+		return default_price_list, True
 
 	# fallback: default selling price list
 	return default_price_list, False
 
-def _get_item_rate(item_code, price_list, currency=None):
-	# Pull rate from Item Price
-	rate = frappe.db.get_value("Item Price",
-		{"item_code": item_code, "price_list": price_list},
-		"price_list_rate")
-	if not rate:
-		rate = 0
-	if currency:
-		# you can add currency conversion here if needed
-		pass
-	return flt(rate, 2)
-
-def _get_row_rate(row, price_list, currency=None):
-	"""Return the effective rate for a billing row, honoring overrides."""
-	override = flt(getattr(row, "override_rate", 0) or 0)
-	if override > 0:
-		return override
-	return _get_item_rate(row.item_code, price_list, currency)
-
 def _get_billing_override_roles():
 	defaults = {"Can Override Billing Rate", "System Manager", "Healthcare Practitioner"}
 	try:
@@ -1807,84 +2070,136 @@ def _get_billing_override_roles():
 	except Exception:
 		return defaults
 
-def _coverage_split(patient_name, item_code, unit_rate, qty, appointment_date=None, company=None):
-	"""Split total between patient and insurance using active Patient Insurance Policy."""
-	total = flt(unit_rate) * flt(qty)
-
-	# Defaults (no subscription): patient pays all
-	patient_share = total
-	insurance_share = 0
-	if not frappe.db.exists("DocType", "Patient Insurance Policy"):
-		return flt(patient_share, 2), flt(insurance_share, 2)
-
-	policy = _get_active_insurance_policy(patient_name, company=company, on_date=appointment_date)
-	
-	eligibility_plan = frappe.db.get_value('Insurance Payor Eligibility Plan',
+def _get_eligibility_plan(policy):
+	return frappe.db.get_value('Insurance Payor Eligibility Plan',
 		policy.get("insurance_plan"),
 		['custom_default_discount_percentage', 'custom_coverage_type', 'custom_default_coverage_percentage', 'custom_default_fixed_amount'],
 		as_dict=True
 	)
-	discount_percentage = flt(eligibility_plan["custom_default_discount_percentage"] or 0)
-	discounted_total = total - (total * discount_percentage * 0.01)
-	if eligibility_plan["custom_coverage_type"] == "Fixed Amount":
-		fixed_amount = flt(eligibility_plan["custom_default_fixed_amount"] or 0)
-		insurance_share = min(fixed_amount, discounted_total)
-	elif eligibility_plan["custom_coverage_type"] == "Percentage":
-		coverage_percentage = flt(eligibility_plan["custom_default_coverage_percentage"] or 0)
-		insurance_share = flt(discounted_total * coverage_percentage * 0.01, 2)
-
-	eligibility = get_insurance_eligibility(
-		item_code=item_code,
-		on_date=appointment_date or nowdate(),
-		insurance_plan=policy.get("insurance_plan"),
+
+def _get_eligibility_details(eligibility):
+	if not eligibility:
+		return None
+	return frappe.db.get_value('Item Insurance Eligibility',
+		eligibility.get("name"),
+		['custom_coverage_type', 'custom_default_fixed_amount'],
+		as_dict=True
 	)
+
+def _apply_coverage(total, eligibility_plan, eligibility=None, eligibility_details=None):
+	"""(patient share, insurance share) of 'total' under the plan defaults and the item's eligibility."""
+	insurance_share = 0
+	discounted_total = total
+	if eligibility_plan:
+		discount_percentage = flt(eligibility_plan["custom_default_discount_percentage"] or 0)
+		discounted_total = total - (total * discount_percentage * 0.01)
+		if eligibility_plan["custom_coverage_type"] == "Fixed Amount":
+			fixed_amount = flt(eligibility_plan["custom_default_fixed_amount"] or 0)
+			insurance_share = min(fixed_amount, discounted_total)
+		elif eligibility_plan["custom_coverage_type"] == "Percentage":
+			coverage_percentage = flt(eligibility_plan["custom_default_coverage_percentage"] or 0)
+			insurance_share = flt(discounted_total * coverage_percentage * 0.01, 2)
+
 	if eligibility:
 		discount_pct = flt(eligibility.get("discount") or 0)
 		discounted_total = total - (total * discount_pct * 0.01)
-		eligibility_more_data = frappe.db.get_value('Item Insurance Eligibility',
-			eligibility.get("name"),
-			['custom_coverage_type', 'custom_default_fixed_amount'],
-			as_dict=True
-		)
-		if eligibility_more_data["custom_coverage_type"] == "Fixed Amount":
-			fixed_amount = flt(eligibility_more_data["custom_default_fixed_amount"] or 0)
+		if eligibility_details["custom_coverage_type"] == "Fixed Amount":
+			fixed_amount = flt(eligibility_details["custom_default_fixed_amount"] or 0)
 			insurance_share = min(fixed_amount, discounted_total)
-		elif eligibility_more_data["custom_coverage_type"] == "Percentage":
+		elif eligibility_details["custom_coverage_type"] == "Percentage":
 			coverage_pct = flt(eligibility.get("coverage") or 0)
 			insurance_share = flt(discounted_total * coverage_pct * 0.01, 2)
-	
+
 	patient_share = flt(discounted_total - insurance_share, 2)
 	return flt(patient_share, 2), flt(insurance_share, 2)
 
+class PricingContext:
+	"""
+	Everything billing an appointment's rows depends on, resolved once per request: company,
+	date, insurance policy and eligibility plan, price list, and the Item Price rates and item
+	names of all rows (one query each). Item eligibility is looked up once per distinct item.
+	"""
+
+	def __init__(self, appt, patient_doc, rows=None):
+		self.patient = patient_doc.name
+		self.company = appt.company or frappe.get_single("Global Defaults").default_company
+		self.currency = frappe.db.get_default("currency") or "BHD"
+		self.appointment_date = getattr(appt, "appointment_date", None) or getattr(appt, "posting_date", None) or nowdate()
+
+		# looked up once; None (no insurance billing or no active policy) is kept as the answer too
+		self.policy = None
+		if _is_insurance_payment(appt) and frappe.db.exists("DocType", "Patient Insurance Policy"):
+			self.policy = _get_active_insurance_policy(self.patient, company=self.company, on_date=self.appointment_date)
+		self.price_list, self.is_insurance = _resolve_price_list(self.policy, self.company)
+		self.eligibility_plan = _get_eligibility_plan(self.policy) if self.policy else None
+
+		rows = rows if rows is not None else appt.get("custom_billing_items") or []
+		item_codes = list({r.item_code for r in rows if r.item_code})
+		self.rates = {}
+		self.item_names = {}
+		self._eligibility = {}
+		if item_codes:
+			for price in frappe.get_all(
+				"Item Price",
+				filters={"price_list": self.price_list, "item_code": ("in", item_codes)},
+				fields=["item_code", "price_list_rate"],
+				order_by="modified desc",
+			):
+				self.rates.setdefault(price.item_code, flt(price.price_list_rate, 2))
+			missing_names = list({r.item_code for r in rows if r.item_code and not r.item_name})
+			if missing_names:
+				self.item_names = dict(
+					frappe.get_all("Item", filters={"name": ("in", missing_names)}, fields=["name", "item_name"], as_list=True)
+				)
+
+	def item_rate(self, item_code):
+		return self.rates.get(item_code, 0.0)
+
+	def row_rate(self, row):
+		"""Return the effective rate for a billing row, honoring overrides."""
+		override = flt(getattr(row, "override_rate", 0) or 0)
+		if override > 0:
+			return override
+		return self.item_rate(row.item_code)
+
+	def item_name(self, row):
+		return row.item_name or self.item_names.get(row.item_code)
+
+	def coverage_split(self, item_code, unit_rate, qty):
+		total = flt(unit_rate) * flt(qty)
+		if not self.policy:
+			# no active policy: patient pays all
+			return flt(total, 2), flt(0, 2)
+
+		if item_code not in self._eligibility:
+			eligibility = get_insurance_eligibility(
+				item_code=item_code,
+				on_date=self.appointment_date,
+				insurance_plan=self.policy.get("insurance_plan"),
+			)
+			self._eligibility[item_code] = (eligibility, _get_eligibility_details(eligibility))
+		eligibility, eligibility_details = self._eligibility[item_code]
+		return _apply_coverage(total, self.eligibility_plan, eligibility, eligibility_details)
+
 @frappe.whitelist()
 def get_appointment_items_snapshot(appointment_id):
 	"""Return a snapshot: rows with computed rate, shares, and total blocks."""
 	appt = frappe.get_doc("Patient Appointment", appointment_id)
 	patient = frappe.get_doc("Patient", appt.patient)
-	currency = frappe.db.get_default("currency") or "BHD"
-
-	price_list, is_insurance = _resolve_price_list(appt, patient)
+	pricing = PricingContext(appt, patient)
+	currency = pricing.currency
 
 	rows = []
 	totals_patient = 0.0
 	totals_insurance = 0.0
-	appt_date = getattr(appt, "appointment_date", None) or getattr(appt, "posting_date", None) or nowdate()
-	company = getattr(appt, "company", None)
 
 	for r in appt.get("custom_billing_items") or []:
-		base_rate = _get_item_rate(r.item_code, price_list, currency)
-		unit_rate = _get_row_rate(r, price_list, currency)
+		base_rate = pricing.item_rate(r.item_code)
+		unit_rate = pricing.row_rate(r)
 		qty = flt(r.qty or 1)
 
-		if is_insurance:
-			patient_share, insurance_share = _coverage_split(
-				patient.name,
-				r.item_code,
-				unit_rate,
-				qty,
-				appointment_date=appt_date,
-				company=company,
-			)
+		if pricing.is_insurance:
+			patient_share, insurance_share = pricing.coverage_split(r.item_code, unit_rate, qty)
 		else:
 			patient_share = unit_rate * qty
 			insurance_share = 0.0
@@ -1892,7 +2207,7 @@ def get_appointment_items_snapshot(appointment_id):
 		rows.append({
 			"name": r.name,
 			"item_code": r.item_code,
-			"item_name": r.item_name or frappe.db.get_value("Item", r.item_code, "item_name"),
+			"item_name": pricing.item_name(r),
 			"qty": qty,
 			"rate": unit_rate,
 			"base_rate": base_rate,
@@ -1963,6 +2278,7 @@ def _overwrite_invoice(invoice_doc, items, selling_price_list=None, submit_invoi
 	return invoice_doc
 
 def _update_patient_billing_status(appt, patient_invoice=None):
+	invalidate_appointment(appt.name)
 	if not patient_invoice or not frappe.db.exists("Sales Invoice", patient_invoice):
 		appt.db_set("custom_billing_status", "Not Billed")
 		return
@@ -1986,27 +2302,19 @@ def create_invoices_for_appointment(appointment_id, submit_invoice: int = 0):
 		frappe.throw("Please add at least one item to bill.")
 
 	patient = frappe.get_doc("Patient", appt.patient)
-	company = appt.company or frappe.get_single("Global Defaults").default_company
-	currency = frappe.db.get_default("currency") or "BHD"
-
-	price_list, is_insurance = _resolve_price_list(appt, patient)
+	pricing = PricingContext(appt, patient)
+	company = pricing.company
+	currency = pricing.currency
+	price_list, is_insurance = pricing.price_list, pricing.is_insurance
 
 	patient_items, insurance_items = [], []
-	appt_date = getattr(appt, "appointment_date", None) or getattr(appt, "posting_date", None) or nowdate()
 
 	for r in appt.custom_billing_items:
 		qty = flt(r.qty or 1)
-		unit_rate = _get_row_rate(r, price_list, currency)
+		unit_rate = pricing.row_rate(r)
 
 		if is_insurance:
-			patient_share, insurance_share = _coverage_split(
-				patient.name,
-				r.item_code,
-				unit_rate,
-				qty,
-				appointment_date=appt_date,
-				company=company,
-			)
+			patient_share, insurance_share = pricing.coverage_split(r.item_code, unit_rate, qty)
 			if patient_share > 0:
 				per_unit_patient_rate = flt(patient_share / qty, 6)
 				patient_items.append({
@@ -2083,7 +2391,7 @@ def create_invoices_for_appointment(appointment_id, submit_invoice: int = 0):
 
 	# Insurance invoice
 	if insurance_items:
-		policy = _get_active_insurance_policy(appt.patient, company=company, on_date=appt_date)
+		policy = pricing.policy
 		if not policy:
 			frappe.throw(_("Cannot create insurance invoice without an active Patient Insurance Policy."))
 
@@ -2403,33 +2711,13 @@ def get_patient_documents(patient):
 
 
 @frappe.whitelist()
-def get_appointment_counts_for_month(start_date, end_date):
+def get_appointment_counts_for_month(start_date, end_date, practitioner=None, by_practitioner=0):
 	"""
 	Get the count of appointments for each day in the given date range
 	:param start_date: Start date of the range (YYYY-MM-DD)
 	:param end_date: End date of the range (YYYY-MM-DD)
-	:return: dict with date as key and count as value
+	:param practitioner: Only count appointments of this practitioner
+	:param by_practitioner: Break each day down per practitioner
+	:return: dict with date as key and count (or {practitioner: count}) as value
 	"""
-	from collections import defaultdict
-	
-	appointments = frappe.db.sql("""
-		SELECT 
-			DATE(appointment_datetime) as appointment_date,
-			COUNT(*) as count
-		FROM `tabPatient Appointment`
-		WHERE appointment_datetime >= %(start)s 
-			AND appointment_datetime < %(end)s
-			AND ifnull(status, '') != 'Cancelled'
-		GROUP BY DATE(appointment_datetime)
-	""", {
-		'start': start_date,
-		'end': end_date
-	}, as_dict=True)
-	
-	# Convert to a simple dict for easy lookup
-	counts = {}
-	for appt in appointments:
-		date_str = appt.appointment_date.strftime('%Y-%m-%d')
-		counts[date_str] = appt.count
-	
-	return counts
+	return get_daily_counts(start_date, end_date, practitioner=practitioner, by_practitioner=cint(by_practitioner))
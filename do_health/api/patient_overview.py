@@ -0,0 +1,57 @@
+import frappe
+from frappe.utils import getdate
+
+CACHE_PREFIX = "do_health:patient_overview"
+
+# The header, counts and upcoming visit follow the hooks below; appointment and encounter
+# fields changed with db_set skip them, so an overview is rebuilt at least every five minutes.
+CACHE_TTL = 300
+
+
+def _overview_key(patient):
+	# age and "upcoming" depend on the date, so each day starts from a fresh entry
+	return f"{CACHE_PREFIX}:{getdate().isoformat()}:{patient}"
+
+
+def get_cached_overview(patient, loader):
+	"""The assembled sidebar overview of 'patient', built with `loader(patient)` on a miss."""
+	cache = frappe.cache()
+	key = _overview_key(patient)
+	overview = cache.get_value(key)
+	if overview is None:
+		overview = loader(patient)
+		cache.set_value(key, overview, expires_in_sec=CACHE_TTL)
+	return overview
+
+
+def invalidate(patients):
+	keys = [_overview_key(patient) for patient in set(patients) if patient]
+	if keys:
+		frappe.cache().delete_value(keys)
+
+
+def invalidate_after_commit(*patients):
+	"""Drop now and again on commit, so a read racing the transaction cannot keep stale data."""
+	invalidate(patients)
+	frappe.db.after_commit.add(lambda: invalidate(patients))
+
+
+def _previous_patient(doc):
+	previous = doc.get_doc_before_save()
+	return previous.get("patient") if previous else None
+
+
+def on_patient_change(doc, method=None):
+	# relation lists of other patients show this patient's name, age and picture
+	related = frappe.get_all("Patient Relationship", filters={"patient": doc.name}, pluck="related_patient")
+	related += frappe.get_all("Patient Relationship", filters={"related_patient": doc.name}, pluck="patient")
+	invalidate_after_commit(doc.name, *related)
+
+
+def on_patient_record_change(doc, method=None):
+	"""Patient Appointment, Patient Encounter and Vital Signs hooks."""
+	invalidate_after_commit(doc.get("patient"), _previous_patient(doc))
+
+
+def on_relationship_change(doc, method=None):
+	invalidate_after_commit(doc.patient, doc.related_patient)
@@ -0,0 +1,227 @@
+import base64
+import heapq
+import json
+from collections import namedtuple
+
+import frappe
+from frappe import _
+from frappe.utils import cint, get_datetime
+
+from do_health.api.methods import (
+	CLINICAL_PROCEDURE_FIELDS,
+	MEDICATION_REQUEST_FIELDS,
+	SERVICE_REQUEST_FIELDS,
+	VITAL_SIGNS_FIELDS,
+	_format_date,
+	_format_time,
+	_label_order,
+	_label_vital,
+)
+
+DEFAULT_PAGE_LENGTH = 20
+MAX_PAGE_LENGTH = 100
+
+
+def _label_clinical_procedure(record):
+	record["start_date_label"] = _format_date(record.get("start_date"))
+	record["start_time_label"] = _format_time(record.get("start_time"))
+	return record
+
+
+def _label_appointment(record):
+	record["appointment_date_label"] = _format_date(record.get("appointment_date"))
+	record["appointment_time_label"] = _format_time(record.get("appointment_time"))
+	return record
+
+
+def _label_encounter(record):
+	record["encounter_date_label"] = _format_date(record.get("encounter_date"))
+	record["encounter_time_label"] = _format_time(record.get("encounter_time"))
+	return record
+
+
+def _label_invoice(record):
+	record["posting_date_label"] = _format_date(record.get("posting_date"))
+	record["posting_time_label"] = _format_time(record.get("posting_time"))
+	return record
+
+
+def _label_consent(record):
+	record["signed_on_label"] = _format_date(record.get("signed_on"))
+	return record
+
+
+def _timestamp(date_field, time_field):
+	# undated rows sort by creation so every row has a position in the stream
+	return f"COALESCE(TIMESTAMP(`{date_field}`, IFNULL(`{time_field}`, '00:00:00')), `creation`)"
+
+
+# timestamp: SQL expression ordering the stream, label: formats a row for display,
+# condition: extra WHERE clause (cancelled documents are skipped by default)
+Source = namedtuple("Source", ["timestamp", "fields", "label", "condition"], defaults=["`docstatus` < 2"])
+
+
+# Every source is read with one keyset query: WHERE patient = ... AND (timestamp, name) < cursor
+SOURCES = {
+	"Patient Appointment": Source(
+		"COALESCE(`appointment_datetime`, `creation`)",
+		[
+			"name",
+			"appointment_type",
+			"status",
+			"custom_visit_status",
+			"practitioner",
+			"practitioner_name",
+			"department",
+			"service_unit",
+			"appointment_date",
+			"appointment_time",
+		],
+		_label_appointment,
+		"1 = 1",
+	),
+	"Patient Encounter": Source(
+		_timestamp("encounter_date", "encounter_time"),
+		[
+			"name",
+			"status",
+			"practitioner",
+			"practitioner_name",
+			"medical_department",
+			"appointment",
+			"encounter_date",
+			"encounter_time",
+		],
+		_label_encounter,
+	),
+	"Vital Signs": Source(_timestamp("signs_date", "signs_time"), VITAL_SIGNS_FIELDS, _label_vital),
+	"Clinical Procedure": Source(
+		_timestamp("start_date", "start_time"), CLINICAL_PROCEDURE_FIELDS, _label_clinical_procedure
+	),
+	"Service Request": Source(_timestamp("order_date", "order_time"), SERVICE_REQUEST_FIELDS, _label_order),
+	"Medication Request": Source(_timestamp("order_date", "order_time"), MEDICATION_REQUEST_FIELDS, _label_order),
+	"Sales Invoice": Source(
+		_timestamp("posting_date", "posting_time"),
+		["name", "status", "posting_date", "posting_time", "currency", "grand_total", "outstanding_amount"],
+		_label_invoice,
+	),
+	"Consent Form": Source(
+		"COALESCE(`signed_on`, `creation`)",
+		["name", "status", "consent_form_template", "clinical_procedure", "encounter", "signed_by", "signed_on"],
+		_label_consent,
+	),
+}
+
+
+def encode_cursor(timestamp, doctype, name):
+	payload = json.dumps([str(timestamp), doctype, name])
+	return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+	if not cursor:
+		return None
+	try:
+		timestamp, doctype, name = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		get_datetime(timestamp)
+	except Exception:
+		frappe.throw(_("Invalid timeline cursor"))
+	return timestamp, doctype, name
+
+
+def _cursor_condition(source, doctype, cursor):
+	"""
+	Rows strictly after 'cursor' in (timestamp desc, doctype desc, name desc) order. The doctype is
+	constant per source, so it only decides how rows sharing the cursor's timestamp are treated.
+	"""
+	if not cursor:
+		return "1 = 1"
+	cursor_doctype = cursor[1]
+	if doctype < cursor_doctype:
+		return f"{source.timestamp} <= %(cursor_ts)s"
+	if doctype == cursor_doctype:
+		return (
+			f"({source.timestamp} < %(cursor_ts)s"
+			f" OR ({source.timestamp} = %(cursor_ts)s AND `name` < %(cursor_name)s))"
+		)
+	return f"{source.timestamp} < %(cursor_ts)s"
+
+
+def _read_source(doctype, patient, cursor, limit):
+	source = SOURCES[doctype]
+	fields = ", ".join(f"`{field}`" for field in source.fields)
+	return frappe.db.sql(
+		f"""
+		SELECT {source.timestamp} AS timeline_ts, {fields}
+		FROM `tab{doctype}`
+		WHERE `patient` = %(patient)s
+			AND {source.condition}
+			AND {_cursor_condition(source, doctype, cursor)}
+		ORDER BY timeline_ts DESC, `name` DESC
+		LIMIT %(limit)s
+		""",
+		{
+			"patient": patient,
+			"cursor_ts": cursor[0] if cursor else None,
+			"cursor_name": cursor[2] if cursor else None,
+			"limit": limit,
+		},
+		as_dict=True,
+	)
+
+
+def _entries(doctype, rows):
+	label = SOURCES[doctype].label
+	for row in rows:
+		timestamp = row.pop("timeline_ts")
+		yield {
+			"doctype": doctype,
+			"name": row.name,
+			"timestamp": timestamp,
+			"date_label": _format_date(timestamp),
+			"time_label": _format_time(timestamp),
+			"data": label(row),
+		}
+
+
+@frappe.whitelist()
+def get_patient_timeline(patient, cursor=None, page_length=DEFAULT_PAGE_LENGTH, doctypes=None):
+	"""
+	One page of the patient's history, newest first, across appointments, encounters, vitals,
+	procedures, orders, invoices and consent forms. Pass the returned 'next_cursor' to load the
+	next page; it is None once the history is exhausted.
+	"""
+	if not patient:
+		frappe.throw(_("Patient is required"))
+	frappe.has_permission("Patient", doc=patient, throw=True)
+
+	page_length = min(max(cint(page_length) or DEFAULT_PAGE_LENGTH, 1), MAX_PAGE_LENGTH)
+	doctypes = frappe.parse_json(doctypes) if isinstance(doctypes, str) else doctypes
+	doctypes = [
+		doctype
+		for doctype in (doctypes or SOURCES)
+		if doctype in SOURCES and frappe.has_permission(doctype, "read")
+	]
+	position = decode_cursor(cursor)
+
+	# each source contributes at most one page; merging the pre-sorted streams yields the global page
+	streams = [
+		_entries(doctype, _read_source(doctype, patient, position, page_length + 1)) for doctype in doctypes
+	]
+	merged = heapq.merge(
+		*streams, key=lambda entry: (get_datetime(entry["timestamp"]), entry["doctype"]), reverse=True
+	)
+
+	entries = []
+	has_more = False
+	for entry in merged:
+		if len(entries) == page_length:
+			has_more = True
+			break
+		entries.append(entry)
+
+	last = entries[-1] if entries else None
+	return {
+		"entries": entries,
+		"next_cursor": encode_cursor(last["timestamp"], last["doctype"], last["name"]) if has_more else None,
+	}
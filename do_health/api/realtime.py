@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any
+
+import frappe
+from frappe.model import no_value_fields, table_fields
+
+
+def _pending() -> dict:
+	if not hasattr(frappe.local, "do_health_realtime_events"):
+		frappe.local.do_health_realtime_events = {}
+	return frappe.local.do_health_realtime_events
+
+
+def _changed_fields(doc) -> list[str] | None:
+	"""Fields that differ from the saved version; None for a document saved for the first time."""
+	previous = doc.get_doc_before_save()
+	if not previous:
+		return None
+
+	changed = []
+	for df in doc.meta.fields:
+		if df.fieldtype in table_fields:
+			# child rows get the parent's `modified` on every save, so compare their content instead
+			if _table_rows(doc, df.fieldname) != _table_rows(previous, df.fieldname):
+				changed.append(df.fieldname)
+		elif df.fieldtype not in no_value_fields and doc.get(df.fieldname) != previous.get(df.fieldname):
+			changed.append(df.fieldname)
+	if doc.docstatus != previous.docstatus:
+		changed.append("docstatus")
+	return changed
+
+
+def _table_rows(doc, fieldname: str) -> list[tuple[str, dict]]:
+	"""(name, data fields) of each row of a child table, in order."""
+	return [(row.name, row.as_dict(no_default_fields=True)) for row in doc.get(fieldname) or []]
+
+
+def publish_doc_update(event: str, doc, rooms: tuple[tuple[str, str], ...] = ()) -> None:
+	"""
+	Publish {doctype, name, changed, modified, docstatus} to the document's room (and any related
+	document rooms) once the transaction commits. Several saves of the same document in one
+	transaction are merged into a single message.
+	"""
+	pending = _pending()
+	if not pending:
+		frappe.db.after_commit.add(_flush)
+		frappe.db.after_rollback.add(_discard)
+
+	changed = _changed_fields(doc)
+	key = (event, doc.doctype, doc.name)
+	entry = pending.get(key)
+	if entry:
+		previous = entry["message"]["changed"]
+		# None means "new document", which stays the answer for the whole transaction
+		entry["message"]["changed"] = None if previous is None or changed is None else sorted({*previous, *changed})
+		entry["message"].update(modified=doc.modified, docstatus=doc.docstatus)
+		entry["rooms"].update(rooms)
+		return
+
+	pending[key] = {
+		"message": {
+			"doctype": doc.doctype,
+			"name": doc.name,
+			"changed": changed,
+			"modified": doc.modified,
+			"docstatus": doc.docstatus,
+		},
+		"rooms": {(doc.doctype, doc.name), *rooms},
+	}
+
+
+def _flush() -> None:
+	pending = _pending()
+	frappe.local.do_health_realtime_events = {}
+	for (event, _doctype, _name), entry in pending.items():
+		for doctype, name in entry["rooms"]:
+			if not name:
+				continue
+			# doc rooms are only joined by users allowed to read that document
+			frappe.publish_realtime(event, entry["message"], doctype=doctype, docname=name)
+
+
+def _discard() -> None:
+	frappe.local.do_health_realtime_events = {}
+
+
+def related_rooms(doc, *fields: str) -> tuple[tuple[str, Any], ...]:
+	"""Rooms of the documents linked from 'fields' (e.g. the patient of an encounter)."""
+	rooms = []
+	for fieldname in fields:
+		df = doc.meta.get_field(fieldname)
+		if df and df.options and doc.get(fieldname):
+			rooms.append((df.options, doc.get(fieldname)))
+	return tuple(rooms)
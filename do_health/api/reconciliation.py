@@ -0,0 +1,230 @@
+import csv
+
+import frappe
+from frappe import _
+from frappe.utils import date_diff, flt, getdate, now_datetime
+
+from do_health.do_health.doctype.appointment_activity.appointment_activity import (
+	APPOINTMENT_FIELDS,
+	get_billing_sources,
+)
+
+# appointments reconciled per round of source queries
+BATCH_SIZE = 500
+
+# longer ranges are exported to CSV in the background instead of returned as JSON
+MAX_INLINE_DAYS = 31
+
+RECONCILIATION_ROLES = ["Accounts Manager", "Accounts User", "System Manager"]
+
+READY_EVENT = "do_health_reconciliation_ready"
+
+CSV_COLUMNS = [
+	"appointment",
+	"appointment_date",
+	"patient",
+	"patient_name",
+	"practitioner",
+	"company",
+	"visit_status",
+	"currency",
+	"invoices",
+	"draft_invoices",
+	"billed",
+	"paid_at_invoice",
+	"allocated_payments",
+	"outstanding",
+	"difference",
+]
+
+
+def _appointment_batches(from_date, to_date, filters):
+	"""Appointments of [from_date, to_date] in batches, paged on (appointment_date, name)."""
+	appointment = frappe.qb.DocType("Patient Appointment")
+	fields = [*APPOINTMENT_FIELDS, "appointment_date", "patient", "patient_name", "practitioner"]
+	last = None
+	while True:
+		query = (
+			frappe.qb.from_(appointment)
+			.select(*[appointment[field] for field in fields])
+			.where(appointment.appointment_date.between(from_date, to_date))
+			.orderby(appointment.appointment_date)
+			.orderby(appointment.name)
+			.limit(BATCH_SIZE)
+		)
+		for field, value in filters.items():
+			query = query.where(appointment[field] == value)
+		if last:
+			query = query.where(
+				(appointment.appointment_date > last.appointment_date)
+				| ((appointment.appointment_date == last.appointment_date) & (appointment.name > last.name))
+			)
+
+		rows = query.run(as_dict=True)
+		if not rows:
+			return
+		yield {row.name: row for row in rows}
+		if len(rows) < BATCH_SIZE:
+			return
+		last = rows[-1]
+
+
+def _reconcile_batch(appointments):
+	"""Billed vs settled per appointment and currency, from the visit-log billing sources."""
+	contexts, invoices, payment_refs, payments = get_billing_sources(appointments)
+
+	lines = {}
+
+	def line(appointment, currency):
+		key = (appointment.name, currency or "")
+		if key not in lines:
+			lines[key] = {
+				"appointment": appointment.name,
+				"appointment_date": appointment.appointment_date,
+				"patient": appointment.patient,
+				"patient_name": appointment.patient_name,
+				"practitioner": appointment.practitioner,
+				"company": appointment.company,
+				"visit_status": appointment.custom_visit_status or appointment.status,
+				"currency": currency,
+				"invoices": 0,
+				"draft_invoices": 0,
+				"billed": 0.0,
+				"paid_at_invoice": 0.0,
+				"allocated_payments": 0.0,
+				"outstanding": 0.0,
+			}
+		return lines[key]
+
+	for invoice in invoices.values():
+		appointment = contexts[invoice.name][0]
+		entry = line(appointment, invoice.currency)
+		if invoice.docstatus == 0:
+			entry["draft_invoices"] += 1
+		elif invoice.docstatus == 1:
+			entry["invoices"] += 1
+			entry["billed"] += flt(invoice.grand_total)
+			entry["paid_at_invoice"] += flt(invoice.paid_amount)
+			entry["outstanding"] += flt(invoice.outstanding_amount)
+
+	for ref in payment_refs:
+		payment = payments.get(ref.parent)
+		invoice = invoices.get(ref.reference_name)
+		if not payment or payment.docstatus != 1 or not invoice or invoice.docstatus != 1:
+			continue
+		entry = line(contexts[ref.reference_name][0], invoice.currency)
+		entry["allocated_payments"] += flt(ref.allocated_amount)
+
+	# appointments without invoices still show up, so unbilled visits are visible
+	reconciled = {name for name, _currency in lines}
+	for appointment in appointments.values():
+		if appointment.name not in reconciled:
+			line(appointment, None)
+
+	result = []
+	for entry in lines.values():
+		# non-zero when payments, write-offs or returns do not explain the outstanding amount
+		entry["difference"] = flt(
+			entry["billed"] - entry["paid_at_invoice"] - entry["allocated_payments"] - entry["outstanding"], 6
+		)
+		result.append(entry)
+	result.sort(key=lambda entry: (entry["appointment_date"], entry["appointment"], entry["currency"] or ""))
+	return result
+
+
+def iter_reconciliation(from_date, to_date, filters=None):
+	"""Reconciliation lines of every appointment in the range, one batch of source queries at a time."""
+	for appointments in _appointment_batches(getdate(from_date), getdate(to_date), filters or {}):
+		yield from _reconcile_batch(appointments)
+
+
+def _add_to_totals(totals, entry):
+	currency = entry["currency"] or ""
+	total = totals.setdefault(
+		currency,
+		{
+			"currency": entry["currency"],
+			"appointments": 0,
+			"invoices": 0,
+			"billed": 0.0,
+			"paid_at_invoice": 0.0,
+			"allocated_payments": 0.0,
+			"outstanding": 0.0,
+			"difference": 0.0,
+		},
+	)
+	total["appointments"] += 1
+	for field in ("invoices", "billed", "paid_at_invoice", "allocated_payments", "outstanding", "difference"):
+		total[field] += entry[field]
+
+
+def _parse_filters(practitioner=None, company=None):
+	filters = {}
+	if practitioner:
+		filters["practitioner"] = practitioner
+	if company:
+		filters["company"] = company
+	return filters
+
+
+@frappe.whitelist()
+def get_reconciliation(from_date, to_date=None, practitioner=None, company=None):
+	"""Per-appointment and per-currency billed vs paid for a day or a short period."""
+	frappe.only_for(RECONCILIATION_ROLES)
+	to_date = to_date or from_date
+	if date_diff(to_date, from_date) + 1 > MAX_INLINE_DAYS:
+		frappe.throw(
+			_("Reconcile at most {0} days at once, or export the period to CSV.").format(MAX_INLINE_DAYS)
+		)
+
+	totals = {}
+	appointments = []
+	for entry in iter_reconciliation(from_date, to_date, _parse_filters(practitioner, company)):
+		appointments.append(entry)
+		_add_to_totals(totals, entry)
+	return {"appointments": appointments, "totals": list(totals.values())}
+
+
+@frappe.whitelist()
+def export_reconciliation_csv(from_date, to_date, practitioner=None, company=None):
+	"""Queue a CSV export of the period; the user is notified with the file URL when it is ready."""
+	frappe.only_for(RECONCILIATION_ROLES)
+	job = frappe.enqueue(
+		write_reconciliation_csv,
+		queue="long",
+		from_date=str(getdate(from_date)),
+		to_date=str(getdate(to_date)),
+		filters=_parse_filters(practitioner, company),
+		user=frappe.session.user,
+	)
+	return {"job_id": job.id if job else None}
+
+
+def write_reconciliation_csv(from_date, to_date, filters=None, user=None):
+	"""
+	Write the reconciliation to a private file line by line, so memory stays bounded by one
+	batch however long the period is; per-currency totals are appended at the end.
+	"""
+	file_name = f"reconciliation-{from_date}-{to_date}-{now_datetime():%Y%m%d%H%M%S}.csv"
+	path = frappe.get_site_path("private", "files", file_name)
+
+	totals = {}
+	with open(path, "w", newline="", encoding="utf-8") as handle:
+		writer = csv.DictWriter(handle, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+		writer.writeheader()
+		for entry in iter_reconciliation(from_date, to_date, filters):
+			writer.writerow(entry)
+			_add_to_totals(totals, entry)
+
+		writer.writerow({})
+		for total in totals.values():
+			writer.writerow(dict(total, appointment=_("Total"), currency=total["currency"]))
+
+	file_doc = frappe.get_doc(
+		{"doctype": "File", "file_name": file_name, "file_url": f"/private/files/{file_name}", "is_private": 1}
+	)
+	file_doc.insert(ignore_permissions=True)
+	if user:
+		file_doc.db_set("owner", user)
+		frappe.publish_realtime(READY_EVENT, {"file_url": file_doc.file_url}, user=user, after_commit=True)
+	return file_doc.file_url
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import copy
+from collections.abc import Callable, Iterable
+from typing import Any, Final
+
+import frappe
+
+CACHE_PREFIX: Final[str] = "do_health:slot_config"
+
+# Entries are versioned, the TTL only reclaims hashes left behind by a version bump.
+CACHE_TTL: Final[int] = 24 * 60 * 60
+
+SERVICE_UNIT_FIELDS: Final[list[str]] = [
+	"name",
+	"overlap_appointments",
+	"allow_appointments",
+	"service_unit_capacity",
+]
+
+# (doctype, name) -> (version, value); shared by every request served by this worker
+_process_cache: dict[tuple[str, str], tuple[str, Any]] = {}
+
+
+def _version_key(doctype: str) -> str:
+	return f"{CACHE_PREFIX}:version:{doctype}"
+
+
+def _data_key(doctype: str, version: str) -> str:
+	return f"{CACHE_PREFIX}:{doctype}:{version}"
+
+
+def _get_version(doctype: str) -> str:
+	"""The doctype version, read from Redis once per request so worker memory is checked against it."""
+	versions = frappe.flags.setdefault("do_health_slot_config_versions", {})
+	if doctype not in versions:
+		cache = frappe.cache()
+		version = cache.get_value(_version_key(doctype))
+		if not version:
+			version = frappe.generate_hash(length=10)
+			cache.set_value(_version_key(doctype), version)
+		versions[doctype] = version
+	return versions[doctype]
+
+
+def _get_many(doctype: str, names: Iterable[str], loader: Callable[[list[str]], dict[str, Any]]) -> dict[str, Any]:
+	"""
+	Look names up in the worker memory, then Redis, then `loader(missing_names)`.
+	Every layer is keyed by the doctype version so a save anywhere invalidates all workers.
+	"""
+	names = [name for name in dict.fromkeys(names) if name]
+	if not names:
+		return {}
+
+	version = _get_version(doctype)
+	found = {}
+	missing = []
+	for name in names:
+		entry = _process_cache.get((doctype, name))
+		if entry and entry[0] == version:
+			found[name] = entry[1]
+		else:
+			missing.append(name)
+
+	if missing:
+		cache = frappe.cache()
+		key = _data_key(doctype, version)
+		from_redis = {}
+		for name in missing:
+			value = cache.hget(key, name)
+			if value is not None:
+				from_redis[name] = value
+
+		to_load = [name for name in missing if name not in from_redis]
+		loaded = loader(to_load) if to_load else {}
+		for name, value in loaded.items():
+			cache.hset(key, name, value)
+		if loaded:
+			cache.expire(cache.make_key(key), CACHE_TTL)
+
+		for name, value in {**from_redis, **loaded}.items():
+			_process_cache[(doctype, name)] = (version, value)
+			found[name] = value
+
+	# callers get their own copy so they can't mutate the shared entries
+	return {name: copy.deepcopy(found[name]) for name in names if name in found}
+
+
+def _load_schedules(names: list[str]) -> dict[str, frappe._dict]:
+	schedules = {
+		row.name: frappe._dict(row, time_slots=[])
+		for row in frappe.get_all(
+			"Practitioner Schedule",
+			filters={"name": ["in", names]},
+			fields=["name", "disabled", "allow_video_conferencing"],
+		)
+	}
+	if schedules:
+		for slot in frappe.get_all(
+			"Healthcare Schedule Time Slot",
+			filters={"parenttype": "Practitioner Schedule", "parent": ["in", list(schedules)]},
+			fields=["*"],
+			order_by="idx asc",
+		):
+			schedules[slot.parent].time_slots.append(slot)
+	return schedules
+
+
+def _load_service_units(names: list[str]) -> dict[str, frappe._dict]:
+	return {
+		row.name: row
+		for row in frappe.get_all(
+			"Healthcare Service Unit",
+			filters={"name": ["in", names]},
+			fields=SERVICE_UNIT_FIELDS,
+		)
+	}
+
+
+def _load_availability(names: list[str]) -> dict[str, frappe._dict]:
+	return {
+		row.name: row
+		for row in frappe.get_all("Practitioner Availability", filters={"name": ["in", names]}, fields=["*"])
+	}
+
+
+def get_schedules(names: Iterable[str]) -> dict[str, frappe._dict]:
+	"""Practitioner Schedules with their 'time_slots' rows."""
+	return _get_many("Practitioner Schedule", names, _load_schedules)
+
+
+def get_schedule(name: str) -> frappe._dict | None:
+	return get_schedules([name]).get(name)
+
+
+def get_service_units(names: Iterable[str]) -> dict[str, frappe._dict]:
+	"""Overlap and capacity settings of Healthcare Service Units."""
+	return _get_many("Healthcare Service Unit", names, _load_service_units)
+
+
+def get_service_unit(name: str) -> frappe._dict:
+	return get_service_units([name]).get(name) or frappe._dict()
+
+
+def get_availability(names: Iterable[str]) -> dict[str, frappe._dict]:
+	"""Practitioner Availability records (all fields)."""
+	return _get_many("Practitioner Availability", names, _load_availability)
+
+
+def invalidate(doctype: str) -> None:
+	cache = frappe.cache()
+	version = cache.get_value(_version_key(doctype))
+	if version:
+		cache.delete_value(_data_key(doctype, version))
+	cache.set_value(_version_key(doctype), frappe.generate_hash(length=10))
+	frappe.flags.setdefault("do_health_slot_config_versions", {}).pop(doctype, None)
+
+
+def invalidate_after_commit(doctype: str) -> None:
+	"""Bump now and again on commit, so entries loaded from the uncommitted save are discarded."""
+	invalidate(doctype)
+	frappe.db.after_commit.add(lambda: invalidate(doctype))
+
+
+def on_config_change(doc, method=None):
+	invalidate_after_commit(doc.doctype)
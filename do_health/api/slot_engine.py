@@ -0,0 +1,158 @@
+"""
+Free-slot computation for practitioner schedules.
+
+Serves get_availability_data (rendered by `get_slots` in patient_appointment_calendar.js)
+and the availability matrix: a slot is closed when a booked interval overlaps it and the
+service unit does not allow overlap, when overlapping bookings reach the unit capacity,
+when a zero-duration booking starts inside it, or when it has already started today.
+Day-based slots (`maximum_appointments`) only count the day's bookings.
+
+Booked intervals are swept once in start order: each booking enters and leaves a heap
+once, and each slot only counts the bookings still running when it starts. A schedule
+entry costs O((slots + bookings) log bookings + slots x concurrent bookings) instead of
+slots x bookings comparisons.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime
+import heapq
+from typing import Any
+
+
+def to_seconds(value: Any) -> int:
+	"""Seconds since midnight for timedelta / time / datetime / 'HH:MM[:SS[.ffffff]]' values."""
+	if value is None or value == "":
+		return 0
+	if isinstance(value, datetime.timedelta):
+		return int(value.total_seconds())
+	if isinstance(value, datetime.datetime):
+		value = value.time()
+	if isinstance(value, datetime.time):
+		return value.hour * 3600 + value.minute * 60 + value.second
+	parts = str(value).split(":")
+	hours = int(parts[0])
+	minutes = int(parts[1]) if len(parts) > 1 else 0
+	seconds = int(float(parts[2])) if len(parts) > 2 else 0
+	return hours * 3600 + minutes * 60 + seconds
+
+
+def format_seconds(seconds: int) -> str:
+	hours, remainder = divmod(int(seconds), 3600)
+	return f"{hours:02d}:{remainder // 60:02d}:{remainder % 60:02d}"
+
+
+def _booked_intervals(booked: list[dict]) -> list[tuple[int, int]]:
+	intervals = []
+	for row in booked or []:
+		start = to_seconds(row.get("appointment_time"))
+		intervals.append((start, start + int(float(row.get("duration") or 0) * 60)))
+	intervals.sort()
+	return intervals
+
+
+def compute_open_slots(
+	slots: list[dict],
+	booked: list[dict],
+	allow_overlap: Any = 0,
+	capacity: Any = 0,
+	not_before: Any = None,
+) -> list[dict]:
+	"""
+	Return the slots that can still be booked.
+	:param slots: dicts with 'from_time', 'to_time' and optionally 'maximum_appointments'
+	:param booked: appointments / unavailability with 'appointment_time' and 'duration' (minutes)
+	:param allow_overlap: service unit accepts overlapping appointments up to 'capacity'
+	:param not_before: time of day before which slots are considered past (today only)
+	:return: slot dicts with 'booked' (overlapping count) and 'available' (remaining capacity, None if unbounded)
+	"""
+	allow_overlap = int(allow_overlap or 0) == 1
+	capacity = int(capacity or 0) or 1
+	cutoff = to_seconds(not_before) if not_before is not None else None
+
+	intervals = _booked_intervals(booked)
+	zero_length = [start for start, end in intervals if start == end]
+	day_count = len(intervals)
+
+	ordered = sorted(
+		((to_seconds(slot.get("from_time")), to_seconds(slot.get("to_time")), slot) for slot in slots),
+		key=lambda entry: entry[0],
+	)
+
+	open_slots = []
+	active: list[tuple[int, int]] = []  # heap of (end, start) for bookings started before the slot ends
+	cursor = 0
+	for slot_start, slot_end, slot in ordered:
+		maximum = int(slot.get("maximum_appointments") or 0)
+		if maximum:
+			if day_count < maximum:
+				open_slots.append(_open_slot(slot, slot_start, slot_end, day_count, maximum - day_count))
+			continue
+
+		if cutoff is not None and slot_start < cutoff:
+			continue
+
+		while cursor < len(intervals) and intervals[cursor][0] < slot_end:
+			start, end = intervals[cursor]
+			heapq.heappush(active, (end, start))
+			cursor += 1
+		while active and active[0][0] <= slot_start:
+			heapq.heappop(active)
+
+		# slots may differ in length, so re-check the start against this slot's end
+		overlapping = sum(1 for end, start in active if start < slot_end and end > slot_start)
+		if bisect.bisect_left(zero_length, slot_start) < bisect.bisect_left(zero_length, slot_end):
+			# a zero-duration block starts inside [slot_start, slot_end)
+			continue
+
+		if not allow_overlap:
+			if not overlapping:
+				open_slots.append(_open_slot(slot, slot_start, slot_end, 0, None))
+		elif overlapping < capacity:
+			available = capacity - overlapping if capacity > 1 else None
+			open_slots.append(_open_slot(slot, slot_start, slot_end, overlapping, available))
+
+	return open_slots
+
+
+def _open_slot(slot: dict, start: int, end: int, booked: int, available: int | None) -> dict:
+	return {
+		"from_time": format_seconds(start),
+		"to_time": format_seconds(end),
+		"duration": (end - start) // 60,
+		"maximum_appointments": int(slot.get("maximum_appointments") or 0) or None,
+		"booked": booked,
+		"available": available,
+	}
+
+
+def build_open_slot_details(slot_details: list[dict], date: Any, now: Any = None) -> list[dict]:
+	"""
+	Replace the raw 'avail_slot' templates and 'appointments' of get_availability_data style
+	slot details with the open slots only.
+	"""
+	not_before = None
+	if now is not None and _as_date(now) == _as_date(date):
+		not_before = now.time() if isinstance(now, datetime.datetime) else None
+
+	result = []
+	for detail in slot_details:
+		entry = {key: value for key, value in detail.items() if key not in ("avail_slot", "appointments")}
+		entry["open_slots"] = compute_open_slots(
+			detail.get("avail_slot") or [],
+			detail.get("appointments") or [],
+			allow_overlap=detail.get("allow_overlap"),
+			capacity=detail.get("service_unit_capacity"),
+			not_before=not_before,
+		)
+		result.append(entry)
+	return result
+
+
+def _as_date(value: Any) -> datetime.date:
+	if isinstance(value, datetime.datetime):
+		return value.date()
+	if isinstance(value, datetime.date):
+		return value
+	return datetime.date.fromisoformat(str(value)[:10])
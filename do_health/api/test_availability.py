@@ -0,0 +1,42 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import datetime
+import types
+import unittest
+from unittest.mock import patch
+
+from do_health.api import availability
+
+START = datetime.date(2026, 1, 5)
+
+
+def _context(practitioners, from_date, to_date):
+	return types.SimpleNamespace(from_date=from_date, to_date=to_date)
+
+
+def _open_from(first_open):
+	def build_day(context, practitioner, date, duration, now=None):
+		if date < first_open:
+			return {"slot_details": [], "unavailable_reason": None}
+		return {
+			"slot_details": [{"slot_name": "Morning", "open_slots": [{"from_time": "09:00:00", "to_time": "09:30:00"}]}],
+			"unavailable_reason": None,
+		}
+
+	return build_day
+
+
+class TestFindNextAvailableSlots(unittest.TestCase):
+	def test_search_continues_past_windows_without_candidates(self):
+		first_open = START + datetime.timedelta(days=availability.SEARCH_WINDOW_DAYS * 2 + 1)
+		with (
+			patch.object(availability, "load_availability_context", side_effect=_context),
+			patch.object(availability, "_can_have_slots", side_effect=lambda context, name: context.to_date >= first_open),
+			patch.object(availability, "build_day", side_effect=_open_from(first_open)),
+		):
+			found = availability.find_next_available_slots(["HLC-PRAC-0001"], from_date=START, days=28, limit=1)
+
+		self.assertEqual(len(found), 1)
+		self.assertEqual(found[0]["date"], first_open.isoformat())
+		self.assertEqual(found[0]["practitioner"], "HLC-PRAC-0001")
@@ -0,0 +1,39 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import math
+import unittest
+
+from do_health.api.downsample import lttb, min_max
+
+
+def _series(count):
+	return [(float(index), math.sin(index / 10)) for index in range(count)]
+
+
+class TestDownsample(unittest.TestCase):
+	def test_short_series_is_returned_unchanged(self):
+		points = _series(10)
+		self.assertEqual(lttb(points, 20), points)
+		self.assertEqual(min_max(points, 20), points)
+
+	def test_lttb_keeps_endpoints_and_size(self):
+		points = _series(1000)
+		sampled = lttb(points, 50)
+		self.assertEqual(len(sampled), 50)
+		self.assertEqual(sampled[0], points[0])
+		self.assertEqual(sampled[-1], points[-1])
+		self.assertEqual(sampled, sorted(sampled))
+
+	def test_lttb_keeps_spike(self):
+		points = [(float(index), 0.0) for index in range(500)]
+		points[250] = (250.0, 100.0)
+		self.assertIn((250.0, 100.0), lttb(points, 20))
+
+	def test_min_max_keeps_extremes(self):
+		points = _series(1000)
+		sampled = min_max(points, 40)
+		self.assertLessEqual(len(sampled), 40)
+		self.assertEqual(max(y for _x, y in sampled), max(y for _x, y in points))
+		self.assertEqual(min(y for _x, y in sampled), min(y for _x, y in points))
+		self.assertEqual(sampled, sorted(sampled))
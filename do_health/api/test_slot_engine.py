@@ -0,0 +1,118 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import datetime
+import random
+import timeit
+import unittest
+
+from do_health.api.slot_engine import build_open_slot_details, compute_open_slots, to_seconds
+
+
+def _slots(start_hour, end_hour, minutes=30):
+	slots = []
+	current = datetime.timedelta(hours=start_hour)
+	while current < datetime.timedelta(hours=end_hour):
+		slots.append({"from_time": current, "to_time": current + datetime.timedelta(minutes=minutes)})
+		current += datetime.timedelta(minutes=minutes)
+	return slots
+
+
+def _booked(time, duration):
+	return {"appointment_time": time, "duration": duration}
+
+
+class TestSlotEngine(unittest.TestCase):
+	def test_to_seconds(self):
+		self.assertEqual(to_seconds(datetime.timedelta(hours=9, minutes=30)), 34200)
+		self.assertEqual(to_seconds(datetime.time(9, 30)), 34200)
+		self.assertEqual(to_seconds("09:30:00"), 34200)
+		self.assertEqual(to_seconds("9:30:00.000000"), 34200)
+
+	def test_overlap_closes_slot_without_overlap(self):
+		open_slots = compute_open_slots(_slots(9, 11), [_booked("09:15:00", 30)])
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["10:00:00", "10:30:00"])
+
+	def test_touching_booking_keeps_slot_open(self):
+		open_slots = compute_open_slots(_slots(9, 10), [_booked("08:30:00", 30), _booked("09:30:00", 30)])
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["09:00:00"])
+
+	def test_capacity_with_overlap(self):
+		booked = [_booked("09:00:00", 30), _booked("09:00:00", 30), _booked("09:30:00", 30)]
+		open_slots = compute_open_slots(_slots(9, 10), booked, allow_overlap=1, capacity=2)
+		self.assertEqual(len(open_slots), 1)
+		self.assertEqual(open_slots[0]["from_time"], "09:30:00")
+		self.assertEqual(open_slots[0]["booked"], 1)
+		self.assertEqual(open_slots[0]["available"], 1)
+
+	def test_zero_capacity_counts_as_one(self):
+		open_slots = compute_open_slots(_slots(9, 10), [_booked("09:00:00", 30)], allow_overlap=1, capacity=0)
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["09:30:00"])
+
+	def test_zero_duration_booking_closes_slot(self):
+		open_slots = compute_open_slots(_slots(9, 10), [_booked("09:10:00", 0)], allow_overlap=1, capacity=5)
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["09:30:00"])
+
+	def test_zero_duration_booking_at_slot_end_keeps_slot_open(self):
+		open_slots = compute_open_slots(_slots(9, 10), [_booked("09:30:00", 0)])
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["09:00:00"])
+
+	def test_long_booking_spans_slots(self):
+		slots = _slots(9, 12) + [{"from_time": "08:00:00", "to_time": "12:00:00"}]
+		open_slots = compute_open_slots(slots, [_booked("09:45:00", 60)])
+		self.assertEqual([slot["from_time"] for slot in open_slots], ["09:00:00", "11:00:00", "11:30:00"])
+
+	def test_maximum_appointments_uses_day_count(self):
+		slots = [{"from_time": "09:00:00", "to_time": "13:00:00", "maximum_appointments": 3}]
+		booked = [_booked("09:00:00", 10), _booked("12:00:00", 10)]
+		open_slots = compute_open_slots(slots, booked, not_before="14:00:00")
+		self.assertEqual(open_slots[0]["available"], 1)
+		self.assertFalse(compute_open_slots(slots, booked + [_booked("10:00:00", 10)]))
+
+	def test_past_slots_only_closed_today(self):
+		details = [{"slot_name": "Morning", "avail_slot": _slots(9, 11), "appointments": []}]
+		now = datetime.datetime(2026, 1, 5, 10, 5)
+
+		today = build_open_slot_details(details, datetime.date(2026, 1, 5), now)
+		self.assertEqual([slot["from_time"] for slot in today[0]["open_slots"]], ["10:30:00"])
+		self.assertNotIn("avail_slot", today[0])
+
+		tomorrow = build_open_slot_details(details, "2026-01-06", now)
+		self.assertEqual(len(tomorrow[0]["open_slots"]), 4)
+
+	def test_matches_pairwise_scan(self):
+		rng = random.Random(7)
+		slots = _slots(8, 18, 15)
+		booked = [_booked(f"{rng.randint(8, 17):02d}:{rng.choice((0, 10, 20, 45)):02d}:00", 20) for _ in range(40)]
+		for allow_overlap, capacity in ((0, 0), (1, 3)):
+			expected = [slot for slot in slots if _pairwise_open(slot, booked, allow_overlap, capacity)]
+			actual = compute_open_slots(slots, booked, allow_overlap, capacity)
+			self.assertEqual(
+				[slot["from_time"] for slot in actual],
+				[str(slot["from_time"]).zfill(8) for slot in expected],
+			)
+
+
+def _pairwise_open(slot, booked, allow_overlap, capacity):
+	start, end = to_seconds(slot["from_time"]), to_seconds(slot["to_time"])
+	count = 0
+	for row in booked:
+		booked_start = to_seconds(row["appointment_time"])
+		booked_end = booked_start + row["duration"] * 60
+		if booked_start < end and booked_end > start:
+			count += 1
+	return not count if not allow_overlap else count < (capacity or 1)
+
+
+if __name__ == "__main__":
+	# micro-benchmark: python -m do_health.api.test_slot_engine
+	rng = random.Random(1)
+	slots = _slots(7, 22, 5)
+	booked = [_booked(f"{rng.randint(7, 21):02d}:{rng.randrange(0, 60, 5):02d}:00", 15) for _ in range(300)]
+	for name, fn in (
+		("sweep", lambda: compute_open_slots(slots, booked, 1, 4)),
+		("pairwise", lambda: [slot for slot in slots if _pairwise_open(slot, booked, 1, 4)]),
+	):
+		runs = 50
+		elapsed = timeit.timeit(fn, number=runs)
+		print(f"{name:>8}: {elapsed / runs * 1000:.2f} ms per day ({len(slots)} slots, {len(booked)} bookings)")
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import datetime
+from typing import Final
+
+import frappe
+from frappe import _
+from frappe.utils import cint, getdate
+
+from do_health.api.downsample import METHODS
+
+# Numeric readings of Vital Signs that can be charted ("bp" is the "systolic/diastolic" text)
+TREND_METRICS: Final[list[str]] = [
+	"temperature",
+	"pulse",
+	"respiratory_rate",
+	"bp_systolic",
+	"bp_diastolic",
+	"weight",
+	"height",
+	"bmi",
+]
+
+DEFAULT_POINTS: Final[int] = 200
+MAX_POINTS: Final[int] = 2000
+
+
+def _reading(value) -> float | None:
+	# temperature, pulse, respiratory rate and blood pressure are Data fields
+	try:
+		value = float(value)
+	except (TypeError, ValueError):
+		return None
+	return value if value > 0 else None
+
+
+def _timestamp(row) -> float:
+	time = row.signs_time
+	if isinstance(time, datetime.timedelta):
+		time = (datetime.datetime.min + time).time()
+	elif not isinstance(time, datetime.time):
+		time = datetime.time()
+	return datetime.datetime.combine(getdate(row.signs_date), time).timestamp()
+
+
+@frappe.whitelist()
+def get_vital_trends(patient: str, metrics=None, from_date=None, to_date=None, points=DEFAULT_POINTS, method="lttb"):
+	"""
+	Per-metric series of the patient's Vital Signs between 'from_date' and 'to_date', each
+	downsampled to at most 'points' [epoch seconds, value] pairs with 'lttb' or 'min_max'.
+	"""
+	if not patient:
+		frappe.throw(_("Patient is required"))
+	frappe.has_permission("Patient", doc=patient, throw=True)
+	frappe.has_permission("Vital Signs", "read", throw=True)
+
+	if method not in METHODS:
+		frappe.throw(_("Downsampling method must be one of {0}").format(", ".join(METHODS)))
+	metrics = frappe.parse_json(metrics) if isinstance(metrics, str) else metrics
+	metrics = [metric for metric in (metrics or TREND_METRICS) if metric in TREND_METRICS]
+	points = min(max(cint(points) or DEFAULT_POINTS, 2), MAX_POINTS)
+
+	filters = [["patient", "=", patient], ["docstatus", "<", 2], ["signs_date", "is", "set"]]
+	if from_date:
+		filters.append(["signs_date", ">=", getdate(from_date)])
+	if to_date:
+		filters.append(["signs_date", "<=", getdate(to_date)])
+
+	# only the charted columns are read; every reading is reduced before leaving the server
+	rows = frappe.get_all(
+		"Vital Signs",
+		filters=filters,
+		fields=["signs_date", "signs_time", *metrics],
+		order_by="signs_date asc, signs_time asc, creation asc",
+		limit_page_length=0,
+	)
+
+	series = {metric: [] for metric in metrics}
+	for row in rows:
+		timestamp = _timestamp(row)
+		for metric in metrics:
+			value = _reading(row.get(metric))
+			if value is not None:
+				series[metric].append((timestamp, value))
+
+	downsample = METHODS[method]
+	return {
+		"method": method,
+		"metrics": {
+			metric: {
+				"count": len(values),
+				"points": [[x, y] for x, y in downsample(values, points)],
+			}
+			for metric, values in series.items()
+		},
+	}
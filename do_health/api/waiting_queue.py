@@ -0,0 +1,334 @@
+import json
+
+import frappe
+from frappe.realtime import get_doctype_room
+from frappe.utils import get_datetime, getdate
+
+CACHE_PREFIX = "do_health:waiting_queue"
+
+WAITING_STATUS = "Arrived"
+
+# A day's queue is only read on that day, keep it a little longer for late corrections.
+QUEUE_TTL = 2 * 24 * 60 * 60
+
+ENTRY_FIELDS = """
+	pa.name,
+	pa.appointment_type,
+	pa.patient_name,
+	pa.patient,
+	p.mobile,
+	p.dob,
+	p.custom_cpr,
+	p.custom_file_number,
+	p.image AS patient_image,
+	p.sex AS gender,
+	pa.practitioner,
+	pa.practitioner_name,
+	pa.service_unit,
+	pa.custom_visit_status,
+	pa.custom_appointment_category,
+	pa.custom_past_appointment,
+	pa.custom_arrival_time AS arrival_time,
+	pa.appointment_time,
+	pa.appointment_date
+"""
+
+# Layout, all keys per appointment date:
+#   queue:<practitioner>  sorted set of appointment names scored by arrival time
+#   unassigned            the same for arrivals without a practitioner
+#   entries               hash appointment -> JSON waiting-list row
+#   practitioners         hash practitioner -> practitioner_name, for the clinic-wide ordering
+#   built                 set once the day has been loaded from SQL
+# plus one key per queued appointment, location:<name> -> "<date>|<practitioner>|<service unit>", to find
+# an entry's current queue (expiring with the queues), and one counter per realtime room numbering the
+# deltas published to it.
+
+DELTA_EVENT = "do_health_waiting_queue"
+
+PRACTITIONER_ROOM = "Healthcare Practitioner"
+SERVICE_UNIT_ROOM = "Healthcare Service Unit"
+# every change is also published to the Healthcare Practitioner doctype room: the clinic-wide view joins
+# that one room (doc_subscribe is throttled to one room per second) and filters per practitioner itself
+CLINIC_ROOM = (PRACTITIONER_ROOM, "")
+
+
+def _day_key(date, suffix):
+	return frappe.cache().make_key(f"{CACHE_PREFIX}:{date.isoformat()}:{suffix}")
+
+
+def _queue_key(date, practitioner):
+	return _day_key(date, f"queue:{practitioner}" if practitioner else "unassigned")
+
+
+def _location_key(name):
+	return frappe.cache().make_key(f"{CACHE_PREFIX}:location:{name}")
+
+
+def _read(command, *args):
+	# raw redis command on an already prefixed key (RedisWrapper's hash helpers prefix and pickle)
+	pipe = frappe.cache().pipeline(transaction=False)
+	getattr(pipe, command)(*args)
+	return pipe.execute()[0]
+
+
+def _score(row):
+	return get_datetime(row.get("arrival_time")).timestamp() if row.get("arrival_time") else 0
+
+
+def _seq_key(doctype, name):
+	return frappe.cache().make_key(f"{CACHE_PREFIX}:seq:{doctype}:{name}")
+
+
+def _location(row):
+	return "|".join(
+		(getdate(row.get("appointment_date")).isoformat(), row.get("practitioner") or "", row.get("service_unit") or "")
+	)
+
+
+def _rooms(location):
+	"""Realtime rooms (doc or doctype rooms, so subscribing needs read permission) interested in a queue location."""
+	if not location:
+		return set()
+	_date, practitioner, service_unit = (location.split("|") + [""])[:3]
+	rooms = {CLINIC_ROOM}
+	if practitioner:
+		rooms.add((PRACTITIONER_ROOM, practitioner))
+	if service_unit:
+		rooms.add((SERVICE_UNIT_ROOM, service_unit))
+	return rooms
+
+
+def _query_entries(date=None, names=None):
+	conditions = []
+	values = {}
+	if date:
+		conditions.append("pa.custom_visit_status = %(status)s AND pa.appointment_date = %(date)s")
+		values.update(status=WAITING_STATUS, date=date)
+	if names:
+		conditions.append("pa.name IN %(names)s")
+		values["names"] = tuple(names)
+
+	return frappe.db.sql(
+		f"""
+		SELECT {ENTRY_FIELDS}
+		FROM `tabPatient Appointment` pa
+		LEFT JOIN `tabPatient` p
+			ON pa.patient = p.name
+		WHERE {" AND ".join(conditions)}
+		""",
+		values,
+		as_dict=True,
+	)
+
+
+def _add(pipe, row):
+	date = getdate(row.appointment_date)
+	pipe.zadd(_queue_key(date, row.practitioner), {row.name: _score(row)})
+	pipe.hset(_day_key(date, "entries"), row.name, frappe.as_json(row, indent=None))
+	if row.practitioner:
+		pipe.hset(_day_key(date, "practitioners"), row.practitioner, row.practitioner_name or "")
+	pipe.set(_location_key(row.name), _location(row), ex=QUEUE_TTL)
+
+
+def _remove(pipe, name, location):
+	date, practitioner = location.split("|")[:2]
+	date = getdate(date)
+	pipe.zrem(_queue_key(date, practitioner), name)
+	pipe.hdel(_day_key(date, "entries"), name)
+	pipe.delete(_location_key(name))
+
+
+def rebuild(date=None):
+	"""Reload one day's queue from Patient Appointment (fallback when Redis lost it)."""
+	date = getdate(date)
+	cache = frappe.cache()
+	rows = _query_entries(date=date)
+
+	practitioner_keys = [
+		_queue_key(date, frappe.safe_decode(practitioner))
+		for practitioner in _read("hkeys", _day_key(date, "practitioners")) or []
+	]
+	pipe = cache.pipeline()
+	pipe.delete(
+		_day_key(date, "entries"),
+		_day_key(date, "practitioners"),
+		_day_key(date, "built"),
+		_queue_key(date, None),
+		*practitioner_keys,
+	)
+	for row in rows:
+		_add(pipe, row)
+	pipe.set(_day_key(date, "built"), 1)
+	for key in [_day_key(date, "entries"), _day_key(date, "practitioners"), _day_key(date, "built")]:
+		pipe.expire(key, QUEUE_TTL)
+	for row in rows:
+		pipe.expire(_queue_key(date, row.practitioner), QUEUE_TTL)
+	pipe.execute()
+
+
+def _is_built(date):
+	return bool(frappe.cache().get(_day_key(date, "built")))
+
+
+def get_queue(date=None, practitioners=None, limit=None, unassigned=True):
+	"""
+	Waiting patients of 'date' (today by default): arrivals without a practitioner first, as
+	the NULL practitioner_name sorted in SQL, then by practitioner name and arrival time.
+	"""
+	date = getdate(date)
+	if not _is_built(date):
+		rebuild(date)
+
+	cache = frappe.cache()
+	names_by_practitioner = {
+		frappe.safe_decode(key): frappe.safe_decode(value)
+		for key, value in (_read("hgetall", _day_key(date, "practitioners")) or {}).items()
+		if key
+	}
+	if practitioners is not None:
+		names_by_practitioner = {key: value for key, value in names_by_practitioner.items() if key in practitioners}
+	practitioners = sorted(names_by_practitioner, key=lambda key: names_by_practitioner[key])
+	if unassigned:
+		practitioners.insert(0, None)
+
+	queue = []
+	for key in practitioners:
+		remaining = limit - len(queue) if limit else 0
+		if limit and remaining <= 0:
+			break
+		names = cache.zrange(_queue_key(date, key), 0, remaining - 1 if limit else -1)
+		if names:
+			entries = cache.hmget(_day_key(date, "entries"), names)
+			queue.extend(json.loads(entry) for entry in entries if entry)
+	return queue
+
+
+def sync(names):
+	"""Move the given appointments into, between or out of the day queues from their current state."""
+	cache = frappe.cache()
+	names = [name for name in dict.fromkeys(names) if name]
+	if not names:
+		return
+
+	locations = dict(zip(names, _read("mget", [_location_key(name) for name in names])))
+	rows = {row.name: row for row in _query_entries(names=names)}
+
+	changes = []
+	pipe = cache.pipeline()
+	for name in names:
+		location = frappe.safe_decode(locations.get(name)) if locations.get(name) else None
+		if location:
+			_remove(pipe, name, location)
+
+		entry = None
+		row = rows.get(name)
+		if row and row.custom_visit_status == WAITING_STATUS and row.appointment_date:
+			# days that were never loaded pick the appointment up on their first rebuild
+			if _is_built(getdate(row.appointment_date)):
+				_add(pipe, row)
+				pipe.expire(_queue_key(getdate(row.appointment_date), row.practitioner), QUEUE_TTL)
+				entry = row
+
+		if location or entry:
+			changes.append((name, location, entry))
+	pipe.execute()
+
+	publish_deltas(changes)
+
+
+def publish_deltas(changes):
+	"""
+	Send each affected room only its own add / remove / move operations, numbered per room
+	so a client that sees a gap in 'seq' knows to reload with get_waiting_queue.
+	"""
+	by_room = {}
+	for name, old_location, entry in changes:
+		old_rooms = _rooms(old_location)
+		new_rooms = _rooms(_location(entry)) if entry else set()
+		for room in old_rooms - new_rooms:
+			by_room.setdefault(room, []).append({"op": "remove", "name": name})
+		for room in new_rooms:
+			op = "move" if room in old_rooms else "add"
+			by_room.setdefault(room, []).append({"op": op, "name": name, "entry": entry})
+
+	if not by_room:
+		return
+
+	pipe = frappe.cache().pipeline()
+	for doctype, name in by_room:
+		pipe.incr(_seq_key(doctype, name))
+	sequences = pipe.execute()
+
+	for (doctype, name), seq in zip(by_room, sequences):
+		message = {"room": [doctype, name], "seq": seq, "changes": by_room[(doctype, name)]}
+		if name:
+			frappe.publish_realtime(event=DELTA_EVENT, message=message, doctype=doctype, docname=name)
+		else:
+			frappe.publish_realtime(event=DELTA_EVENT, message=message, room=get_doctype_room(doctype))
+
+
+def _get_sequences(rooms):
+	pipe = frappe.cache().pipeline(transaction=False)
+	for doctype, name in rooms:
+		pipe.get(_seq_key(doctype, name))
+	return [int(seq or 0) for seq in pipe.execute()]
+
+
+@frappe.whitelist()
+def get_waiting_queue(practitioner=None, service_unit=None):
+	"""
+	Today's waiting patients with the realtime rooms to subscribe to and their current sequence.
+	Without filters the clinic room is returned with every active practitioner the user can
+	read, plus arrivals without a practitioner when the user can read Patient Appointment;
+	the client drops clinic room deltas for anyone else. Unlike methods.get_waiting_list
+	(the first five rows), the whole queue is returned so realtime deltas can be applied to it.
+	"""
+	practitioners = None
+	unassigned = False
+	if practitioner:
+		rooms = [(PRACTITIONER_ROOM, practitioner)]
+		practitioners = [practitioner]
+	elif service_unit:
+		rooms = [(SERVICE_UNIT_ROOM, service_unit)]
+	else:
+		frappe.has_permission(PRACTITIONER_ROOM, "read", throw=True)
+		rooms = [CLINIC_ROOM]
+		practitioners = frappe.get_list("Healthcare Practitioner", filters={"status": "Active"}, pluck="name")
+		unassigned = bool(frappe.has_permission("Patient Appointment", "read"))
+
+	if practitioner or service_unit:
+		frappe.has_permission(rooms[0][0], doc=rooms[0][1], throw=True)
+
+	# sequences are read before the entries: a delta racing this call is then replayed, which is idempotent
+	sequences = _get_sequences(rooms)
+	if service_unit:
+		entries = [entry for entry in get_queue() if entry.get("service_unit") == service_unit]
+	else:
+		entries = get_queue(practitioners=practitioners, unassigned=unassigned)
+
+	return {
+		"date": getdate().isoformat(),
+		"rooms": [{"doctype": doctype, "name": name, "seq": seq} for (doctype, name), seq in zip(rooms, sequences)],
+		"practitioners": practitioners,
+		"unassigned": unassigned,
+		"entries": entries,
+	}
+
+
+def sync_after_commit(*names):
+	"""Queue a sync (and its realtime deltas) for when the current transaction commits."""
+	frappe.db.after_commit.add(lambda: sync(list(names)))
+
+
+def on_appointment_trash(doc, method=None):
+	sync_after_commit(doc.name)
+
+
+def on_patient_change(doc, method=None):
+	names = frappe.get_all(
+		"Patient Appointment",
+		filters={"patient": doc.name, "custom_visit_status": WAITING_STATUS, "appointment_date": getdate()},
+		pluck="name",
+	)
+	if names:
+		sync_after_commit(*names)
@@ -0,0 +1,40 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-appointment-rollup")
+@click.option("--from-date", help="First appointment date to rebuild (YYYY-MM-DD)")
+@click.option("--to-date", help="Last appointment date to rebuild (YYYY-MM-DD)")
+@pass_context
+def rebuild_appointment_rollup(context, from_date=None, to_date=None):
+	"""Recompute the Appointment Count Rollup from Patient Appointment."""
+	from do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup import rebuild
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		rebuild(from_date, to_date)
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+
+@click.command("rebuild-practitioner-availability-days")
+@click.option("--from-date", help="First date to expand (YYYY-MM-DD), defaults to the start of the window")
+@click.option("--to-date", help="Last date to expand (YYYY-MM-DD), defaults to the end of the window")
+@pass_context
+def rebuild_practitioner_availability_days(context, from_date=None, to_date=None):
+	"""Re-expand submitted Practitioner Availability into Practitioner Availability Day rows."""
+	from do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day import rebuild
+
+	frappe.init(site=get_site(context))
+	frappe.connect()
+	try:
+		rebuild(from_date, to_date)
+		frappe.db.commit()
+	finally:
+		frappe.destroy()
+
+
+commands = [rebuild_appointment_rollup, rebuild_practitioner_availability_days]
@@ -0,0 +1,404 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+from collections import defaultdict
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import flt, fmt_money, format_date, format_datetime, get_datetime, get_datetime_str, now
+
+# Append-only status log: a changed source (a new or edited time log) adds a row for its entry_key,
+# the latest row per key is the current entry and is_removed rows hide deleted sources.
+# Rows hold the raw status, timestamp and user; titles and labels are rendered per request.
+# Billing entries are not stored: invoices and payments also change through Journal Entries,
+# Payment Reconciliation, credit notes and the overdue status job, so they are read live.
+ACTIVITY_FIELDS = [
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"appointment",
+	"entry_type",
+	"entry_key",
+	"timestamp",
+	"user",
+	"is_removed",
+	"content_hash",
+	"status",
+]
+
+APPOINTMENT_FIELDS = [
+	"name",
+	"status",
+	"custom_visit_status",
+	"company",
+	"ref_sales_invoice",
+	"custom_insurance_sales_invoice",
+	"owner",
+	"modified_by",
+	"creation",
+	"modified",
+]
+
+
+class AppointmentActivity(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Appointment Activity", ["appointment", "creation"])
+
+
+def _activity(appointment, entry_type, entry_key, timestamp, title, description=None, *, badge=None, doc=None, reference=None, user=None, extra=None, tag=None, amounts=None):
+	"""One visit-log entry rendered for the current user (the user's display name is added by get_log)."""
+	if not timestamp:
+		timestamp = appointment.creation
+
+	datetime_value = get_datetime(timestamp)
+	entry = {
+		"type": entry_type,
+		"timestamp": get_datetime_str(datetime_value),
+		"date": format_date(datetime_value),
+		"time": format_datetime(datetime_value, "HH:mm"),
+		"title": title,
+	}
+	if description:
+		entry["description"] = description
+	if badge:
+		entry["badge"] = badge
+	if doc:
+		entry["doc"] = doc
+	if reference:
+		entry["reference"] = reference
+	if extra:
+		entry["extra"] = extra
+	if tag:
+		entry["tag"] = tag
+
+	return frappe._dict(
+		appointment=appointment.name,
+		entry_type=entry_type,
+		entry_key=entry_key,
+		timestamp=datetime_value,
+		user=user,
+		entry=entry,
+		**(amounts or {}),
+	)
+
+
+def _status_rows(appointments):
+	"""Raw status timeline of each appointment from its time logs, keyed by appointment."""
+	rows = defaultdict(list)
+	if not appointments:
+		return rows
+
+	logs = frappe.get_all(
+		"Appointment Time Logs",
+		filters={"parenttype": "Patient Appointment", "parent": ("in", list(appointments))},
+		fields=["name", "parent", "status", "time", "owner", "modified_by", "modified", "creation"],
+		order_by="time asc, creation asc",
+	)
+	for log in logs:
+		rows[log.parent].append(
+			frappe._dict(
+				appointment=log.parent,
+				entry_type="status",
+				entry_key=f"Appointment Time Logs:{log.name}",
+				timestamp=get_datetime(log.time or log.modified or log.creation),
+				user=log.modified_by or log.owner,
+				status=log.status,
+			)
+		)
+
+	for name, appointment in appointments.items():
+		if rows[name]:
+			continue
+		# appointments without time logs show their current status
+		rows[name].append(
+			frappe._dict(
+				appointment=name,
+				entry_type="status",
+				entry_key=f"Patient Appointment:{name}",
+				timestamp=get_datetime(appointment.modified or appointment.creation),
+				user=appointment.modified_by or appointment.owner,
+				status=appointment.get("custom_visit_status") or appointment.status,
+			)
+		)
+	return rows
+
+
+def _status_activity(appointment, row):
+	status = row.status or _("Unknown")
+	if row.entry_key.startswith("Patient Appointment:"):
+		title = _("Current status: {0}").format(status)
+	else:
+		title = _("Status updated to {0}").format(status)
+	return _activity(appointment, "status", row.entry_key, row.timestamp, title, badge=status, user=row.user)
+
+
+def _invoice_contexts(appointments):
+	"""Invoice -> (appointment, label, kind) for the patient and insurance invoices of 'appointments'."""
+	contexts = {}
+	for appointment in appointments.values():
+		if appointment.ref_sales_invoice:
+			contexts[appointment.ref_sales_invoice] = (appointment, _("Patient Invoice"), "patient")
+		if appointment.custom_insurance_sales_invoice:
+			contexts.setdefault(appointment.custom_insurance_sales_invoice, (appointment, _("Insurance Invoice"), "insurance"))
+	return contexts
+
+
+def get_billing_sources(appointments):
+	"""
+	Invoices and payment allocations behind the billing timeline of 'appointments' (name -> row),
+	with one query per source doctype: (invoice contexts, invoices, payment references, payments).
+	"""
+	contexts = _invoice_contexts(appointments)
+	if not contexts:
+		return contexts, {}, [], {}
+
+	invoices = {
+		invoice.name: invoice
+		for invoice in frappe.get_all(
+			"Sales Invoice",
+			filters={"name": ("in", list(contexts))},
+			fields=[
+				"name", "posting_date", "posting_time", "status", "grand_total",
+				"outstanding_amount", "paid_amount", "currency", "customer",
+				"docstatus", "owner", "creation", "modified",
+			],
+		)
+	}
+	payment_refs = frappe.get_all(
+		"Payment Entry Reference",
+		filters={"reference_doctype": "Sales Invoice", "reference_name": ("in", list(contexts))},
+		fields=["name", "parent", "reference_name", "allocated_amount", "creation"],
+	)
+	payments = {}
+	payment_entry_names = list({ref.parent for ref in payment_refs})
+	if payment_entry_names:
+		payments = {
+			payment.name: payment
+			for payment in frappe.get_all(
+				"Payment Entry",
+				filters={"name": ("in", payment_entry_names)},
+				fields=[
+					"name", "posting_date", "posting_time", "mode_of_payment", "payment_type",
+					"paid_amount", "received_amount", "status", "docstatus", "party",
+					"party_type", "owner", "reference_no", "reference_date", "creation", "modified",
+				],
+			)
+		}
+	return contexts, invoices, payment_refs, payments
+
+
+def _posting_timestamp(row, fallback):
+	if row.posting_date:
+		return f"{row.posting_date} {row.posting_time or '00:00:00'}"
+	return fallback
+
+
+def _billing_activities(appointments):
+	"""Invoice and payment timeline of each appointment, keyed by appointment."""
+	activities = defaultdict(list)
+	contexts, invoices, payment_refs, payments = get_billing_sources(appointments)
+
+	for invoice in invoices.values():
+		appointment, label, _kind = contexts[invoice.name]
+		description_parts = [_("Total {0}").format(fmt_money(invoice.grand_total or 0, currency=invoice.currency))]
+		if flt(invoice.paid_amount):
+			description_parts.append(_("Paid {0}").format(fmt_money(invoice.paid_amount, currency=invoice.currency)))
+		if flt(invoice.outstanding_amount):
+			description_parts.append(_("Outstanding {0}").format(fmt_money(invoice.outstanding_amount, currency=invoice.currency)))
+
+		activities[appointment.name].append(
+			_activity(
+				appointment,
+				"billing",
+				f"Sales Invoice:{invoice.name}",
+				_posting_timestamp(invoice, invoice.creation),
+				_("{0} {1}").format(label, invoice.name),
+				description=" | ".join(description_parts),
+				badge=invoice.status,
+				doc={"doctype": "Sales Invoice", "name": invoice.name, "label": invoice.name},
+				user=invoice.owner,
+				tag=label,
+				amounts={
+					"currency": invoice.currency,
+					"grand_total": flt(invoice.grand_total),
+					"paid_amount": flt(invoice.paid_amount),
+					"outstanding_amount": flt(invoice.outstanding_amount),
+				},
+			)
+		)
+
+	for ref in payment_refs:
+		payment_entry = payments.get(ref.parent)
+		if not payment_entry:
+			continue
+
+		appointment, label, _kind = contexts[ref.reference_name]
+		invoice = invoices.get(ref.reference_name)
+		currency = (
+			invoice.currency
+			if invoice
+			else (appointment.company and frappe.get_cached_value("Company", appointment.company, "default_currency"))
+			or frappe.defaults.get_global_default("currency")
+		)
+
+		extra = [{"label": _("Invoice Type"), "value": label}]
+		if payment_entry.mode_of_payment:
+			extra.append({"label": _("Mode"), "value": payment_entry.mode_of_payment})
+		if payment_entry.reference_no:
+			extra.append({"label": _("Reference No."), "value": payment_entry.reference_no})
+
+		activities[appointment.name].append(
+			_activity(
+				appointment,
+				"payment",
+				f"Payment Entry Reference:{ref.name}",
+				_posting_timestamp(payment_entry, payment_entry.creation or ref.creation),
+				_("Payment Entry {0}").format(payment_entry.name),
+				description=_("Applied {0} to {1}").format(
+					fmt_money(ref.allocated_amount or 0, currency=currency), ref.reference_name
+				),
+				badge=payment_entry.status,
+				doc={"doctype": "Payment Entry", "name": payment_entry.name, "label": payment_entry.name},
+				reference={"doctype": "Sales Invoice", "name": ref.reference_name, "label": ref.reference_name},
+				user=payment_entry.owner,
+				extra=extra,
+				amounts={"currency": currency, "paid_amount": flt(ref.allocated_amount)},
+			)
+		)
+	return activities
+
+
+def _content_hash(row):
+	payload = [row.status, get_datetime_str(row.timestamp), row.user]
+	return hashlib.md5(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _latest_rows(appointments):
+	latest = {}
+	for row in frappe.get_all(
+		"Appointment Activity",
+		filters={"appointment": ("in", list(appointments)), "entry_type": "status"},
+		fields=["appointment", "entry_key", "entry_type", "is_removed", "content_hash"],
+		order_by="creation asc",
+	):
+		latest[(row.appointment, row.entry_key)] = row
+	return latest
+
+
+def _append(appointments, status_rows):
+	"""Append the status rows that changed since their latest row, and tombstones for vanished sources."""
+	latest = _latest_rows(appointments)
+	timestamp = now()
+	user = frappe.session.user
+	metadata = {"creation": timestamp, "modified": timestamp, "owner": user, "modified_by": user}
+
+	rows = []
+	current = set()
+	for name in appointments:
+		for row in status_rows.get(name, []):
+			key = (name, row.entry_key)
+			current.add(key)
+			row.content_hash = _content_hash(row)
+			previous = latest.get(key)
+			if previous and not previous.is_removed and previous.content_hash == row.content_hash:
+				continue
+			rows.append(dict(row, is_removed=0))
+
+	for key, previous in latest.items():
+		if key not in current and not previous.is_removed:
+			rows.append(
+				{"appointment": key[0], "entry_type": previous.entry_type, "entry_key": key[1], "is_removed": 1}
+			)
+
+	if not rows:
+		return
+	values = []
+	for row in rows:
+		row["name"] = frappe.generate_hash(length=10)
+		values.append(tuple(metadata[field] if field in metadata else row.get(field) for field in ACTIVITY_FIELDS))
+	frappe.db.bulk_insert("Appointment Activity", ACTIVITY_FIELDS, values)
+
+
+def _load_appointments(names):
+	names = [name for name in dict.fromkeys(names) if name]
+	if not names:
+		return {}
+	return {
+		row.name: row
+		for row in frappe.get_all("Patient Appointment", filters={"name": ("in", names)}, fields=APPOINTMENT_FIELDS)
+	}
+
+
+def record_status(appointment_names):
+	appointments = _load_appointments(appointment_names)
+	if appointments:
+		_append(appointments, _status_rows(appointments))
+
+
+def get_log(appointment_name):
+	"""
+	Visit log of one appointment: the status rows of its ledger plus its invoices and payments,
+	read live from their doctypes, rendered in the reader's language and formats. Appointments
+	the ledger has not recorded yet are rendered from their time logs without writing.
+	"""
+	appointment = _load_appointments([appointment_name]).get(appointment_name)
+	if not appointment:
+		frappe.throw(_("Patient Appointment {0} not found").format(appointment_name), frappe.DoesNotExistError)
+
+	rows = _read(appointment_name) or _status_rows({appointment_name: appointment})[appointment_name]
+	activities = [_status_activity(appointment, row) for row in rows]
+	activities += _billing_activities({appointment_name: appointment}).get(appointment_name, [])
+
+	user_names = {}
+	users = {activity.user for activity in activities if activity.user}
+	if users:
+		user_names = dict(
+			frappe.get_all("User", filters={"name": ("in", list(users))}, fields=["name", "full_name"], as_list=True)
+		)
+
+	entries = []
+	financial_totals = {}
+	for activity in sorted(activities, key=lambda activity: get_datetime(activity.timestamp)):
+		entry = activity.entry
+		if activity.user:
+			entry["user"] = user_names.get(activity.user) or activity.user
+		entries.append(entry)
+
+		if activity.entry_type == "billing":
+			totals = financial_totals.setdefault(
+				activity.currency or "",
+				{"currency": activity.currency, "total_billed": 0.0, "total_paid": 0.0, "total_outstanding": 0.0},
+			)
+			totals["total_billed"] += flt(activity.grand_total)
+			totals["total_paid"] += flt(activity.paid_amount)
+			totals["total_outstanding"] += flt(activity.outstanding_amount)
+
+	return {
+		"entries": entries,
+		"financial_summary": list(financial_totals.values()),
+		"latest_status": appointment.custom_visit_status or appointment.status,
+	}
+
+
+def _read(appointment_name):
+	latest = {}
+	for row in frappe.get_all(
+		"Appointment Activity",
+		filters={"appointment": appointment_name, "entry_type": "status"},
+		fields=["entry_key", "entry_type", "timestamp", "user", "is_removed", "status"],
+		order_by="creation asc",
+	):
+		latest[row.entry_key] = row
+	return [row for row in latest.values() if not row.is_removed]
+
+
+def on_appointment_update(doc, method=None):
+	record_status([doc.name])
@@ -0,0 +1,74 @@
+# Copyright (c) 2026, Sayed Mohamed and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import now_datetime
+
+from do_health.do_health.doctype.appointment_activity.appointment_activity import _append, _read
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+APPOINTMENT = "_Test Activity Appointment"
+
+
+def _status(appointment, key, status):
+	return frappe._dict(
+		appointment=appointment.name,
+		entry_type="status",
+		entry_key=key,
+		timestamp=appointment.creation,
+		user="Administrator",
+		status=status,
+	)
+
+
+class IntegrationTestAppointmentActivity(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("Appointment Activity", {"appointment": APPOINTMENT})
+		self.appointment = frappe._dict(name=APPOINTMENT, creation=now_datetime())
+
+	def append(self, *activities):
+		_append({APPOINTMENT: self.appointment}, {APPOINTMENT: list(activities)})
+
+	def row_count(self):
+		return frappe.db.count("Appointment Activity", {"appointment": APPOINTMENT})
+
+	def test_unchanged_source_is_not_appended_again(self):
+		self.append(_status(self.appointment, "log-1", "Scheduled"))
+		self.append(_status(self.appointment, "log-1", "Scheduled"))
+
+		self.assertEqual(self.row_count(), 1)
+		self.assertEqual([row.entry_key for row in _read(APPOINTMENT)], ["log-1"])
+
+	def test_changed_source_appends_and_latest_row_wins(self):
+		self.append(_status(self.appointment, "log-1", "Scheduled"))
+		self.append(_status(self.appointment, "log-1", "Arrived"))
+
+		self.assertEqual(self.row_count(), 2)
+		rows = _read(APPOINTMENT)
+		self.assertEqual(len(rows), 1)
+		self.assertEqual(rows[0].status, "Arrived")
+
+	def test_vanished_source_is_tombstoned(self):
+		self.append(_status(self.appointment, "log-1", "Scheduled"), _status(self.appointment, "log-2", "Arrived"))
+		self.append(_status(self.appointment, "log-2", "Arrived"))
+
+		self.assertEqual(self.row_count(), 3)
+		self.assertEqual([row.entry_key for row in _read(APPOINTMENT)], ["log-2"])
+
+		# a second pass neither repeats the tombstone nor the unchanged entry
+		self.append(_status(self.appointment, "log-2", "Arrived"))
+		self.assertEqual(self.row_count(), 3)
+
+	def test_source_returning_after_tombstone_is_appended(self):
+		self.append(_status(self.appointment, "log-1", "Scheduled"))
+		self.append()
+		self.append(_status(self.appointment, "log-1", "Scheduled"))
+
+		self.assertEqual(self.row_count(), 3)
+		self.assertEqual([row.entry_key for row in _read(APPOINTMENT)], ["log-1"])
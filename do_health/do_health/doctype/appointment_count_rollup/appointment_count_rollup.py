@@ -0,0 +1,142 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import add_days, getdate, now
+
+
+class AppointmentCountRollup(Document):
+	pass
+
+
+def _rollup_key(appointment):
+	date = appointment.get("appointment_date")
+	if not date:
+		return None
+	return (
+		getdate(date).isoformat(),
+		appointment.get("practitioner") or "",
+		appointment.get("department") or "",
+		appointment.get("status") or "",
+	)
+
+
+def _rollup_name(key):
+	# kept in step with the MD5(CONCAT_WS(...)) expression used by `rebuild`
+	return hashlib.md5("|".join(key).encode()).hexdigest()
+
+
+def _apply_delta(key, delta):
+	timestamp = now()
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabAppointment Count Rollup`
+			(name, creation, modified, owner, modified_by, date, practitioner, department, status, count)
+		VALUES (%(name)s, %(ts)s, %(ts)s, 'Administrator', 'Administrator',
+			%(date)s, %(practitioner)s, %(department)s, %(status)s, %(delta)s)
+		ON DUPLICATE KEY UPDATE count = count + %(delta)s, modified = %(ts)s
+		""",
+		{
+			"name": _rollup_name(key),
+			"ts": timestamp,
+			"date": key[0],
+			"practitioner": key[1] or None,
+			"department": key[2] or None,
+			"status": key[3] or None,
+			"delta": delta,
+		},
+	)
+
+
+def update_for_appointment(doc, method=None):
+	"""Move one count from the appointment's previous (date, practitioner, department, status) to its current one."""
+	previous = doc.get_doc_before_save() if method != "on_trash" else doc
+	current = doc if method != "on_trash" else None
+
+	old_key = _rollup_key(previous) if previous else None
+	new_key = _rollup_key(current) if current else None
+	if old_key == new_key:
+		return
+
+	if old_key:
+		_apply_delta(old_key, -1)
+	if new_key:
+		_apply_delta(new_key, 1)
+
+
+def rebuild(from_date=None, to_date=None):
+	"""Recompute the rollup from Patient Appointment for [from_date, to_date] (whole table when omitted)."""
+	conditions = []
+	values = {}
+	if from_date:
+		conditions.append("{field} >= %(from_date)s")
+		values["from_date"] = getdate(from_date)
+	if to_date:
+		conditions.append("{field} <= %(to_date)s")
+		values["to_date"] = getdate(to_date)
+
+	def where(field):
+		return ("WHERE " + " AND ".join(conditions)).format(field=field) if conditions else ""
+
+	values["ts"] = now()
+	frappe.db.sql(f"DELETE FROM `tabAppointment Count Rollup` {where('date')}", values)
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabAppointment Count Rollup`
+			(name, creation, modified, owner, modified_by, date, practitioner, department, status, count)
+		SELECT
+			MD5(CONCAT_WS('|', appointment_date, IFNULL(practitioner, ''), IFNULL(department, ''), IFNULL(status, ''))),
+			%(ts)s, %(ts)s, 'Administrator', 'Administrator',
+			appointment_date, practitioner, department, status, COUNT(*)
+		FROM `tabPatient Appointment`
+		{where('appointment_date')}
+		{'AND' if conditions else 'WHERE'} appointment_date IS NOT NULL
+		GROUP BY appointment_date, practitioner, department, status
+		""",
+		values,
+	)
+
+
+def rebuild_days(*dates):
+	"""Recompute single days, for status changes written with db.set_value and so without document hooks."""
+	for date in {getdate(date) for date in dates if date}:
+		rebuild(date, date)
+
+
+def rebuild_recent():
+	"""Daily safety net for status changes written without document hooks."""
+	rebuild(add_days(getdate(), -7), add_days(getdate(), 90))
+
+
+def get_daily_counts(start_date, end_date, practitioner=None, by_practitioner=False):
+	"""Non-cancelled appointment counts per day for [start_date, end_date)."""
+	rollup = frappe.qb.DocType("Appointment Count Rollup")
+	total = Sum(rollup.field("count"))
+
+	query = (
+		frappe.qb.from_(rollup)
+		.select(rollup.date, total.as_("count"))
+		.where(rollup.date >= getdate(start_date))
+		.where(rollup.date < getdate(end_date))
+		.where(IfNull(rollup.status, "") != "Cancelled")
+		.groupby(rollup.date)
+	)
+	if practitioner:
+		query = query.where(rollup.practitioner == practitioner)
+	if by_practitioner:
+		query = query.select(rollup.practitioner).groupby(rollup.practitioner)
+
+	counts = {}
+	for row in query.run(as_dict=True):
+		if not row["count"]:
+			continue
+		date_str = row.date.strftime("%Y-%m-%d")
+		if by_practitioner:
+			counts.setdefault(date_str, {})[row.practitioner or ""] = int(row["count"])
+		else:
+			counts[date_str] = int(row["count"])
+	return counts
@@ -0,0 +1,65 @@
+# Copyright (c) 2026, Sayed Mohamed and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+
+from do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup import (
+	get_daily_counts,
+	update_for_appointment,
+)
+
+# On IntegrationTestCase, the doctype test records and all
+# link-field test record dependencies are recursively loaded
+# Use these module variables to add/remove to/from that list
+EXTRA_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+IGNORE_TEST_RECORD_DEPENDENCIES = []  # eg. ["User"]
+
+DATE = "2099-01-01"
+PRACTITIONER = "_Test Rollup Practitioner"
+
+
+def _appointment(status, previous=None):
+	doc = frappe._dict(appointment_date=DATE, practitioner=PRACTITIONER, department=None, status=status)
+	doc.get_doc_before_save = lambda: previous
+	return doc
+
+
+class IntegrationTestAppointmentCountRollup(IntegrationTestCase):
+	def setUp(self):
+		frappe.db.delete("Appointment Count Rollup", {"practitioner": PRACTITIONER})
+
+	def counts(self):
+		return dict(
+			frappe.get_all(
+				"Appointment Count Rollup",
+				filters={"practitioner": PRACTITIONER, "count": ("!=", 0)},
+				fields=["status", "count"],
+				as_list=True,
+			)
+		)
+
+	def test_status_change_moves_exactly_one_count(self):
+		first = _appointment("Scheduled")
+		update_for_appointment(first, "on_update")
+		update_for_appointment(_appointment("Scheduled"), "on_update")
+		self.assertEqual(self.counts(), {"Scheduled": 2})
+
+		update_for_appointment(_appointment("Cancelled", previous=first), "on_update")
+
+		self.assertEqual(self.counts(), {"Scheduled": 1, "Cancelled": 1})
+		self.assertEqual(get_daily_counts(DATE, "2099-01-02", practitioner=PRACTITIONER), {DATE: 1})
+
+	def test_unchanged_save_keeps_counts(self):
+		first = _appointment("Scheduled")
+		update_for_appointment(first, "on_update")
+		update_for_appointment(_appointment("Scheduled", previous=first), "on_update")
+
+		self.assertEqual(self.counts(), {"Scheduled": 1})
+
+	def test_trash_removes_its_count(self):
+		first = _appointment("Scheduled")
+		update_for_appointment(first, "on_update")
+		update_for_appointment(first, "on_trash")
+
+		self.assertEqual(self.counts(), {})
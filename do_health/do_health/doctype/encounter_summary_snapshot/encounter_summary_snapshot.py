@@ -0,0 +1,185 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+from frappe.utils import get_datetime, now
+
+# bump when the shape of get_encounter_summary changes so stored snapshots are rebuilt
+SCHEMA_VERSION = 1
+
+# Appointment statuses are also written with db.set_value / db_set, which skip on_appointment_change,
+# so they are read live on every request instead of served from the snapshot.
+LIVE_APPOINTMENT_FIELDS = ["status", "custom_visit_status"]
+
+
+class EncounterSummarySnapshot(Document):
+	pass
+
+
+def _build(encounter_doc):
+	from do_health.api.methods import build_encounter_summary
+
+	return build_encounter_summary(encounter_doc)
+
+
+def save_snapshot(encounter_doc, summary=None):
+	"""Store the summary of 'encounter_doc' (built when not given); returns the stored payload."""
+	summary = json.loads(frappe.as_json(summary or _build(encounter_doc), indent=None))
+	timestamp = now()
+	frappe.db.sql(
+		"""
+		INSERT INTO `tabEncounter Summary Snapshot`
+			(name, creation, modified, owner, modified_by, encounter, version, schema_version, encounter_modified, summary)
+		VALUES (%(name)s, %(ts)s, %(ts)s, 'Administrator', 'Administrator',
+			%(name)s, 1, %(schema)s, %(encounter_modified)s, %(summary)s)
+		ON DUPLICATE KEY UPDATE
+			version = version + 1,
+			schema_version = %(schema)s,
+			encounter_modified = %(encounter_modified)s,
+			summary = %(summary)s,
+			modified = %(ts)s
+		""",
+		{
+			"name": encounter_doc.name,
+			"ts": timestamp,
+			"schema": SCHEMA_VERSION,
+			"encounter_modified": encounter_doc.modified,
+			"summary": json.dumps(summary),
+		},
+	)
+	return summary
+
+
+def _load_snapshots(encounters):
+	encounter_table = frappe.qb.DocType("Patient Encounter")
+	snapshot = frappe.qb.DocType("Encounter Summary Snapshot")
+	return (
+		frappe.qb.from_(encounter_table)
+		.left_join(snapshot)
+		.on(snapshot.name == encounter_table.name)
+		.select(
+			encounter_table.name,
+			encounter_table.modified,
+			snapshot.version,
+			snapshot.schema_version,
+			snapshot.encounter_modified,
+			snapshot.summary,
+		)
+		.where(encounter_table.name.isin(encounters))
+		.run(as_dict=True)
+	)
+
+
+def _is_fresh(row):
+	return bool(
+		row.summary
+		and row.schema_version == SCHEMA_VERSION
+		and row.encounter_modified
+		and get_datetime(row.encounter_modified) >= get_datetime(row.modified)
+	)
+
+
+def _with_live_status(summaries):
+	appointments = {}
+	for summary in summaries:
+		if summary.get("appointment"):
+			appointments.setdefault(summary["appointment"]["name"], []).append(summary["appointment"])
+	if not appointments:
+		return
+
+	for row in frappe.get_all(
+		"Patient Appointment",
+		filters={"name": ["in", list(appointments)]},
+		fields=["name", *LIVE_APPOINTMENT_FIELDS],
+	):
+		for appointment in appointments[row.name]:
+			appointment.update({field: row.get(field) for field in LIVE_APPOINTMENT_FIELDS})
+
+
+def get_summary(encounter):
+	"""
+	Stored summary of 'encounter', rebuilt when it is missing, from an older schema, or older
+	than the encounter's `modified`. Linked records drop the snapshot when they change; the
+	appointment's statuses are read live.
+	"""
+	rows = _load_snapshots([encounter])
+	if not rows:
+		frappe.throw(_("Patient Encounter {0} not found").format(encounter), frappe.DoesNotExistError)
+
+	if _is_fresh(rows[0]):
+		summary = json.loads(rows[0].summary)
+		_with_live_status([summary])
+		return summary
+
+	return save_snapshot(frappe.get_doc("Patient Encounter", encounter))
+
+
+def get_summaries(encounters):
+	"""Summaries of many encounters keyed by name; stale ones are rebuilt together in bulk."""
+	encounters = [name for name in dict.fromkeys(encounters) if name]
+	if not encounters:
+		return {}
+
+	summaries = {}
+	stale = {}
+	for row in _load_snapshots(encounters):
+		if _is_fresh(row):
+			summaries[row.name] = json.loads(row.summary)
+		else:
+			stale[row.name] = row
+	_with_live_status(summaries.values())
+
+	if stale:
+		from do_health.api.methods import build_encounter_summaries
+
+		for name, summary in build_encounter_summaries(list(stale)).items():
+			summaries[name] = save_snapshot(stale[name], summary)
+	return summaries
+
+
+def invalidate(encounters):
+	encounters = [name for name in set(encounters) if name]
+	if encounters:
+		frappe.db.delete("Encounter Summary Snapshot", {"name": ["in", encounters]})
+
+
+def update_for_encounter(doc, method=None):
+	if method == "on_trash":
+		invalidate([doc.name])
+	else:
+		save_snapshot(doc)
+
+
+def _appointment_encounters(appointments):
+	appointments = [name for name in set(appointments) if name]
+	if not appointments:
+		return []
+	return frappe.get_all("Patient Encounter", filters={"appointment": ["in", appointments]}, pluck="name")
+
+
+def on_vital_signs_change(doc, method=None):
+	invalidate([doc.get("encounter"), *_appointment_encounters([doc.get("appointment")])])
+
+
+def on_service_request_change(doc, method=None):
+	invalidate([doc.get("order_group"), doc.get("order_reference_name")])
+
+
+def on_medication_request_change(doc, method=None):
+	invalidate([doc.get("order_group")])
+
+
+def on_clinical_procedure_change(doc, method=None):
+	invalidate([doc.get("custom_patient_encounter")])
+
+
+def invalidate_for_appointments(appointments):
+	invalidate(_appointment_encounters(appointments))
+
+
+def on_appointment_change(doc, method=None):
+	invalidate_for_appointments([doc.name])
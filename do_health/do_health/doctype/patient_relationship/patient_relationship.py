@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils import now
 
 RELATION_INVERSE_MAP = {
 	"father": "Child",
@@ -83,7 +84,7 @@ class PatientRelationship(Document):
 
 		frappe.flags.in_patient_relation_sync = True
 		try:
-			target_relation = _get_inverse_label(self.relation)
+			inverse = _get_inverse_row(self.patient, self.related_patient, self.relation, self.notes)
 
 			existing = frappe.get_all(
 				"Patient Relationship",
@@ -97,19 +98,15 @@ class PatientRelationship(Document):
 
 			if not existing:
 				doc = frappe.new_doc("Patient Relationship")
-				doc.patient = self.related_patient
-				doc.related_patient = self.patient
-				doc.relation = target_relation
-				doc.inverse_relation = self.relation
-				doc.notes = self.notes
+				doc.update(inverse)
 				doc.insert(ignore_permissions=True)
 			else:
 				row = existing[0]
-				if row.relation != target_relation or row.inverse_relation != self.relation:
+				if row.relation != inverse.relation or row.inverse_relation != inverse.inverse_relation:
 					frappe.db.set_value(
 						"Patient Relationship",
 						row.name,
-						{"relation": target_relation, "inverse_relation": self.relation},
+						{"relation": inverse.relation, "inverse_relation": inverse.inverse_relation},
 					)
 		finally:
 			frappe.flags.in_patient_relation_sync = False
@@ -140,3 +137,116 @@ def _get_inverse_label(relation: str) -> str:
 	lookup = RELATION_INVERSE_MAP.get(label.lower())
 	return lookup or label
 
+
+def _get_inverse_row(patient, related_patient, relation, notes=None):
+	"""The reciprocal edge kept in sync with patient -> related_patient."""
+	return frappe._dict(
+		patient=related_patient,
+		related_patient=patient,
+		relation=_get_inverse_label(relation),
+		inverse_relation=relation,
+		notes=notes,
+	)
+
+
+def bulk_create(edges):
+	"""
+	Insert many relationships and their inverses at once. Applies the same rules as
+	validate / _sync_inverse_record, but with one lookup of the existing edges, one bulk insert
+	and one bulk update instead of a save per row. Returns the names of the requested edges.
+	"""
+	allowed = set((frappe.get_meta("Patient Relationship").get_field("relation").options or "").split("\n"))
+	allowed.discard("")
+
+	requested = {}
+	for edge in edges:
+		edge = frappe._dict(edge)
+		relation = (edge.relation or "").strip()
+		if not edge.patient or not edge.related_patient:
+			frappe.throw(_("Patient and related patient are required"))
+		if edge.patient == edge.related_patient:
+			frappe.throw(_("You cannot relate a patient to themselves."))
+		if relation not in allowed:
+			frappe.throw(_("Relation {0} is not valid").format(relation or _("(empty)")))
+		if (edge.patient, edge.related_patient) in requested:
+			frappe.throw(
+				_("The relationship between {0} and {1} is given more than once.").format(
+					edge.patient, edge.related_patient
+				)
+			)
+		if (edge.related_patient, edge.patient) in requested:
+			frappe.throw(
+				_("Give one direction of the relationship between {0} and {1}, its inverse is created automatically.").format(
+					edge.patient, edge.related_patient
+				)
+			)
+		requested[(edge.patient, edge.related_patient)] = frappe._dict(
+			patient=edge.patient,
+			related_patient=edge.related_patient,
+			relation=relation,
+			inverse_relation=_get_inverse_label(relation),
+			notes=edge.notes,
+		)
+	if not requested:
+		return []
+
+	patients = list({patient for pair in requested for patient in pair})
+	found = set(frappe.get_all("Patient", filters={"name": ["in", patients]}, pluck="name"))
+	missing = sorted(set(patients) - found)
+	if missing:
+		frappe.throw(_("Patient {0} does not exist").format(", ".join(missing)), frappe.DoesNotExistError)
+
+	existing = {
+		(row.patient, row.related_patient): row
+		for row in frappe.get_all(
+			"Patient Relationship",
+			filters={"patient": ["in", patients], "related_patient": ["in", patients]},
+			fields=["name", "patient", "related_patient", "relation", "inverse_relation"],
+		)
+	}
+	for pair in requested:
+		if pair in existing:
+			frappe.throw(
+				_(
+					"A relationship between {0} and {1} already exists (record: {2})."
+				).format(pair[0], pair[1], existing[pair].name)
+			)
+
+	new_rows = dict(requested)
+	updates = {}
+	for (patient, related_patient), edge in requested.items():
+		inverse = _get_inverse_row(patient, related_patient, edge.relation, edge.notes)
+		pair = (related_patient, patient)
+		if pair not in existing:
+			new_rows[pair] = inverse
+		elif (existing[pair].relation, existing[pair].inverse_relation) != (inverse.relation, inverse.inverse_relation):
+			updates[existing[pair].name] = {"relation": inverse.relation, "inverse_relation": inverse.inverse_relation}
+
+	timestamp = now()
+	user = frappe.session.user
+	fields = [
+		"name",
+		"creation",
+		"modified",
+		"owner",
+		"modified_by",
+		"patient",
+		"related_patient",
+		"relation",
+		"inverse_relation",
+		"notes",
+	]
+	metadata = {"creation": timestamp, "modified": timestamp, "owner": user, "modified_by": user}
+	values = []
+	for row in new_rows.values():
+		row.name = frappe.generate_hash(length=10)
+		values.append(tuple(metadata[field] if field in metadata else row.get(field) for field in fields))
+	frappe.db.bulk_insert("Patient Relationship", fields, values)
+	if updates:
+		frappe.db.bulk_update("Patient Relationship", updates)
+
+	# doc events do not run for bulk writes
+	from do_health.api.patient_overview import invalidate_after_commit
+
+	invalidate_after_commit(*patients)
+	return [row.name for row in requested.values()]
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, Sayed Mohamed and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Practitioner Availability Day", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,170 @@
+# Copyright (c) 2026, Sayed Mohamed and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, date_diff, getdate, now
+
+# rows are kept for [today - PAST_DAYS, today + HORIZON_DAYS]; lookups outside it fall back to the source doctype
+PAST_DAYS = 30
+HORIZON_DAYS = 180
+
+DAY_FIELDS = [
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"date",
+	"scope",
+	"availability",
+	"type",
+	"status",
+	"service_unit",
+	"start_time",
+	"end_time",
+	"duration",
+	"display",
+	"reason",
+	"note",
+]
+
+
+class PractitionerAvailabilityDay(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Practitioner Availability Day", ["scope", "date"])
+
+
+def get_window():
+	today = getdate()
+	return add_days(today, -PAST_DAYS), add_days(today, HORIZON_DAYS)
+
+
+def covers(from_date, to_date=None):
+	"""Whether every date in [from_date, to_date] is inside the materialized window."""
+	window_start, window_end = get_window()
+	# the last day is only filled once the daily extend_horizon job has run
+	return window_start <= getdate(from_date) and getdate(to_date or from_date) < window_end
+
+
+def _applies_on(availability, date):
+	# unavailability blocks every day of its range, as get_practitioner_unavailability always did
+	if availability.type != "Available":
+		return True
+
+	from do_health.api.methods import availability_applies_on
+
+	return availability_applies_on(availability, date)
+
+
+def expand_days(availability, from_date, to_date):
+	"""One row per date of [from_date, to_date] on which 'availability' applies."""
+	start = max(getdate(availability.start_date), getdate(from_date))
+	end = min(getdate(availability.end_date), getdate(to_date))
+
+	days = []
+	for offset in range(date_diff(end, start) + 1):
+		date = add_days(start, offset)
+		if not _applies_on(availability, date):
+			continue
+		days.append(
+			frappe._dict(
+				name=hashlib.md5(f"{availability.name}|{date}".encode()).hexdigest(),
+				date=date,
+				scope=availability.scope,
+				availability=availability.name,
+				type=availability.type,
+				status=availability.status,
+				service_unit=availability.service_unit,
+				start_time=availability.start_time,
+				end_time=availability.end_time,
+				duration=availability.duration,
+				display=availability.display,
+				reason=availability.reason,
+				note=availability.note,
+			)
+		)
+	return days
+
+
+def _insert(days):
+	if not days:
+		return
+	timestamp = now()
+	metadata = {
+		"creation": timestamp,
+		"modified": timestamp,
+		"owner": "Administrator",
+		"modified_by": "Administrator",
+	}
+	values = [tuple(metadata[field] if field in metadata else day[field] for field in DAY_FIELDS) for day in days]
+	frappe.db.bulk_insert("Practitioner Availability Day", DAY_FIELDS, values, ignore_duplicates=True)
+
+
+def update_for_availability(doc, method=None):
+	"""Re-expand one Practitioner Availability inside the window (submit, update after submit, cancel, trash)."""
+	frappe.db.delete("Practitioner Availability Day", {"availability": doc.name})
+	if doc.docstatus == 1 and method != "on_trash":
+		_insert(expand_days(doc, *get_window()))
+
+
+def rebuild(from_date=None, to_date=None):
+	"""Re-expand every submitted Practitioner Availability over [from_date, to_date] (the window by default)."""
+	window_start, window_end = get_window()
+	from_date = getdate(from_date) if from_date else window_start
+	to_date = getdate(to_date) if to_date else window_end
+
+	frappe.db.delete("Practitioner Availability Day", {"date": ["between", [from_date, to_date]]})
+	for availability in frappe.get_all(
+		"Practitioner Availability",
+		filters={"docstatus": 1, "start_date": ["<=", to_date], "end_date": [">=", from_date]},
+		fields=["*"],
+	):
+		_insert(expand_days(availability, from_date, to_date))
+
+
+def extend_horizon():
+	"""
+	Daily: materialize every day from the last one built up to the horizon and drop rows that
+	left the window, so days missed while the job did not run are filled in too.
+	"""
+	window_start, window_end = get_window()
+	frappe.db.delete("Practitioner Availability Day", {"date": ["<", window_start]})
+
+	last_built = frappe.db.get_value("Practitioner Availability Day", {}, "max(date)")
+	from_date = max(getdate(last_built), window_start) if last_built else window_start
+	rebuild(from_date, window_end)
+
+
+def get_days(scopes, from_date, to_date=None, type=None):
+	"""
+	Availability / unavailability rows for 'scopes' on [from_date, to_date] ordered by start_time.
+	Served by one indexed read inside the window, expanded from Practitioner Availability outside it.
+	"""
+	scopes = [scope for scope in scopes if scope]
+	from_date, to_date = getdate(from_date), getdate(to_date or from_date)
+	if not scopes:
+		return []
+
+	filters = {"scope": ["in", scopes]}
+	if type:
+		filters["type"] = type
+
+	if covers(from_date, to_date):
+		filters["date"] = ["between", [from_date, to_date]]
+		return frappe.get_all(
+			"Practitioner Availability Day", filters=filters, fields=["*"], order_by="start_time asc"
+		)
+
+	filters.update({"docstatus": 1, "start_date": ["<=", to_date], "end_date": [">=", from_date]})
+	days = []
+	for availability in frappe.get_all(
+		"Practitioner Availability", filters=filters, fields=["*"], order_by="start_time asc"
+	):
+		days.extend(expand_days(availability, from_date, to_date))
+	return days
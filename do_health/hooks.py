@@ -189,23 +189,145 @@ doc_events = {
 #       }
     'Patient':{
         "before_insert": "do_health.api.events.patient_inserting",
-        "on_update": "do_health.api.events.patient_update"
+        "on_update": [
+            "do_health.api.events.patient_update",
+            "do_health.api.calendar_cache.on_patient_change",
+            "do_health.api.waiting_queue.on_patient_change",
+            "do_health.api.patient_overview.on_patient_change"
+        ]
     },
     'Patient Appointment':{
         "before_insert": "do_health.api.events.patient_appointment_inserting",
-        "on_update": "do_health.api.events.patient_appointment_update"
+        "on_update": [
+            "do_health.api.calendar_cache.on_appointment_change",
+            "do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup.update_for_appointment",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_appointment_change",
+            "do_health.api.patient_overview.on_patient_record_change",
+            "do_health.do_health.doctype.appointment_activity.appointment_activity.on_appointment_update"
+        ],
+        "on_trash": [
+            "do_health.api.calendar_cache.on_appointment_change",
+            "do_health.api.waiting_queue.on_appointment_trash",
+            "do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup.update_for_appointment",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ]
+    },
+    'Healthcare Practitioner':{
+        "on_update": "do_health.api.calendar_cache.on_practitioner_change"
+    },
+    'Holiday List':{
+        "on_update": "do_health.api.employee_calendar.invalidate_all",
+        "on_trash": "do_health.api.employee_calendar.invalidate_all"
+    },
+    'Company':{
+        "on_update": "do_health.api.employee_calendar.invalidate_all"
+    },
+    'Employee':{
+        "on_update": "do_health.api.employee_calendar.on_employee_change",
+        "on_trash": "do_health.api.employee_calendar.on_employee_change"
+    },
+    'Leave Application':{
+        "on_submit": "do_health.api.employee_calendar.on_leave_change",
+        "on_cancel": "do_health.api.employee_calendar.on_leave_change",
+        "on_update_after_submit": "do_health.api.employee_calendar.on_leave_change",
+        "on_trash": "do_health.api.employee_calendar.on_leave_change"
+    },
+    'Practitioner Schedule':{
+        "on_update": "do_health.api.slot_config.on_config_change",
+        "on_trash": "do_health.api.slot_config.on_config_change"
+    },
+    'Healthcare Service Unit':{
+        "on_update": "do_health.api.slot_config.on_config_change",
+        "on_trash": "do_health.api.slot_config.on_config_change"
+    },
+    'Practitioner Availability':{
+        "on_update": "do_health.api.slot_config.on_config_change",
+        "on_submit": [
+            "do_health.api.slot_config.on_config_change",
+            "do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day.update_for_availability"
+        ],
+        "on_cancel": [
+            "do_health.api.slot_config.on_config_change",
+            "do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day.update_for_availability"
+        ],
+        "on_update_after_submit": [
+            "do_health.api.slot_config.on_config_change",
+            "do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day.update_for_availability"
+        ],
+        "on_trash": [
+            "do_health.api.slot_config.on_config_change",
+            "do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day.update_for_availability"
+        ]
     },
     'Patient Encounter':{
         "after_insert": "do_health.api.events.patient_encounter_inserted",
-        "on_update": "do_health.api.events.patient_encounter_update",
-        "on_submit": "do_health.api.events.patient_encounter_submit"
+        "on_update": [
+            "do_health.api.events.patient_encounter_update",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.update_for_encounter",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ],
+        "on_submit": [
+            "do_health.api.events.patient_encounter_submit",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.update_for_encounter",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ],
+        "on_cancel": "do_health.api.patient_overview.on_patient_record_change",
+        "on_update_after_submit": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.update_for_encounter",
+        "on_trash": [
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.update_for_encounter",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ]
     },
     'Clinical Procedure':{
-        "on_submit": "do_health.api.events.clinical_procedure_submit",
+        "on_update": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_clinical_procedure_change",
+        "on_submit": [
+            "do_health.api.events.clinical_procedure_submit",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_clinical_procedure_change"
+        ],
+        "on_cancel": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_clinical_procedure_change",
+        "on_trash": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_clinical_procedure_change"
     },
     'Medication Request':{
-        "on_update": "do_health.api.events.medication_request_update",
-        "on_submit": "do_health.api.events.medication_request_update"
+        "on_update": [
+            "do_health.api.events.medication_request_update",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_medication_request_change"
+        ],
+        "on_submit": [
+            "do_health.api.events.medication_request_update",
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_medication_request_change"
+        ],
+        "on_cancel": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_medication_request_change",
+        "on_update_after_submit": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_medication_request_change",
+        "on_trash": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_medication_request_change"
+    },
+    'Service Request':{
+        "on_update": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_service_request_change",
+        "on_submit": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_service_request_change",
+        "on_cancel": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_service_request_change",
+        "on_update_after_submit": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_service_request_change",
+        "on_trash": "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_service_request_change"
+    },
+    'Vital Signs':{
+        "on_update": [
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_vital_signs_change",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ],
+        "on_submit": [
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_vital_signs_change",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ],
+        "on_cancel": [
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_vital_signs_change",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ],
+        "on_trash": [
+            "do_health.do_health.doctype.encounter_summary_snapshot.encounter_summary_snapshot.on_vital_signs_change",
+            "do_health.api.patient_overview.on_patient_record_change"
+        ]
+    },
+    'Patient Relationship':{
+        "on_update": "do_health.api.patient_overview.on_relationship_change",
+        "on_trash": "do_health.api.patient_overview.on_relationship_change"
     },
     "Sales Invoice": {
         "on_update": "do_health.api.methods.sync_patient_billing_status",
@@ -244,6 +366,10 @@ scheduler_events = {
     "all": [
         "do_health.api.methods.mark_no_show_appointments"
     ],
+    "daily": [
+        "do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup.rebuild_recent",
+        "do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day.extend_horizon"
+    ],
 }
 
 # Testing
@@ -254,9 +380,9 @@ scheduler_events = {
 # Overriding Methods
 # ------------------------------
 #
-# override_whitelisted_methods = {
-# 	"frappe.desk.doctype.event.event.get_events": "do_health.event.get_events"
-# }
+override_whitelisted_methods = {
+    "healthcare.healthcare.doctype.patient_appointment.patient_appointment.update_status": "do_health.overrides.patient_appointment.update_status"
+}
 #
 # each overriding function accepts a `data` argument;
 # generated from the base implementation of the doctype dashboard,
@@ -1,8 +1,12 @@
 import frappe
 import datetime
-from frappe.utils import flt, format_date, get_link_to_form, get_time, getdate, now_datetime
+import json
+from frappe.utils import flt, format_date, get_datetime, get_link_to_form, get_time, getdate, now_datetime
 from healthcare.healthcare.doctype.patient_appointment.patient_appointment import PatientAppointment
+from healthcare.healthcare.doctype.patient_appointment.patient_appointment import update_status as healthcare_update_status
 from healthcare.healthcare.doctype.fee_validity.fee_validity import manage_fee_validity
+from do_health.api import waiting_queue
+from do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup import rebuild_days
 
 class CustomPatientAppointment(PatientAppointment):
 	def validate(self):
@@ -35,6 +39,13 @@ class CustomPatientAppointment(PatientAppointment):
 			if (current_date != old_date) or (current_time != old_time):
 				self.status = 'Rescheduled'
 
+		self.set_status_timestamps()
+
+	def set_status_timestamps(self):
+		"""Denormalize the time logs into `custom_arrival_time` and per-status first/last times."""
+		logs = [(log.status, log.time) for log in self.get("custom_appointment_time_logs") or []]
+		self.custom_arrival_time, self.custom_status_timestamps = build_status_timestamps(logs)
+
 	def insert_calendar_event(self):
 		if not self.practitioner:
 			return
@@ -117,55 +128,44 @@ class CustomPatientAppointment(PatientAppointment):
 		if doc_before_save and not doc_before_save.insurance_policy == self.insurance_policy:
 			self.make_insurance_coverage()
 
-		# Publish realtime waiting list updates when status changes to/from Arrived
+		# Keep the live waiting queue in step; it publishes per-room deltas once committed
 		prev_doc = self.get_doc_before_save() or frappe._dict()
 		current = self.get("custom_visit_status")
 		prev = prev_doc.get("custom_visit_status")
 		
-		if current != prev and (current == "Arrived" or prev == "Arrived"):
-			waiting_list = frappe.db.sql("""
-				SELECT 
-					pa.name,
-					pa.appointment_type,
-					pa.patient_name,
-					pa.patient,
-					p.mobile,
-					p.dob,
-					p.custom_cpr,
-					p.custom_file_number,
-					p.image AS patient_image,
-					p.sex AS gender,
-					pa.practitioner,
-					pa.practitioner_name,
-					pa.custom_visit_status,
-					at.arrival_time,
-					pa.appointment_time,
-					pa.appointment_date
-				FROM `tabPatient Appointment` pa
-				LEFT JOIN (
-					SELECT parent, MAX(time) AS arrival_time
-					FROM `tabAppointment Time Logs`
-					WHERE status = 'Arrived'
-					GROUP BY parent
-				) at ON pa.name = at.parent
-				LEFT JOIN `tabPatient` p 
-					ON pa.patient = p.name
-				WHERE pa.custom_visit_status = 'Arrived' 
-				AND pa.appointment_date = CURDATE()
-				ORDER BY pa.practitioner_name, at.arrival_time ASC
-			""", as_dict=True)
-			
-			frappe.publish_realtime(
-				event="do_health_waiting_list_update",
-				message=waiting_list,
-				after_commit=True
-			)
-			
-			frappe.publish_realtime(
-				event="patient_appointments_updated",
-				message={"appointment": self.name, "status": current},
-				after_commit=True
-			)
+		if current == "Arrived" or prev == "Arrived":
+			waiting_queue.sync_after_commit(self.name)
+
+@frappe.whitelist()
+def update_status(appointment_id, status):
+	"""
+	Healthcare's update_status (used by the form's cancel) writes the status with db.set_value,
+	which skips the document hooks; recompute the appointment's rollup day afterwards.
+	"""
+	result = healthcare_update_status(appointment_id, status)
+	rebuild_days(frappe.db.get_value("Patient Appointment", appointment_id, "appointment_date"))
+	return result
+
+def build_status_timestamps(logs):
+	"""
+	Reduce (status, time) pairs to the latest arrival time and a JSON map of
+	{status: {"first": ..., "last": ...}}.
+	"""
+	stamps = {}
+	for status, time in logs:
+		if not (status and time):
+			continue
+		time = get_datetime(time)
+		entry = stamps.setdefault(status, {"first": time, "last": time})
+		entry["first"] = min(entry["first"], time)
+		entry["last"] = max(entry["last"], time)
+
+	arrival_time = stamps["Arrived"]["last"] if "Arrived" in stamps else None
+	serialized = {
+		status: {"first": str(entry["first"]), "last": str(entry["last"])}
+		for status, entry in stamps.items()
+	}
+	return arrival_time, json.dumps(serialized) if serialized else None
 
 @frappe.whitelist()
 def update_fee_validity(appointment):
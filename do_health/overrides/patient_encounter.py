@@ -1,6 +1,8 @@
 import frappe
 from healthcare.healthcare.doctype.patient_encounter.patient_encounter import PatientEncounter
 from healthcare.healthcare.doctype.patient_encounter.patient_encounter import set_codification_table_from_diagnosis
+from do_health.api.calendar_cache import invalidate_appointment
+from do_health.api.waiting_queue import sync_after_commit
 
 class CustomPatientEncounter(PatientEncounter):
 	def validate(self):
@@ -26,6 +28,8 @@ class CustomPatientEncounter(PatientEncounter):
 		if self.appointment:
 			# frappe.db.set_value("Patient Appointment", self.appointment, "status", "Open")
 			frappe.db.set_value("Patient Appointment", self.appointment, "custom_visit_status", "Arrived")
+			invalidate_appointment(self.appointment)
+			sync_after_commit(self.appointment)
 
 		therapy_plan = frappe.db.exists(
 			"Therapy Plan", {"source_doc": self.doctype, "order_group": self.name}
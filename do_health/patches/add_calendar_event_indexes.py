@@ -0,0 +1,15 @@
+import frappe
+
+
+def execute():
+	# range scans of the calendar feed narrowed by practitioner or room
+	frappe.db.add_index(
+		"Patient Appointment",
+		["appointment_datetime", "practitioner"],
+		index_name="appointment_datetime_practitioner_index",
+	)
+	frappe.db.add_index(
+		"Patient Appointment",
+		["appointment_datetime", "service_unit"],
+		index_name="appointment_datetime_service_unit_index",
+	)
@@ -0,0 +1,36 @@
+import frappe
+from frappe.utils.fixtures import sync_fixtures
+
+from do_health.overrides.patient_appointment import build_status_timestamps
+
+
+def execute():
+	# custom fields ship as fixtures, which are only synced after post-model-sync patches
+	sync_fixtures("do_health")
+
+	logs = frappe.db.sql(
+		"""
+		SELECT parent, status, MIN(time) AS first_time, MAX(time) AS last_time
+		FROM `tabAppointment Time Logs`
+		WHERE parenttype = 'Patient Appointment' AND time IS NOT NULL
+		GROUP BY parent, status
+		""",
+		as_dict=True,
+	)
+
+	by_parent = {}
+	for row in logs:
+		pairs = by_parent.setdefault(row.parent, [])
+		pairs.append((row.status, row.first_time))
+		pairs.append((row.status, row.last_time))
+
+	updates = {}
+	for parent, pairs in by_parent.items():
+		arrival_time, timestamps = build_status_timestamps(pairs)
+		updates[parent] = {
+			"custom_arrival_time": arrival_time,
+			"custom_status_timestamps": timestamps,
+		}
+
+	if updates:
+		frappe.db.bulk_update("Patient Appointment", updates, chunk_size=500, update_modified=False)
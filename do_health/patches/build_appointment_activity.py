@@ -0,0 +1,14 @@
+import frappe
+
+from do_health.do_health.doctype.appointment_activity.appointment_activity import record_status
+
+BATCH_SIZE = 500
+
+
+def execute():
+	frappe.reload_doc("do_health", "doctype", "appointment_activity")
+
+	names = frappe.get_all("Patient Appointment", pluck="name", order_by="creation asc")
+	for start in range(0, len(names), BATCH_SIZE):
+		batch = names[start : start + BATCH_SIZE]
+		record_status(batch)
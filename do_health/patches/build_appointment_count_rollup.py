@@ -0,0 +1,8 @@
+import frappe
+
+from do_health.do_health.doctype.appointment_count_rollup.appointment_count_rollup import rebuild
+
+
+def execute():
+	frappe.reload_doc("do_health", "doctype", "appointment_count_rollup")
+	rebuild()
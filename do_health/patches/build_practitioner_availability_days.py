@@ -0,0 +1,8 @@
+import frappe
+
+from do_health.do_health.doctype.practitioner_availability_day.practitioner_availability_day import rebuild
+
+
+def execute():
+	frappe.reload_doc("do_health", "doctype", "practitioner_availability_day")
+	rebuild()
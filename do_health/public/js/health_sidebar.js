@@ -25,6 +25,8 @@
 
     const state = {
         waiting: [],
+        waitingRooms: {},
+        waitingFilter: null,
         mode: loadSidebarMode(),
         selectedPatient: null,
         initialized: false,
@@ -2661,13 +2663,108 @@
         }
     }
 
+    function waitingRoomKey(doctype, name) {
+        return `${doctype}::${name}`;
+    }
+
+    // Frappe drops subscribe calls made within a second of the previous one, so rooms are joined one per second
+    const WAITING_SUBSCRIBE_INTERVAL = 1100;
+    let waitingSubscribeQueue = [];
+    let waitingSubscribeTimer = null;
+
+    function sendWaitingSubscription() {
+        waitingSubscribeTimer = null;
+        const room = waitingSubscribeQueue.shift();
+        if (!room) return;
+
+        // the clinic room is a doctype room (empty name)
+        if (!room.name) {
+            frappe.realtime.doctype_subscribe(room.doctype);
+        } else {
+            frappe.realtime.doc_subscribe(room.doctype, room.name);
+        }
+        // a room only counts once joined; deltas it missed meanwhile show up as a sequence gap
+        state.waitingRooms[waitingRoomKey(room.doctype, room.name)] = room.seq || 0;
+
+        if (waitingSubscribeQueue.length) {
+            waitingSubscribeTimer = setTimeout(sendWaitingSubscription, WAITING_SUBSCRIBE_INTERVAL);
+        }
+    }
+
+    function subscribeWaitingRooms(rooms = []) {
+        const next = {};
+        const pending = [];
+        rooms.forEach((room) => {
+            const key = waitingRoomKey(room.doctype, room.name);
+            if (key in state.waitingRooms) {
+                next[key] = room.seq || 0;
+            } else if (frappe.realtime && frappe.realtime.doc_subscribe && frappe.realtime.doctype_subscribe) {
+                pending.push(room);
+            }
+        });
+        state.waitingRooms = next;
+        waitingSubscribeQueue = pending;
+        if (pending.length && !waitingSubscribeTimer) {
+            sendWaitingSubscription();
+        }
+    }
+
+    function isWaitingVisible(entry) {
+        const filter = state.waitingFilter;
+        if (!filter || !filter.practitioners) return true;
+        if (!entry.practitioner) return filter.unassigned;
+        return filter.practitioners.has(entry.practitioner);
+    }
+
+    function sortWaiting(patients) {
+        return patients.sort((a, b) =>
+            (a.practitioner_name || "").localeCompare(b.practitioner_name || "") ||
+            String(a.arrival_time || "").localeCompare(String(b.arrival_time || ""))
+        );
+    }
+
+    // Apply an add/remove/move delta from one room; a gap in its sequence triggers a full reload
+    function applyWaitingDelta(delta) {
+        if (!delta || !Array.isArray(delta.room)) return;
+        const key = waitingRoomKey(delta.room[0], delta.room[1]);
+        if (!(key in state.waitingRooms)) return;
+
+        const last = state.waitingRooms[key];
+        if (delta.seq <= last) return;
+        if (delta.seq !== last + 1) {
+            fetchWaitingPatients(true);
+            return;
+        }
+        state.waitingRooms[key] = delta.seq;
+
+        let waiting = state.waiting.slice();
+        (delta.changes || []).forEach((change) => {
+            waiting = waiting.filter((patient) => patient.appointment !== change.name);
+            if (change.op !== "remove" && change.entry && isWaitingVisible(change.entry)) {
+                const normalized = normalizePatient(change.entry);
+                if (normalized) waiting.push(normalized);
+            }
+        });
+
+        state.waiting = sortWaiting(waiting);
+        waitingListHash = JSON.stringify(state.waiting);
+        renderWaitingList(state.waiting);
+        restorePatientContext();
+    }
+
     async function fetchWaitingPatients(triggeredByRealtime = false) {
         try {
             const response = await frappe.call({
-                method: "do_health.api.methods.get_waiting_list"
+                method: "do_health.api.waiting_queue.get_waiting_queue"
             });
 
-            const patients = Array.isArray(response.message) ? response.message : [];
+            const snapshot = response.message || {};
+            state.waitingFilter = {
+                practitioners: Array.isArray(snapshot.practitioners) ? new Set(snapshot.practitioners) : null,
+                unassigned: Boolean(snapshot.unassigned)
+            };
+            subscribeWaitingRooms(snapshot.rooms);
+            const patients = Array.isArray(snapshot.entries) ? snapshot.entries : [];
             const normalized = patients.map(normalizePatient).filter(Boolean);
             const newHash = JSON.stringify(normalized);
 
@@ -2762,6 +2859,9 @@
         },
         refreshWaitingList() {
             return fetchWaitingPatients(true);
+        },
+        applyWaitingDelta(delta) {
+            return applyWaitingDelta(delta);
         }
     });
 })();
@@ -2778,15 +2878,9 @@ function registerHealthSidebarRealtime() {
         return;
     }
 
-    frappe.realtime.on("do_health_waiting_list_update", function (data) {
-        if (window.doHealthSidebar && window.doHealthSidebar.refreshWaitingList) {
-            window.doHealthSidebar.refreshWaitingList();
-        }
-    });
-
-    frappe.realtime.on("patient_appointments_updated", function (data) {
-        if (window.doHealthSidebar && window.doHealthSidebar.refreshWaitingList) {
-            window.doHealthSidebar.refreshWaitingList();
+    frappe.realtime.on("do_health_waiting_queue", function (data) {
+        if (window.doHealthSidebar && window.doHealthSidebar.applyWaitingDelta) {
+            window.doHealthSidebar.applyWaitingDelta(data);
         }
     });
 }
@@ -67,7 +67,8 @@ frappe.views.calendar["Patient Appointment"] = {
             rooms: { showAll: true }
         },
         isDatepickerSyncing: false,
-        isPointerDown: false
+        isPointerDown: false,
+        eventSync: null
     },
 
     // Save filter state to localStorage
@@ -529,6 +530,12 @@ frappe.views.calendar["Patient Appointment"] = {
 
         // events fetching
         events: function (fetchInfo, successCallback, failureCallback) {
+            const calendarView = frappe.views.calendar["Patient Appointment"];
+            const showcancelled = calendarView.state.showcancelled || false;
+            const syncKey = `${fetchInfo.startStr}|${fetchInfo.endStr}|${showcancelled}`;
+            const eventSync = calendarView.state.eventSync;
+            const since = eventSync && eventSync.key === syncKey ? eventSync.cursor : null;
+
             frappe.call({
                 method: "do_health.api.methods.get_events_full_calendar",
                 args: {
@@ -536,12 +543,16 @@ frappe.views.calendar["Patient Appointment"] = {
                     end: fetchInfo.endStr,
                     filters: {},
                     field_map: JSON.stringify({
-                        showcancelled: frappe.views.calendar["Patient Appointment"].state.showcancelled || false
-                    })
+                        showcancelled: showcancelled
+                    }),
+                    since: since,
+                    delta: 1,
+                    format: 'columnar'
                 },
                 callback: (r) => {
                     if (r.message) {
-                        const enhancedEvents = frappe.views.calendar["Patient Appointment"].enhanceEventsData(r.message);
+                        const events = calendarView.mergeEventDelta(syncKey, since, r.message);
+                        const enhancedEvents = calendarView.enhanceEventsData(events);
                         successCallback(enhancedEvents);
                     } else {
                         console.error('No events data received');
@@ -1860,6 +1871,54 @@ frappe.views.calendar["Patient Appointment"] = {
         return moment(event.end).diff(moment(event.start), 'minutes');
     },
 
+    // Expand a columnar events payload back into one object per appointment
+    decodeColumnarEvents: function (payload) {
+        if (!payload || payload.format !== 'columnar') {
+            return payload || [];
+        }
+
+        const fields = payload.fields || [];
+        const columns = payload.columns || [];
+        const lookups = Object.values(payload.lookups || {});
+        const statusColors = payload.status_colors || {};
+        const count = columns.length ? columns[0].length : 0;
+        const events = [];
+
+        for (let i = 0; i < count; i++) {
+            const event = {};
+            fields.forEach((field, idx) => {
+                event[field] = columns[idx][i];
+            });
+            lookups.forEach(lookup => {
+                const values = lookup.rows[event[lookup.key]];
+                lookup.fields.forEach((field, idx) => {
+                    event[field] = values ? values[idx] : null;
+                });
+            });
+            if (statusColors[event.status]) {
+                event.background_color = statusColors[event.status];
+            }
+            events.push(event);
+        }
+        return events;
+    },
+
+    // Apply a delta payload on top of the events already held for the same range
+    mergeEventDelta: function (syncKey, since, payload) {
+        const previous = since && this.state.eventSync ? this.state.eventSync.events : {};
+        const events = Object.assign({}, previous);
+
+        (payload.removed || []).forEach(name => {
+            delete events[name];
+        });
+        this.decodeColumnarEvents(payload.events).forEach(event => {
+            events[event.name] = event;
+        });
+
+        this.state.eventSync = { key: syncKey, cursor: payload.cursor, events: events };
+        return Object.values(events).map(event => Object.assign({}, event));
+    },
+
     // Enhance events data
     enhanceEventsData: function (events) {
         let fillteredEvents = events;
@@ -4294,7 +4353,6 @@ let check_and_set_availability = function (event, is_new = false) {
 
     function get_slots(slot_details, fee_validity, appointment_date, selected_slot) {
         let slot_html = '';
-        let appointment_count = 0;
         let disabled = false;
         let start_str, slot_start_time, slot_end_time, interval, count, count_class, tool_tip, available_slots;
 
@@ -4325,77 +4383,30 @@ let check_and_set_availability = function (event, is_new = false) {
             slot_html += '</div><br>';
 
             if (slot_info.avail_slot && Array.isArray(slot_info.avail_slot)) {
+                // open slots and their remaining capacity come from slot_engine.compute_open_slots
+                const open_slots = {};
+                (slot_info.open_slots || []).forEach(open_slot => {
+                    open_slots[`${open_slot.from_time}-${open_slot.to_time}`] = open_slot;
+                });
+
                 slot_html += slot_info.avail_slot.map(slot => {
-                    appointment_count = 0;
-                    disabled = false;
-                    count_class = tool_tip = '';
+                    count = count_class = tool_tip = '';
                     start_str = slot.from_time;
                     slot_start_time = moment(slot.from_time, 'HH:mm:ss');
                     slot_end_time = moment(slot.to_time, 'HH:mm:ss');
                     interval = (slot_end_time - slot_start_time) / 60000 | 0;
 
-                    // restrict past slots based on the current time.
-                    let now = moment();
-                    let booked_moment = "";
-                    if ((now.format("YYYY-MM-DD") == appointment_date) && (slot_start_time.isBefore(now) && !slot.maximum_appointments)) {
-                        disabled = true;
-                    } else {
-                        // iterate in all booked appointments, update the start time and duration
-                        if (slot_info.appointments && Array.isArray(slot_info.appointments)) {
-                            slot_info.appointments.forEach((booked) => {
-                                booked_moment = moment(booked.appointment_time, 'HH:mm:ss');
-                                let end_time = booked_moment.clone().add(booked.duration, 'minutes');
-
-                                // to get appointment count for all day appointments
-                                if (slot.maximum_appointments) {
-                                    if (booked.appointment_date == appointment_date) {
-                                        appointment_count++;
-                                    }
-                                }
-                                // Deal with 0 duration appointments
-                                if (booked_moment.isSame(slot_start_time) || booked_moment.isBetween(slot_start_time, slot_end_time)) {
-                                    if (booked.duration == 0) {
-                                        disabled = true;
-                                        return false;
-                                    }
-                                }
-
-                                // Check for overlaps considering appointment duration
-                                if (slot_info.allow_overlap != 1) {
-                                    if (slot_start_time.isBefore(end_time) && slot_end_time.isAfter(booked_moment)) {
-                                        // There is an overlap
-                                        disabled = true;
-                                        return false;
-                                    }
-                                } else {
-                                    if (slot_start_time.isBefore(end_time) && slot_end_time.isAfter(booked_moment)) {
-                                        appointment_count++;
-                                    }
-                                    if (appointment_count >= slot_info.service_unit_capacity) {
-                                        // There is an overlap
-                                        disabled = true;
-                                        return false;
-                                    }
-                                }
-                            });
-                        }
-                    }
+                    const open_slot = open_slots[`${slot_start_time.format('HH:mm:ss')}-${slot_end_time.format('HH:mm:ss')}`];
+                    disabled = !open_slot;
+                    available_slots = open_slot ? open_slot.available : 0;
 
                     if (slot_info.allow_overlap == 1 && slot_info.service_unit_capacity > 1) {
-                        available_slots = slot_info.service_unit_capacity - appointment_count;
                         count = `${(available_slots > 0 ? available_slots : __('Full'))}`;
                         count_class = `${(available_slots > 0 ? 'badge-success' : 'badge-danger')}`;
-                        tool_tip = `${available_slots} ${__('slots available for booking')}`;
+                        tool_tip = `${available_slots || 0} ${__('slots available for booking')}`;
                     }
 
                     if (slot.maximum_appointments) {
-                        if (appointment_count >= slot.maximum_appointments) {
-                            disabled = true;
-                        }
-                        else {
-                            disabled = false;
-                        }
-                        available_slots = slot.maximum_appointments - appointment_count;
                         count = `${(available_slots > 0 ? available_slots : __('Full'))}`;
                         count_class = `${(available_slots > 0 ? 'badge-success' : 'badge-danger')}`;
                         return `<button class="btn btn-secondary" data-name=${start_str}